@@ -0,0 +1,117 @@
+"""
+Compares the old engine setup (a new connection per use, SQLite's default rollback journal) with the pooled,
+WAL-journaled engine from games/adapters/database_engine.py under concurrent readers and writers.
+
+Run from the project root:
+
+    python -m benchmarks.engine_concurrency [--readers 8] [--writers 2] [--seconds 5]
+"""
+import argparse
+import os
+import tempfile
+import threading
+import time
+
+from sqlalchemy import insert
+from sqlalchemy.exc import OperationalError
+from sqlalchemy.orm import sessionmaker, clear_mappers
+
+from games.adapters.database_engine import create_database_engine
+from games.adapters.database_repository import SqlAlchemyRepository
+from games.adapters.orm import mapper_registry, map_model_to_tables, games_table, users_table
+
+NUMBER_OF_GAMES = 5000
+PAGE_SIZE = 15
+
+ENGINE_SETUPS = {
+    # What create_app used before: NullPool and no pragmas.
+    'baseline': {'SQLITE_POOL': 'null', 'SQLITE_JOURNAL_MODE': None, 'SQLITE_SYNCHRONOUS': None,
+                 'SQLITE_CACHE_SIZE': None, 'SQLITE_MMAP_SIZE': None, 'SQLITE_BUSY_TIMEOUT': 5000},
+    'tuned': {},
+}
+
+
+def build_database(database_uri, config):
+    engine = create_database_engine(database_uri, config)
+    mapper_registry.metadata.create_all(engine)
+    with engine.begin() as connection:
+        connection.execute(insert(games_table), [
+            {'game_id': game_id, 'game_title': f'Game {game_id:05d}', 'game_price': 0.99,
+             'release_date': 'Oct 21, 2008'}
+            for game_id in range(1, NUMBER_OF_GAMES + 1)
+        ])
+        connection.execute(insert(users_table), [
+            {'username': f'writer{number}', 'password': 'Password1'} for number in range(64)
+        ])
+    return engine
+
+
+def run_workload(engine, readers, writers, seconds):
+    session_factory = sessionmaker(autocommit=False, autoflush=True, bind=engine)
+    counts = {'reads': 0, 'writes': 0, 'errors': 0}
+    lock = threading.Lock()
+    deadline = time.perf_counter() + seconds
+
+    def reader(number):
+        repo = SqlAlchemyRepository(session_factory)
+        reads = errors = 0
+        offset = number * PAGE_SIZE
+        while time.perf_counter() < deadline:
+            try:
+                repo.get_games_page(offset % NUMBER_OF_GAMES, PAGE_SIZE)
+                reads += 1
+            except OperationalError:
+                errors += 1
+            repo.close_session()
+            offset += PAGE_SIZE
+        with lock:
+            counts['reads'] += reads
+            counts['errors'] += errors
+
+    def writer(number):
+        repo = SqlAlchemyRepository(session_factory)
+        writes = errors = 0
+        game_id = 1
+        while time.perf_counter() < deadline:
+            try:
+                repo.add_to_wishlist(f'writer{number}', game_id)
+                writes += 1
+            except OperationalError:
+                errors += 1
+            repo.close_session()
+            game_id = game_id % NUMBER_OF_GAMES + 1
+        with lock:
+            counts['writes'] += writes
+            counts['errors'] += errors
+
+    threads = [threading.Thread(target=reader, args=(number,)) for number in range(readers)]
+    threads += [threading.Thread(target=writer, args=(number,)) for number in range(writers)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return counts
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--readers', type=int, default=8)
+    parser.add_argument('--writers', type=int, default=2)
+    parser.add_argument('--seconds', type=float, default=5)
+    args = parser.parse_args()
+
+    clear_mappers()
+    map_model_to_tables()
+
+    print(f'{args.readers} readers, {args.writers} writers, {args.seconds:g}s per setup')
+    for name, config in ENGINE_SETUPS.items():
+        with tempfile.TemporaryDirectory() as directory:
+            engine = build_database('sqlite:///' + os.path.join(directory, 'games.db'), config)
+            counts = run_workload(engine, args.readers, args.writers, args.seconds)
+            engine.dispose()
+        print(f"{name:>8}: {counts['reads'] / args.seconds:9.0f} reads/s  "
+              f"{counts['writes'] / args.seconds:7.0f} writes/s  {counts['errors']} errors")
+
+
+if __name__ == '__main__':
+    main()
@@ -1,20 +1,25 @@
 """Initialize Flask app."""
 
 from pathlib import Path
+
+import click
 from flask import Flask
-from sqlalchemy import create_engine, NullPool, inspect
+from sqlalchemy import inspect
 from sqlalchemy.orm import sessionmaker, clear_mappers
 
 import games.adapters.repository as repo
 from games.adapters.database_repository import SqlAlchemyRepository
-from games.adapters.repository_populate import populate
+from games.adapters.repository_populate import populate, reimport
+from games.adapters.database_upgrade import upgrade_database
+from games.adapters.database_engine import create_database_engine
 
 from games.adapters.orm import map_model_to_tables, mapper_registry
 
 
 
-def create_app(testing=False):
-    """Construct the core application."""
+def create_app(testing=False, config=None):
+    """Construct the core application. Settings in config, such as the SQLITE_* engine options, override the
+    defaults."""
 
     # Create the Flask app object.
     app = Flask(__name__)
@@ -23,21 +28,28 @@ def create_app(testing=False):
     app.config['SQLALCHEMY_DATABASE_URI'] = database_uri
     app.config['SQLALCHEMY_ECHO'] = True
     app.config['SECRET_KEY'] = 'your_secret_key'
+    if config is not None:
+        app.config.update(config)
+    database_uri = app.config['SQLALCHEMY_DATABASE_URI']
 
-    # Create a database engine and connect it to the specified database
-    database_engine = create_engine(database_uri, connect_args={"check_same_thread": False}, poolclass=NullPool,
-                                    echo=False)
+    # Create a database engine and connect it to the specified database, with pooled connections and the
+    # SQLite pragmas from the SQLITE_* settings (see games/adapters/database_engine.py).
+    database_engine = create_database_engine(database_uri, app.config, echo=False)
 
     # Create the database session factory using session-maker (this has to be done once, in a global manner)
     session_factory = sessionmaker(autocommit=False, autoflush=True, bind=database_engine)
 
     # Create the SQLAlchemy DatabaseRepository instance for an sqlite3-based repository.
     repo.repo_instance = SqlAlchemyRepository(session_factory)
-    data_path = Path('games') / 'adapters' / 'data' / 'games.csv'
+    # populate() and reimport() take the directory holding games.csv.
+    data_path = Path('games') / 'adapters' / 'data'
 
     if testing:
         app.config['TESTING'] = True
 
+    # Bring an existing database's schema up to date before deciding whether to repopulate it.
+    upgrade_database(database_engine)
+
     if app.config['TESTING'] == 'True' or len(inspect(database_engine).get_table_names()) == 0:
         print("REPOPULATING DATABASE...")
         # For testing, or first-time use of the web application, reinitialise the database.
@@ -53,7 +65,8 @@ def create_app(testing=False):
         # Generate mappings that map domain model classes to the database tables.
         map_model_to_tables()
 
-        populate(data_path, repo.repo_instance)
+        populate(data_path, repo.repo_instance, app.config.get('INGEST_PROCESSES', 1),
+                 app.config.get('CATALOG_SNAPSHOT', True))
         print("REPOPULATING DATABASE... FINISHED")
 
     else:
@@ -83,6 +96,18 @@ def create_app(testing=False):
         from .profile import profile
         app.register_blueprint(profile.profile_blueprint)
 
+        # Register the JSON API blueprint to the app instance.
+        from .api import api
+        app.register_blueprint(api.api_blueprint)
+
+        @app.cli.command('import-catalog')
+        @click.option('--data-path', default=str(Path('games') / 'adapters' / 'data'),
+                      help='Directory holding games.csv.')
+        def import_catalog(data_path):
+            """Update the games from games.csv, changing only the games that changed since the last import."""
+            reimport(Path(data_path), repo.repo_instance, app.config.get('INGEST_PROCESSES', 1),
+                     app.config.get('CATALOG_SNAPSHOT', True))
+
         # Register a callback the makes sure that database sessions are associated with http requests
         # We reset the session inside the database repository before a new flask request is generated
         @app.before_request
@@ -0,0 +1,66 @@
+from sqlalchemy import create_engine, event, make_url, NullPool, QueuePool
+
+# Engine settings used unless the app config overrides them. Each can be set through the app config
+# under the same key (see create_app).
+DEFAULT_ENGINE_CONFIG = {
+    # 'queue' keeps connections open between requests; 'null' opens a new connection every time.
+    'SQLITE_POOL': 'queue',
+    'SQLITE_POOL_SIZE': 5,
+    'SQLITE_MAX_OVERFLOW': 10,
+    # WAL lets readers carry on while a writer commits. Set to None to keep SQLite's default.
+    'SQLITE_JOURNAL_MODE': 'WAL',
+    # NORMAL is safe with WAL and avoids an fsync on every commit.
+    'SQLITE_SYNCHRONOUS': 'NORMAL',
+    # Negative sizes are in KiB, so this is a 64 MiB page cache per connection.
+    'SQLITE_CACHE_SIZE': -64000,
+    'SQLITE_MMAP_SIZE': 256 * 1024 * 1024,
+    # Milliseconds a connection waits on a locked database before raising "database is locked".
+    'SQLITE_BUSY_TIMEOUT': 5000,
+}
+
+SQLITE_PRAGMAS = {
+    'SQLITE_JOURNAL_MODE': 'journal_mode',
+    'SQLITE_SYNCHRONOUS': 'synchronous',
+    'SQLITE_CACHE_SIZE': 'cache_size',
+    'SQLITE_MMAP_SIZE': 'mmap_size',
+    'SQLITE_BUSY_TIMEOUT': 'busy_timeout',
+}
+
+
+def engine_config(config=None) -> dict:
+    """ Returns the engine settings, with any SQLITE_* keys in config overriding the defaults. """
+    settings = dict(DEFAULT_ENGINE_CONFIG)
+    if config is not None:
+        settings.update((key, config[key]) for key in DEFAULT_ENGINE_CONFIG if key in config)
+    return settings
+
+
+def create_database_engine(database_uri: str, config=None, echo=False):
+    settings = engine_config(config)
+
+    if make_url(database_uri).database in (None, '', ':memory:'):
+        # An in-memory database lives in a single connection, so leave SQLAlchemy's own pooling for it.
+        pool_args = {}
+    elif settings['SQLITE_POOL'] == 'null':
+        pool_args = {'poolclass': NullPool}
+    elif settings['SQLITE_POOL'] == 'queue':
+        pool_args = {'poolclass': QueuePool,
+                     'pool_size': settings['SQLITE_POOL_SIZE'],
+                     'max_overflow': settings['SQLITE_MAX_OVERFLOW']}
+    else:
+        raise ValueError(f"Unknown SQLITE_POOL setting: {settings['SQLITE_POOL']}")
+
+    database_engine = create_engine(database_uri, connect_args={"check_same_thread": False}, echo=echo,
+                                    **pool_args)
+
+    pragmas = [(pragma, settings[key]) for key, pragma in SQLITE_PRAGMAS.items() if settings[key] is not None]
+
+    @event.listens_for(database_engine, 'connect')
+    def set_sqlite_pragmas(dbapi_connection, connection_record):
+        # Pragmas are per connection, so apply them as each pooled connection is opened.
+        cursor = dbapi_connection.cursor()
+        for pragma, value in pragmas:
+            cursor.execute(f'PRAGMA {pragma} = {value}')
+        cursor.close()
+
+    return database_engine
@@ -1,14 +1,93 @@
+import uuid
 from abc import ABC
-from typing import List, Type, Optional, Any
-
-from sqlalchemy import text, join, select
-from sqlalchemy.orm import scoped_session
+from collections import Counter
+from datetime import datetime, timezone
+from itertools import islice
+from typing import List, Type, Optional, Any, Iterable, Iterator, Tuple, Dict, Callable
+
+from sqlalchemy import text, join, select, insert, update, delete, bindparam, func, distinct, or_, and_, exists, \
+    literal, DateTime, true
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.orm import scoped_session, joinedload, selectinload
 from sqlalchemy.orm.exc import NoResultFound
 
-from games.adapters.orm import wishlist_table, game_wishlist_table, reviews_table, game_genres_table
-from games.adapters.repository import AbstractRepository
+from games.adapters.orm import games_table, publishers_table, genres_table, game_genres_table, reviews_table, \
+    wishlist_table, game_wishlist_table, game_fingerprints_table, catalog_version_table, game_versions_table
+from games.adapters.repository import AbstractRepository, RepositoryException, check_search_criteria, \
+    PRICE_CRITERIA, RELEASE_DATE_CRITERIA, GameVersion, CatalogStamp
+from games.adapters.game_cards import GameCard, GameCardCache
+from games.adapters.search import fts_match_expression, fts_matches
 from games.domainmodel.model import Game, Publisher, Genre, User, Review, Wishlist
 
+# Keep IN lists well under SQLite's limit on bound parameters per statement.
+IN_CLAUSE_BATCH_SIZE = 500
+
+
+def average_rating_of_game():
+    """ The average rating of the reviews of the game in the enclosing query, NULL if it has none. """
+    return select(func.avg(reviews_table.c.rating)) \
+        .where(reviews_table.c.game_id == games_table.c.game_id) \
+        .scalar_subquery()
+
+
+def _utc_now() -> datetime:
+    # Stored naive, as SQLite has no time zones.
+    return datetime.now(timezone.utc).replace(tzinfo=None)
+
+
+def _new_epoch() -> str:
+    return uuid.uuid4().hex
+
+
+def _bump_catalog_version(connection):
+    # Counted in the transaction of the write itself, so the version never says more or less than what was committed.
+    upsert = sqlite_insert(catalog_version_table).values(catalog_version_id=1, version=1, modified_at=_utc_now(),
+                                                         epoch=_new_epoch())
+    connection.execute(upsert.on_conflict_do_update(index_elements=['catalog_version_id'],
+                                                    set_={'version': catalog_version_table.c.version + 1,
+                                                          'modified_at': upsert.excluded.modified_at}))
+
+
+def _next_game_stamp(connection) -> int:
+    upsert = sqlite_insert(catalog_version_table).values(catalog_version_id=1, version=0, epoch=_new_epoch(),
+                                                         game_stamp=1)
+    connection.execute(upsert.on_conflict_do_update(
+        index_elements=['catalog_version_id'],
+        set_={'game_stamp': func.coalesce(catalog_version_table.c.game_stamp, 0) + 1}))
+    return connection.execute(select(catalog_version_table.c.game_stamp)).scalar_one()
+
+
+def _bump_game_versions(connection, game_ids: List[int], counter: str):
+    # Sets the counter ('version', 'review_version' or 'wishlist_version') of each game that exists to a new stamp.
+    game_ids = list(dict.fromkeys(game_ids))
+    if not game_ids:
+        return
+    stamp = _next_game_stamp(connection)
+    counters = ('version', 'review_version', 'wishlist_version')
+    for start in range(0, len(game_ids), IN_CLAUSE_BATCH_SIZE):
+        upsert = sqlite_insert(game_versions_table).from_select(
+            [*counters, 'game_id', 'modified_at'],
+            select(*(literal(stamp if name == counter else 0) for name in counters), games_table.c.game_id,
+                   literal(_utc_now(), DateTime))
+            .where(games_table.c.game_id.in_(game_ids[start:start + IN_CLAUSE_BATCH_SIZE])))
+        connection.execute(upsert.on_conflict_do_update(index_elements=['game_id'],
+                                                        set_={counter: upsert.excluded[counter],
+                                                              'modified_at': upsert.excluded.modified_at}))
+
+
+def _game_row(game: Game) -> dict:
+    return {
+        'game_id': game.game_id,
+        'game_title': game.title,
+        'game_price': game.price,
+        'release_date': game.release_date,
+        'released_on': game.released_on,
+        'game_description': game.description,
+        'game_image_url': game.image_url,
+        'game_website_url': game.website_url,
+        'publisher_name': game.publisher.publisher_name if game.publisher is not None else None,
+    }
+
 
 class SessionContextManager:
     def __init__(self, session_factory):
@@ -46,6 +125,8 @@ class SqlAlchemyRepository(AbstractRepository, ABC):
 
     def __init__(self, session_factory):
         self._session_cm = SessionContextManager(session_factory)
+        # game_id -> GameCard for listings, dropped when this repository writes the game.
+        self._game_cards = GameCardCache()
 
     def close_session(self):
         self._session_cm.close_current_session()
@@ -71,17 +152,178 @@ class SqlAlchemyRepository(AbstractRepository, ABC):
         total_games = self._session_cm.session.query(Game).count()
         return total_games
 
+    def _game_ordering(self, order_by: str):
+        if order_by == 'title':
+            return Game._Game__game_title, Game._Game__game_id
+        if order_by == 'price':
+            return Game._Game__price, Game._Game__game_title, Game._Game__game_id
+        if order_by == 'release_date':
+            return Game._Game__released_on, Game._Game__game_title, Game._Game__game_id
+        if order_by == 'rating':
+            return games_table.c.average_rating.desc(), Game._Game__game_title, Game._Game__game_id
+        raise RepositoryException(f'Unsupported game ordering: {order_by}')
+
+    def get_games_page(self, offset: int, limit: int, order_by: str = 'title') -> List[Game]:
+        return self._session_cm.session.query(Game) \
+            .order_by(*self._game_ordering(order_by)) \
+            .offset(offset).limit(limit).all()
+
+    def get_games_after(self, title: str, game_id: int, limit: int) -> List[Game]:
+        # Seek past the cursor on the title index instead of skipping rows with OFFSET.
+        return self._session_cm.session.query(Game) \
+            .filter(or_(Game._Game__game_title > title,
+                        and_(Game._Game__game_title == title, Game._Game__game_id > game_id))) \
+            .order_by(*self._game_ordering('title')) \
+            .limit(limit).all()
+
+    def iter_games(self, batch_size: int = IN_CLAUSE_BATCH_SIZE) -> Iterator[Game]:
+        # One query read through a server-side cursor batch_size rows at a time. Publishers are joined in and each
+        # batch's genres loaded with one more query, rather than one per game. Yielded games that are no longer
+        # referenced drop out of the session, so memory use stays flat however large the catalog.
+        yield from self._session_cm.session.query(Game) \
+            .options(joinedload(Game._Game__publisher), selectinload(Game._Game__genres)) \
+            .order_by(*self._game_ordering('title')) \
+            .yield_per(batch_size)
+
     def add_game(self, game: Game):
         with self._session_cm as scm:
             scm.session.merge(game)
+            scm.session.flush()
+            _bump_catalog_version(scm.session.connection())
+            _bump_game_versions(scm.session.connection(), [game.game_id], 'version')
             scm.commit()
 
-    def add_multiple_games(self, games: List[Game]):
+    def add_multiple_games(self, games: Iterable[Game]):
+        # Bulk path: Core executemany inserts in one transaction instead of a merge (a SELECT then an INSERT) per
+        # game. Games already stored are left as they are; their publishers and genres are added as needed.
+        # games can be any iterable, such as GameFileCSVReader.iter_games(); it is consumed a batch at a time.
+        games = iter(games)
         with self._session_cm as scm:
-            for game in games:
-                scm.session.merge(game)
+            connection = scm.session.connection()
+            while True:
+                batch = list(islice(games, IN_CLAUSE_BATCH_SIZE))
+                if not batch:
+                    break
+                self._insert_new_games(connection, batch)
+            _bump_catalog_version(connection)
             scm.commit()
 
+    def _insert_new_games(self, connection, games: List[Game]):
+        games_by_id = dict()
+        for game in games:
+            games_by_id.setdefault(game.game_id, game)
+        stored_ids = set(connection.execute(
+            select(games_table.c.game_id).where(games_table.c.game_id.in_(list(games_by_id)))).scalars())
+        new_games = [game for game_id, game in games_by_id.items() if game_id not in stored_ids]
+        if not new_games:
+            return
+
+        self._insert_publishers_and_genres(connection, new_games)
+        connection.execute(insert(games_table), [_game_row(game) for game in new_games])
+        self._insert_genre_links(connection, new_games)
+
+    def _insert_publishers_and_genres(self, connection, games: List[Game]):
+        self._insert_publishers(connection, [game.publisher for game in games])
+        self._insert_genres(connection, [genre.genre_name for game in games for genre in game.genres])
+
+    def _insert_genre_links(self, connection, games: List[Game]):
+        genre_rows = [{'game_id': game.game_id, 'genre_name': genre.genre_name}
+                      for game in games for genre in game.genres if genre.genre_name is not None]
+        if genre_rows:
+            connection.execute(insert(game_genres_table), genre_rows)
+
+    def _insert_publishers(self, connection, publishers) -> int:
+        # Returns how many of the publishers were new.
+        names = dict.fromkeys(publisher.publisher_name for publisher in publishers
+                              if publisher is not None and publisher.publisher_name is not None)
+        if not names:
+            return 0
+        return connection.execute(sqlite_insert(publishers_table).on_conflict_do_nothing(),
+                                  [{'name': name} for name in names]).rowcount
+
+    def _insert_genres(self, connection, genre_names) -> int:
+        # Returns how many of the genres were new.
+        genre_names = dict.fromkeys(name for name in genre_names if name is not None)
+        if not genre_names:
+            return 0
+        return connection.execute(sqlite_insert(genres_table).on_conflict_do_nothing(),
+                                  [{'genre_name': name} for name in genre_names]).rowcount
+
+    def sync_games(self, fingerprinted_games: Iterable[Tuple[int, str, Callable[[], Optional[Game]]]]) \
+            -> Dict[str, int]:
+        # One transaction, so readers see the old catalog or the new one and a failed import changes nothing.
+        # Only the changed games are built and written, in executemany batches; unchanged ones cost a dict lookup.
+        counts = Counter()
+        fingerprinted_games = iter(fingerprinted_games)
+        with self._session_cm as scm:
+            connection = scm.session.connection()
+            stored_fingerprints = dict(connection.execute(
+                select(games_table.c.game_id, game_fingerprints_table.c.fingerprint)
+                .select_from(games_table.outerjoin(game_fingerprints_table))).all())
+            listed_ids = set()
+            while batch := list(islice(fingerprinted_games, IN_CLAUSE_BATCH_SIZE)):
+                new_games, changed_games, fingerprints = [], [], []
+                for game_id, fingerprint, build_game in batch:
+                    if game_id in listed_ids:
+                        continue
+                    if game_id in stored_fingerprints and stored_fingerprints[game_id] == fingerprint:
+                        listed_ids.add(game_id)
+                        counts['unchanged'] += 1
+                        continue
+                    game = build_game()
+                    if game is None:
+                        continue
+                    listed_ids.add(game_id)
+                    (changed_games if game_id in stored_fingerprints else new_games).append(game)
+                    fingerprints.append({'game_id': game_id, 'fingerprint': fingerprint})
+                if fingerprints:
+                    self._write_changed_games(connection, new_games, changed_games, fingerprints)
+                counts['added'] += len(new_games)
+                counts['updated'] += len(changed_games)
+                # New games are stamped too, later than anything an earlier version of the game had before it went.
+                _bump_game_versions(connection, [game.game_id for game in new_games + changed_games], 'version')
+
+            unlisted_ids = [game_id for game_id in stored_fingerprints if game_id not in listed_ids]
+            removed_ids = []
+            for start in range(0, len(unlisted_ids), IN_CLAUSE_BATCH_SIZE):
+                batch_ids = unlisted_ids[start:start + IN_CLAUSE_BATCH_SIZE]
+                # Games users have reviewed or wishlisted stay, so their reviews and wishlists stay whole.
+                user_game_ids = set(connection.execute(
+                    select(reviews_table.c.game_id).where(reviews_table.c.game_id.in_(batch_ids))
+                    .union(select(game_wishlist_table.c.game_id).where(game_wishlist_table.c.game_id.in_(batch_ids)))
+                ).scalars())
+                removed_ids += [game_id for game_id in batch_ids if game_id not in user_game_ids]
+                counts['kept'] += len(user_game_ids)
+            for start in range(0, len(removed_ids), IN_CLAUSE_BATCH_SIZE):
+                batch_ids = removed_ids[start:start + IN_CLAUSE_BATCH_SIZE]
+                for table in (game_genres_table, game_fingerprints_table, game_versions_table, games_table):
+                    connection.execute(delete(table).where(table.c.game_id.in_(batch_ids)))
+            counts['removed'] = len(removed_ids)
+            if counts['added'] or counts['updated'] or counts['removed']:
+                _bump_catalog_version(connection)
+            scm.commit()
+        return {key: counts[key] for key in ('added', 'updated', 'removed', 'kept', 'unchanged')}
+
+    def _write_changed_games(self, connection, new_games: List[Game], changed_games: List[Game],
+                             fingerprints: List[dict]):
+        self._insert_publishers_and_genres(connection, new_games + changed_games)
+        if new_games:
+            connection.execute(insert(games_table), [_game_row(game) for game in new_games])
+        if changed_games:
+            # executemany needs bind names that differ from the column names being set.
+            columns = [column for column in _game_row(changed_games[0]) if column != 'game_id']
+            connection.execute(
+                update(games_table).where(games_table.c.game_id == bindparam('changed_game_id'))
+                .values({column: bindparam(f'changed_{column}') for column in columns}),
+                [{f'changed_{column}': value for column, value in _game_row(game).items()} for game in changed_games])
+            connection.execute(delete(game_genres_table).where(
+                game_genres_table.c.game_id.in_([game.game_id for game in changed_games])))
+        self._insert_genre_links(connection, new_games + changed_games)
+        upsert = sqlite_insert(game_fingerprints_table)
+        connection.execute(upsert.on_conflict_do_update(index_elements=['game_id'],
+                                                        set_={'fingerprint': upsert.excluded.fingerprint}),
+                           fingerprints)
+
     # region Publisher data
     def get_publishers(self) -> list[Type[Publisher]]:
         publishers = self._session_cm.session.query(Publisher).all()
@@ -90,12 +332,14 @@ class SqlAlchemyRepository(AbstractRepository, ABC):
     def add_publisher(self, publisher: Publisher):
         with self._session_cm as scm:
             scm.session.merge(publisher)
+            _bump_catalog_version(scm.session.connection())
             scm.commit()
 
     def add_multiple_publishers(self, publishers: List[Publisher]):
         with self._session_cm as scm:
-            for publisher in publishers:
-                scm.session.merge(publisher)
+            # Publishers already stored change nothing, so they leave the catalog version alone.
+            if self._insert_publishers(scm.session.connection(), publishers):
+                _bump_catalog_version(scm.session.connection())
             scm.commit()
 
     # region Genre_data
@@ -106,12 +350,14 @@ class SqlAlchemyRepository(AbstractRepository, ABC):
     def add_genre(self, genre: Genre):
         with self._session_cm as scm:
             scm.session.merge(genre)
+            _bump_catalog_version(scm.session.connection())
             scm.commit()
 
     def add_multiple_genres(self, genres: List[str]):
         with self._session_cm as scm:
-            for genre in genres:
-                scm.session.merge(Genre(genre))
+            # Likewise genres already stored.
+            if self._insert_genres(scm.session.connection(), genres):
+                _bump_catalog_version(scm.session.connection())
             scm.commit()
 
     # Game Description region
@@ -119,6 +365,50 @@ class SqlAlchemyRepository(AbstractRepository, ABC):
         game = self.get_game(game_id)
         return game
 
+    def get_games_by_ids(self, game_ids) -> List[Game]:
+        game_ids = [int(game_id) for game_id in game_ids]
+        games_by_id = {}
+        for start in range(0, len(game_ids), IN_CLAUSE_BATCH_SIZE):
+            batch = game_ids[start:start + IN_CLAUSE_BATCH_SIZE]
+            games = self._session_cm.session.query(Game).filter(Game._Game__game_id.in_(batch)).all()
+            games_by_id.update((game.game_id, game) for game in games)
+        return [games_by_id.get(game_id) for game_id in game_ids]
+
+    def get_catalog_version(self) -> int:
+        version = self._session_cm.session.execute(select(catalog_version_table.c.version)).scalar()
+        return version or 0
+
+    def get_catalog_last_modified(self) -> Optional[datetime]:
+        return self._session_cm.session.execute(select(catalog_version_table.c.modified_at)).scalar()
+
+    def get_catalog_epoch(self) -> Optional[str]:
+        return self._session_cm.session.execute(select(catalog_version_table.c.epoch)).scalar()
+
+    def get_catalog_stamp(self) -> CatalogStamp:
+        row = self._session_cm.session.execute(
+            select(catalog_version_table.c.version, catalog_version_table.c.epoch,
+                   catalog_version_table.c.modified_at)).one_or_none()
+        if row is None:
+            return CatalogStamp(0, None, None)
+        return CatalogStamp(*row)
+
+    def get_game_version(self, game_id: int) -> Optional[GameVersion]:
+        # The game's row by primary key, with its versions and the one catalog_version row joined on.
+        row = self._session_cm.session.execute(
+            select(games_table.c.game_id, game_versions_table.c.version, game_versions_table.c.review_version,
+                   game_versions_table.c.wishlist_version,
+                   func.coalesce(game_versions_table.c.modified_at, catalog_version_table.c.modified_at),
+                   catalog_version_table.c.epoch)
+            .select_from(games_table.outerjoin(game_versions_table).outerjoin(catalog_version_table, true()))
+            .where(games_table.c.game_id == game_id)).one_or_none()
+        if row is None:
+            return None
+        _, version, review_version, wishlist_version, modified_at, epoch = row
+        return GameVersion(version or 0, review_version or 0, wishlist_version or 0, modified_at, epoch)
+
+    def get_game_cards(self, games: Iterable[Optional[Game]]) -> List[Optional[GameCard]]:
+        return self._game_cards.cards(games, self.get_catalog_version())
+
     def get_title_by_id(self, game_id):
         game = self.get_game(game_id)
         return game.title
@@ -143,6 +433,39 @@ class SqlAlchemyRepository(AbstractRepository, ABC):
         game = self.get_game(game_id)
         return game.price
 
+    def get_game_detail(self, game_id, username=None) -> Optional[dict]:
+        # One SELECT for the game, its publisher and genres, with the review aggregate and the
+        # user's review/wishlist state as correlated subqueries; reviews follow in a single IN load.
+        review_count = select(func.count(reviews_table.c.review_id)) \
+            .where(reviews_table.c.game_id == game_id).scalar_subquery()
+        average_rating = select(func.avg(reviews_table.c.rating)) \
+            .where(reviews_table.c.game_id == game_id).scalar_subquery()
+        user_reviewed = exists().where(reviews_table.c.game_id == game_id,
+                                       reviews_table.c.username == username)
+        in_wishlist = exists().where(game_wishlist_table.c.game_id == game_id,
+                                     game_wishlist_table.c.wishlist_id == wishlist_table.c.wishlist_id,
+                                     wishlist_table.c.username == username)
+        row = self._session_cm.session.query(Game, review_count, average_rating,
+                                             user_reviewed.label('user_reviewed'),
+                                             in_wishlist.label('in_wishlist')) \
+            .options(joinedload(Game._Game__publisher),
+                     joinedload(Game._Game__genres),
+                     selectinload(Game._Game__reviews)) \
+            .filter(Game._Game__game_id == game_id).one_or_none()
+        if row is None:
+            return None
+        game, review_count, average_rating, user_reviewed, in_wishlist = row
+        return {
+            'game': game,
+            'publisher': game.publisher,
+            'genres': [genre.genre_name for genre in game.genres],
+            'reviews': list(game.reviews),
+            'review_count': review_count,
+            'average_rating': average_rating or 0,
+            'user_reviewed': bool(user_reviewed),
+            'in_wishlist': bool(in_wishlist),
+        }
+
     # User region
     def get_user(self, username: str) -> Optional[User]:
         user = None
@@ -159,60 +482,47 @@ class SqlAlchemyRepository(AbstractRepository, ABC):
 
     # wishlist region
     def get_wishlist(self, username):
-        # Query the Wishlist table to get wishlist_ids for the given username
-        wishlist_ids = self._session_cm.session.query(wishlist_table.c.wishlist_id).filter_by(username=username).all()
-
-        # Extract the wishlist_ids from the query result
-        wishlist_ids = [row[0] for row in wishlist_ids]
-
-        if wishlist_ids:
-            # Query the game_wishlist table to get the game_ids for the user's wishlists
-            game_ids = self._session_cm.session.query(game_wishlist_table.c.game_id) \
-                .filter(
-                game_wishlist_table.c.wishlist_id.in_(wishlist_ids)
-            ).all()
-
-            # Extract the game_ids from the query result
-            game_ids = [row[0] for row in game_ids]
+        # Each user has a single wishlist row, so one indexed join lists their games.
+        game_ids = self._session_cm.session.query(game_wishlist_table.c.game_id) \
+            .join(wishlist_table, wishlist_table.c.wishlist_id == game_wishlist_table.c.wishlist_id) \
+            .filter(wishlist_table.c.username == username) \
+            .order_by(game_wishlist_table.c.id).all()
 
-            return game_ids
-
-        return []  # Return an empty list if the user's wishlists don't exist
+        return [row[0] for row in game_ids]
 
     def add_to_wishlist(self, username, game_id):
-        # Create a new wishlist entry
-        wishlist_insert = wishlist_table.insert().values(username=username)
-
-        # Execute the insert statement to add the user to the wishlist table
-        result = self._session_cm.session.execute(wishlist_insert)
-
-        # Get the wishlist_id from the inserted row
-        wishlist_id = result.inserted_primary_key[0]
-
-        # Create a new game_wishlist entry
-        game_wishlist_insert = game_wishlist_table.insert().values(game_id=game_id, wishlist_id=wishlist_id)
-
-        # Execute the insert statement to add the game to the user's wishlist
+        # Create the user's wishlist the first time it is used; the unique username index makes this a no-op after.
+        wishlist_insert = sqlite_insert(wishlist_table).values(username=username).on_conflict_do_nothing()
+        self._session_cm.session.execute(wishlist_insert)
+
+        # Link the game to that wishlist, ignoring games that are already on it.
+        game_wishlist_insert = sqlite_insert(game_wishlist_table).from_select(
+            ['wishlist_id', 'game_id'],
+            select(wishlist_table.c.wishlist_id, literal(int(game_id))).where(wishlist_table.c.username == username)
+        ).on_conflict_do_nothing()
         self._session_cm.session.execute(game_wishlist_insert)
+        _bump_game_versions(self._session_cm.session.connection(), [int(game_id)], 'wishlist_version')
 
         # Commit the changes
         self._session_cm.session.commit()
 
     def remove_from_wishlist(self, username, game_id):
-        # Query the Wishlist table to get wishlist_ids for the given username
-        with self._session_cm as scm:
-            wishlist_ids = scm.session.query(wishlist_table.c.wishlist_id).filter_by(username=username).all()
-
-        # Extract the wishlist_ids from the query result
-        wishlist_ids = [row[0] for row in wishlist_ids]
-
-        if wishlist_ids:
-            delete_statement = game_wishlist_table.delete().where(
-                (game_wishlist_table.c.game_id == game_id)
-            )
+        self.remove_multiple_from_wishlist(username, [game_id])
 
-            self._session_cm.session.execute(delete_statement)
-            self._session_cm.session.commit()
+    def remove_multiple_from_wishlist(self, username, game_ids):
+        # Delete only this user's links, by (wishlist_id, game_id) on the unique index.
+        user_wishlist_id = select(wishlist_table.c.wishlist_id) \
+            .where(wishlist_table.c.username == username).scalar_subquery()
+        game_ids = [int(game_id) for game_id in game_ids]
+        with self._session_cm as scm:
+            for start in range(0, len(game_ids), IN_CLAUSE_BATCH_SIZE):
+                delete_statement = game_wishlist_table.delete().where(
+                    game_wishlist_table.c.wishlist_id == user_wishlist_id,
+                    game_wishlist_table.c.game_id.in_(game_ids[start:start + IN_CLAUSE_BATCH_SIZE])
+                )
+                scm.session.execute(delete_statement)
+            _bump_game_versions(scm.session.connection(), game_ids, 'wishlist_version')
+            scm.commit()
 
     # review region
     def add_review(self, review):
@@ -220,19 +530,28 @@ class SqlAlchemyRepository(AbstractRepository, ABC):
             review.game_id = review.game.game_id
             review.username = review.user.username
             scm.session.add(review)
+            scm.session.flush()
+            scm.session.execute(update(games_table)
+                                .where(games_table.c.game_id == review.game.game_id)
+                                .values(average_rating=average_rating_of_game()))
+            _bump_catalog_version(scm.session.connection())
+            _bump_game_versions(scm.session.connection(), [review.game.game_id], 'review_version')
             scm.commit()
 
     def get_reviews_by_user(self, user: User) -> list[Review] | None:
         if user is None:
             return None
-        with self._session_cm as scm:
-            reviews_args = scm.session.query(reviews_table).filter_by(username=user.username).all()
-            reviews = []
-
-            for _, comment, rating, game_id, _ in reviews_args:
-                game = self.get_game(game_id)
-                reviews.append(Review(user, game, rating, comment))
-            return reviews
+        # Load each review's game in the same query rather than one get_game() per review.
+        # This is a plain read, so the session isn't rolled back and the games stay loaded.
+        reviews_args = self._session_cm.session.query(reviews_table.c.comment, reviews_table.c.rating, Game) \
+            .join(Game, Game._Game__game_id == reviews_table.c.game_id) \
+            .filter(reviews_table.c.username == user.username) \
+            .order_by(reviews_table.c.review_id).all()
+        reviews = []
+
+        for comment, rating, game in reviews_args:
+            reviews.append(Review(user, game, rating, comment))
+        return reviews
 
     def get_reviews_by_game(self, game) -> list[Type[Review]]:
         with self._session_cm as scm:
@@ -243,11 +562,89 @@ class SqlAlchemyRepository(AbstractRepository, ABC):
             return scm.session.query(Review).filter_by(game_id=game_id, username=username).all()
 
     # other
+    def _games_by_genre_query(self, genre_name: str, order_by: str = 'title'):
+        return self._session_cm.session.query(Game) \
+            .join(game_genres_table, game_genres_table.c.game_id == Game._Game__game_id) \
+            .filter(game_genres_table.c.genre_name == genre_name) \
+            .order_by(*self._game_ordering(order_by))
+
     def get_games_by_genre(self, genre_name: str) -> List[Game]:
-        return list(filter(lambda game: genre_name in [genre.genre_name for genre in game.genres], self.get_games()))
+        return self._games_by_genre_query(genre_name).all()
+
+    def get_games_by_genre_page(self, genre_name: str, offset: int, limit: int, order_by: str = 'title') -> List[Game]:
+        return self._games_by_genre_query(genre_name, order_by).offset(offset).limit(limit).all()
+
+    def get_number_of_games_by_genre(self, genre_name: str) -> int:
+        count_statement = select(func.count(distinct(game_genres_table.c.game_id))) \
+            .where(game_genres_table.c.genre_name == genre_name)
+        return self._session_cm.session.execute(count_statement).scalar()
 
     def get_rated_games_for_user(self, user: User) -> List[Game]:
         pass
 
-    def search_games(self, query: str) -> List[Game]:
-        pass
+    def _search_query(self, criteria: dict):
+        # Returns the query for the games matching criteria with its ordering, or None if nothing can match.
+        check_search_criteria(criteria)
+        games_query = self._session_cm.session.query(Game)
+        ordering = []
+
+        for key in ('title', 'text'):
+            if key in criteria:
+                match_expression = fts_match_expression(criteria[key], in_description=key == 'text')
+                if match_expression is None:
+                    return None
+                # The FTS5 index finds and ranks the matches.
+                matches = fts_matches(match_expression, name=f'{key}_matches')
+                games_query = games_query.join(matches, matches.c.game_id == Game._Game__game_id)
+                ordering.append(matches.c.score)
+
+        if 'game_id' in criteria:
+            games_query = games_query.filter(Game._Game__game_id == int(criteria['game_id']))
+        if 'price' in criteria:
+            games_query = games_query.filter(Game._Game__price == float(criteria['price']))
+        if 'min_price' in criteria:
+            games_query = games_query.filter(Game._Game__price >= float(criteria['min_price']))
+        if 'max_price' in criteria:
+            games_query = games_query.filter(Game._Game__price <= float(criteria['max_price']))
+        if 'min_release_date' in criteria:
+            games_query = games_query.filter(Game._Game__released_on >= criteria['min_release_date'])
+        if 'max_release_date' in criteria:
+            games_query = games_query.filter(Game._Game__released_on <= criteria['max_release_date'])
+        if any(key in criteria for key in PRICE_CRITERIA):
+            ordering.append(Game._Game__price)
+        elif any(key in criteria for key in RELEASE_DATE_CRITERIA):
+            ordering.append(Game._Game__released_on)
+        if 'genre' in criteria:
+            games_query = games_query.filter(exists().where(
+                game_genres_table.c.genre_name == criteria['genre'],
+                game_genres_table.c.game_id == Game._Game__game_id))
+        if 'publisher' in criteria:
+            # A range on the indexed column rather than LIKE, which SQLite can't answer from a case-sensitive index.
+            prefix = criteria['publisher']
+            games_query = games_query.filter(games_table.c.publisher_name >= prefix,
+                                             games_table.c.publisher_name < prefix + '\U0010ffff')
+
+        return games_query, ordering + list(self._game_ordering('title'))
+
+    def search(self, criteria: dict, offset: int = 0, limit: Optional[int] = None) -> List[Game]:
+        search_query = self._search_query(criteria)
+        if search_query is None:
+            return []
+        games_query, ordering = search_query
+        games_query = games_query.order_by(*ordering).offset(offset)
+        if limit is not None:
+            games_query = games_query.limit(limit)
+        return games_query.all()
+
+    def get_number_of_games_matching(self, criteria: dict) -> int:
+        search_query = self._search_query(criteria)
+        if search_query is None:
+            return 0
+        return search_query[0].count()
+
+    def search_games(self, query: str, offset: int = 0, limit: Optional[int] = None,
+                     in_description: bool = False) -> List[Game]:
+        return self.search({'text' if in_description else 'title': query}, offset, limit)
+
+    def get_number_of_search_results(self, query: str, in_description: bool = False) -> int:
+        return self.get_number_of_games_matching({'text' if in_description else 'title': query})
@@ -0,0 +1,109 @@
+import uuid
+
+from sqlalchemy import inspect, select, func, update, delete, bindparam
+from sqlalchemy.schema import CreateColumn
+
+from games.adapters.database_repository import average_rating_of_game
+from games.adapters.orm import mapper_registry, wishlist_table, game_wishlist_table, games_table, \
+    game_fingerprints_table, catalog_version_table, game_versions_table
+from games.adapters.search import create_search_index
+from games.domainmodel.model import parse_release_date
+
+
+def upgrade_database(engine):
+    """ Brings an existing database up to the current schema in place, without repopulating it. """
+    with engine.begin() as connection:
+        table_names = inspect(connection).get_table_names()
+
+        if 'wishlist' in table_names and 'game_wishlist' in table_names:
+            collapse_duplicate_wishlists(connection)
+
+        if 'games' in table_names:
+            game_columns = {column['name'] for column in inspect(connection).get_columns('games')}
+            if 'released_on' not in game_columns:
+                add_released_on(connection)
+            if 'average_rating' not in game_columns:
+                add_average_rating(connection)
+            # Games imported before fingerprints were kept have none, so the next re-import rewrites them once.
+            game_fingerprints_table.create(connection, checkfirst=True)
+            game_versions_table.create(connection, checkfirst=True)
+            if 'catalog_version' in table_names:
+                catalog_version_columns = {column['name']
+                                           for column in inspect(connection).get_columns('catalog_version')}
+                for column in ('modified_at', 'epoch', 'game_stamp'):
+                    if column not in catalog_version_columns:
+                        column_ddl = CreateColumn(catalog_version_table.c[column]).compile(dialect=connection.dialect)
+                        connection.exec_driver_sql(f'ALTER TABLE catalog_version ADD COLUMN {column_ddl}')
+                if 'game_stamp' not in catalog_version_columns:
+                    add_catalog_stamps(connection)
+            else:
+                catalog_version_table.create(connection)
+
+        # create_all() only builds indexes for tables it creates, so add any missing ones to existing tables.
+        for table in mapper_registry.metadata.sorted_tables:
+            if table.name in table_names:
+                for index in table.indexes:
+                    index.create(connection, checkfirst=True)
+
+        if 'games' in table_names and 'games_fts' not in table_names:
+            create_search_index(games_table, connection)
+
+
+def collapse_duplicate_wishlists(connection):
+    # Older databases created a new wishlist row on every add. Move every game onto the user's first
+    # wishlist, drop the duplicate links that leaves behind, then drop the emptied wishlist rows.
+    first_wishlist = wishlist_table.alias('first_wishlist')
+    owner_wishlist = wishlist_table.alias('owner_wishlist')
+    first_wishlist_id = select(func.min(first_wishlist.c.wishlist_id)) \
+        .where(first_wishlist.c.username == owner_wishlist.c.username,
+               owner_wishlist.c.wishlist_id == game_wishlist_table.c.wishlist_id) \
+        .scalar_subquery()
+    connection.execute(
+        update(game_wishlist_table)
+        .values(wishlist_id=first_wishlist_id)
+        .where(game_wishlist_table.c.wishlist_id.in_(select(wishlist_table.c.wishlist_id)))
+    )
+
+    links = game_wishlist_table.alias('links')
+    kept_link_ids = select(func.min(links.c.id)).group_by(links.c.wishlist_id, links.c.game_id)
+    connection.execute(delete(game_wishlist_table).where(game_wishlist_table.c.id.not_in(kept_link_ids)))
+
+    wishlists = wishlist_table.alias('wishlists')
+    kept_wishlist_ids = select(func.min(wishlists.c.wishlist_id)).group_by(wishlists.c.username)
+    connection.execute(delete(wishlist_table).where(wishlist_table.c.wishlist_id.not_in(kept_wishlist_ids)))
+
+
+def add_released_on(connection):
+    # Older databases only have the display string. Add the date column and fill it in from that string.
+    column_ddl = CreateColumn(games_table.c.released_on).compile(dialect=connection.dialect)
+    connection.exec_driver_sql(f'ALTER TABLE games ADD COLUMN {column_ddl}')
+
+    released_on = []
+    for game_id, release_date in connection.execute(select(games_table.c.game_id, games_table.c.release_date)):
+        try:
+            released_on.append({'id': game_id, 'released_on': parse_release_date(release_date)})
+        except (ValueError, TypeError):
+            # Leave dates the app could never have parsed empty.
+            continue
+    if released_on:
+        connection.execute(
+            update(games_table).where(games_table.c.game_id == bindparam('id'))
+            .values(released_on=bindparam('released_on')),
+            released_on
+        )
+
+
+def add_average_rating(connection):
+    column_ddl = CreateColumn(games_table.c.average_rating).compile(dialect=connection.dialect)
+    connection.exec_driver_sql(f'ALTER TABLE games ADD COLUMN {column_ddl}')
+    if 'reviews' in inspect(connection).get_table_names():
+        connection.execute(update(games_table).values(average_rating=average_rating_of_game()))
+
+
+def add_catalog_stamps(connection):
+    # Older databases counted each game's writes from zero. Stamp on from the highest count, so no game's versions
+    # go back, and give the catalog its epoch.
+    highest_count = select(func.max(func.max(game_versions_table.c.version, game_versions_table.c.review_version,
+                                             game_versions_table.c.wishlist_version))).scalar_subquery()
+    connection.execute(update(catalog_version_table).values(game_stamp=func.coalesce(highest_count, 0),
+                                                            epoch=uuid.uuid4().hex))
@@ -1,59 +1,320 @@
 import csv
+import hashlib
+import io
+import mmap
 import os
-from typing import List, Any
+import sys
+from collections import deque
+from concurrent.futures import Executor, ProcessPoolExecutor
+from functools import partial
+from itertools import islice
+from typing import List, Any, Iterator, Iterable, Tuple, Callable, Optional
 
+from games.adapters.datareader.snapshot import load_snapshot, write_snapshot
 from games.domainmodel.model import Genre, Game, Publisher, User
 
+# The only columns a Game is built from; the heavy ones (Reviews, Tags, Screenshots, Movies, ...) are never read.
+PROJECTED_COLUMNS = ("AppID", "Name", "Release date", "Price", "About the game", "Head Image", "Website",
+                     "Publishers", "Genres")
+
+# Descriptions and image lists in Steam dumps can run past the csv module's default 128 KiB field limit.
+csv.field_size_limit(min(sys.maxsize, 2 ** 31 - 1))
+
+# Parallel reads hand each worker process byte ranges of about this size.
+BYTE_RANGE_SIZE = 8 * 1024 * 1024
+# Rows read from a snapshot are handed to worker processes in batches of this many to build their games.
+GAME_BATCH_SIZE = 2000
+
+
+def _record_end(data, position: int, in_quotes: bool) -> int:
+    # Returns the offset just past the first newline at or after position that is outside a quoted field.
+    # A quoted "" toggles twice, so escaped quotes need no special handling.
+    newline = -1
+    while True:
+        if in_quotes:
+            quote = data.find(b'"', position)
+            if quote == -1:
+                return len(data)
+            in_quotes = False
+            position = quote + 1
+            continue
+        if newline < position:
+            newline = data.find(b'\n', position)
+            if newline == -1:
+                return len(data)
+        quote = data.find(b'"', position, newline)
+        if quote == -1:
+            return newline + 1
+        in_quotes = True
+        position = quote + 1
+
+
+def _count_quotes(data, start: int, end: int) -> int:
+    return sum(data[block:min(block + BYTE_RANGE_SIZE, end)].count(b'"')
+               for block in range(start, end, BYTE_RANGE_SIZE))
+
+
+def record_ranges(filename: str, parts: int) -> Tuple[bytes, List[Tuple[int, int]]]:
+    """ Splits a CSV file into about parts byte ranges that each hold whole records, so a quoted field with
+    newlines in it never straddles two ranges. Returns the header line and the [start, end) ranges after it. """
+    if os.path.getsize(filename) == 0:
+        return b'', []
+    with open(filename, 'rb') as file, mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ) as data:
+        header_end = _record_end(data, 0, False)
+        boundaries = [header_end]
+        range_size = max((len(data) - header_end) // max(parts, 1), 1)
+        for split in range(header_end + range_size, len(data), range_size):
+            if split <= boundaries[-1]:
+                continue
+            # Every boundary is outside quotes, so the quotes counted since the last one say whether split is inside.
+            in_quotes = _count_quotes(data, boundaries[-1], split) % 2 == 1
+            boundary = _record_end(data, split, in_quotes)
+            if boundary >= len(data):
+                break
+            boundaries.append(boundary)
+        boundaries.append(len(data))
+        header = data[:header_end]
+    return header, [(start, end) for start, end in zip(boundaries, boundaries[1:]) if start < end]
+
+
+def project_rows(rows: Iterable[List[str]], positions: List[int]) -> Iterator[List[str]]:
+    """ Picks the PROJECTED_COLUMNS, at the given positions, out of each csv row. """
+    for row in rows:
+        try:
+            yield [row[position] for position in positions]
+        except IndexError:
+            print(f"Skipping row due to missing columns: {row[:1]}")
+
+
+def row_fingerprint(values: List[str]) -> str:
+    """ Hashes a row of the PROJECTED_COLUMNS, so a re-import can tell which games changed since the last one. """
+    return hashlib.blake2b('\x1f'.join(values).encode('utf-8'), digest_size=16).hexdigest()
+
+
+def _read_byte_range(filename: str, positions: List[int], byte_range: Tuple[int, int]) -> List[List[str]]:
+    # Runs in a worker process: parses one range of records into projected rows.
+    start, end = byte_range
+    with open(filename, 'rb') as file:
+        file.seek(start)
+        text = file.read(end - start).decode('utf-8')
+    return list(project_rows(csv.reader(io.StringIO(text, newline='')), positions))
+
+
+def _build_games(filename: str, rows: List[List[str]]) -> List[Optional[Game]]:
+    # Runs in a worker process: builds the game of each row, None for a row with invalid data. Building is the date
+    # parsing and validation of every property, so it is as much work as parsing. The games come with this worker's
+    # own publishers and genres, which the reader swaps for its shared ones.
+    reader = GameFileCSVReader(filename)
+    return [next(reader.games_from_rows([values]), None) for values in rows]
+
+
+def _read_and_build_byte_range(filename: str, positions: List[int], byte_range: Tuple[int, int]) \
+        -> List[Tuple[List[str], Optional[Game]]]:
+    # Runs in a worker process: parses one range of records and builds their games. The rows come back too, for
+    # the snapshot.
+    rows = _read_byte_range(filename, positions, byte_range)
+    return list(zip(rows, _build_games(filename, rows)))
+
+
+def _map_in_order(executor: Executor, function: Callable, items: Iterable, window: int) -> Iterator[Tuple[Any, Any]]:
+    """ Yields each item with function(item), run in the executor, in the order of items. Unlike executor.map, only
+    window items are submitted ahead of the one waited on, so a long iterable is never read in whole. """
+    pending = deque()
+    for item in items:
+        pending.append((item, executor.submit(function, item)))
+        if len(pending) >= window:
+            item, future = pending.popleft()
+            yield item, future.result()
+    while pending:
+        item, future = pending.popleft()
+        yield item, future.result()
+
 
 class GameFileCSVReader:
-    def __init__(self, filename):
+    def __init__(self, filename, snapshot: bool = False):
         self.__filename = filename
+        # Whether to read the file from, and keep, a binary snapshot of its rows (see snapshot.py).
+        self.__snapshot = snapshot
         self.__dataset_of_games = []
-        self.__dataset_of_publishers = list()
-        self.__dataset_of_genres = list()
+        # Publishers and genres by name, so each one is a single shared object however many games use it.
+        self.__publishers = dict()
+        self.__genres = dict()
 
     def read_csv_file(self):
+        self.__dataset_of_games = list(self.iter_games())
+
+    def iter_games(self, processes: int = 1) -> Iterator[Game]:
+        """ Yields the games in the file one at a time, without keeping them, so memory use doesn't grow with
+        the size of the file. Publishers and genres are interned as they are met.
+
+        With processes > 1 the file is parsed, and the games built, in byte ranges by a pool of worker processes.
+        Games still come out in file order.
+
+        With snapshot set, a snapshot of the file's rows is read instead of the file if it is up to date, and written
+        alongside the file if it isn't. The pool then only builds the games. """
+        for _, game in self.__iter_built_rows(processes):
+            yield game
+
+    def iter_fingerprinted_games(self, processes: int = 1, built: bool = False) \
+            -> Iterator[Tuple[int, str, Callable[[], Optional[Game]]]]:
+        """ Yields the game id, the row_fingerprint and a function building the game for each row. Building a game
+        is most of the cost of reading one, so a re-import only builds the games whose rows changed. The function
+        returns None for a row with invalid data.
+
+        With built set every game is built up front, as iter_games builds them, for a first load that needs them
+        all. Rows with invalid data are skipped and the functions only return the games. """
+        if built:
+            for values, game in self.__iter_built_rows(processes):
+                yield game.game_id, row_fingerprint(values), lambda game=game: game
+            return
+        for values in self.__iter_rows(processes):
+            try:
+                game_id = int(values[0])
+            except ValueError as e:
+                print(f"Skipping row due to invalid data: {e}")
+                continue
+            yield game_id, row_fingerprint(values), partial(self.__build_game, values)
+
+    def __build_game(self, values: List[str]) -> Optional[Game]:
+        return next(self.games_from_rows([values]), None)
+
+    def __iter_built_rows(self, processes: int) -> Iterator[Tuple[List[str], Game]]:
+        # Yields each row with the game built from it, skipping rows with invalid data.
+        if processes <= 1:
+            for values in self.__iter_rows(processes):
+                game = self.__build_game(values)
+                if game is not None:
+                    yield values, game
+            return
+        if not os.path.exists(self.__filename):
+            print(f"path {self.__filename} does not exist!")
+            return
+        with ProcessPoolExecutor(processes) as executor:
+            rows = load_snapshot(self.__filename, PROJECTED_COLUMNS) if self.__snapshot else None
+            if rows is not None:
+                # The rows are already parsed, so the workers only build their games.
+                batches = iter(lambda: list(islice(rows, GAME_BATCH_SIZE)), [])
+                built_rows = ((values, game) for batch, games in _map_in_order(
+                    executor, partial(_build_games, self.__filename), batches, 2 * processes)
+                              for values, game in zip(batch, games))
+            else:
+                built_rows = self.__read_and_build_in_parallel(executor, processes)
+            for values, game in built_rows:
+                if game is not None:
+                    yield values, self.__share_publisher_and_genres(game)
+
+    def __read_and_build_in_parallel(self, executor: Executor, processes: int) \
+            -> Iterator[Tuple[List[str], Optional[Game]]]:
+        built_rows = (built_row for _, built_rows in self.__map_byte_ranges(executor, processes,
+                                                                              _read_and_build_byte_range)
+                      for built_row in built_rows)
+        if not self.__snapshot:
+            yield from built_rows
+            return
+        # The snapshot writer takes rows and passes them back a batch later, so each row's game waits in line.
+        games = deque()
+
+        def rows():
+            for values, game in built_rows:
+                games.append(game)
+                yield values
+
+        for values in write_snapshot(self.__filename, PROJECTED_COLUMNS, rows()):
+            yield values, games.popleft()
+
+    def __iter_rows(self, processes: int) -> Iterator[List[str]]:
         if not os.path.exists(self.__filename):
             print(f"path {self.__filename} does not exist!")
             return
-        with open(self.__filename, 'r', encoding='utf-8-sig') as file:
-            reader = csv.DictReader(file)
-            for row in reader:
-                try:
-                    game_id = int(row["AppID"])
-                    title = row["Name"]
-                    game = Game(game_id, title)
-                    game.release_date = row["Release date"]
-                    game.price = float(row["Price"])
-                    game.description = row["About the game"]
-                    game.image_url = row['Head Image']
-                    game.website_url=row['Website']
-
-                    publisher = Publisher(row["Publishers"])
-                    self.__dataset_of_publishers.append(publisher)
-                    game.publisher = publisher
-
-                    genre_names = row["Genres"].split(",")
-                    for genre_name in genre_names:
-                        genre = Genre(genre_name.strip())
-                        self.__dataset_of_genres.append(genre)
-                        game.add_genre(genre)
-
-                    self.__dataset_of_games.append(game)
-
-                except ValueError as e:
-                    print(f"Skipping row due to invalid data: {e}")
-                except KeyError as e:
-                    print(f"Skipping row due to missing key: {e}")
+        rows = load_snapshot(self.__filename, PROJECTED_COLUMNS) if self.__snapshot else None
+        if rows is None:
+            rows = self.__read_rows(processes)
+            if self.__snapshot:
+                rows = write_snapshot(self.__filename, PROJECTED_COLUMNS, rows)
+        yield from rows
+
+    def __read_rows(self, processes: int) -> Iterator[List[str]]:
+        if processes > 1:
+            with ProcessPoolExecutor(processes) as executor:
+                for _, rows in self.__map_byte_ranges(executor, processes, _read_byte_range):
+                    yield from rows
+            return
+        with open(self.__filename, 'r', encoding='utf-8-sig', newline='') as file:
+            reader = csv.reader(file)
+            positions = self.__column_positions(next(reader, None))
+            if positions is not None:
+                yield from project_rows(reader, positions)
+
+    def __map_byte_ranges(self, executor: Executor, processes: int, read_range: Callable) -> Iterator[Tuple[Any, Any]]:
+        # Runs read_range(filename, positions, byte_range) over the file's byte ranges in the executor. The results
+        # come back in range order, so merged they are in file order.
+        parts = max(processes, os.path.getsize(self.__filename) // BYTE_RANGE_SIZE)
+        header, ranges = record_ranges(self.__filename, parts)
+        positions = self.__column_positions(next(csv.reader([header.decode('utf-8-sig')]), None))
+        if positions is None:
+            return
+        yield from _map_in_order(executor, partial(read_range, self.__filename, positions), ranges, 2 * processes)
+
+    def __share_publisher_and_genres(self, game: Game) -> Game:
+        # Swaps a worker's copies of the game's publisher and genres for this reader's shared ones.
+        if game.publisher is not None:
+            game.publisher = self.__publishers.setdefault(game.publisher.publisher_name, game.publisher)
+        game.genres[:] = [self.__genres.setdefault(genre.genre_name, genre) for genre in game.genres]
+        return game
+
+    @staticmethod
+    def __column_positions(header):
+        if header is None:
+            return None
+        try:
+            return [header.index(column) for column in PROJECTED_COLUMNS]
+        except ValueError as e:
+            print(f"Skipping file due to missing column: {e}")
+            return None
+
+    def games_from_rows(self, rows: Iterable[List[str]]) -> Iterator[Game]:
+        """ Builds games from rows of the PROJECTED_COLUMNS, skipping rows with invalid data. """
+        for values in rows:
+            try:
+                game = self.__game_from_row(values)
+            except ValueError as e:
+                print(f"Skipping row due to invalid data: {e}")
+                continue
+            yield game
+
+    def __game_from_row(self, values: List[str]) -> Game:
+        app_id, title, release_date, price, description, image_url, website_url, publisher_name, genre_names = values
+        game = Game(int(app_id), title)
+        game.release_date = release_date
+        game.price = float(price)
+        game.description = description
+        game.image_url = image_url
+        game.website_url = website_url
+        game.publisher = self.__intern_publisher(publisher_name)
+        for genre_name in genre_names.split(","):
+            game.add_genre(self.__intern_genre(genre_name.strip()))
+        return game
+
+    def __intern_publisher(self, publisher_name: str) -> Publisher:
+        publisher = self.__publishers.get(publisher_name)
+        if publisher is None:
+            publisher = self.__publishers[publisher_name] = Publisher(publisher_name)
+        return publisher
+
+    def __intern_genre(self, genre_name: str) -> Genre:
+        genre = self.__genres.get(genre_name)
+        if genre is None:
+            genre = self.__genres[genre_name] = Genre(genre_name)
+        return genre
 
     def get_unique_games_count(self):
         return len(self.__dataset_of_games)
 
     def get_unique_genres_count(self):
-        return len(self.__dataset_of_genres)
+        return len(self.__genres)
 
     def get_unique_publishers_count(self):
-        return len(self.__dataset_of_publishers)
+        return len(self.__publishers)
 
     @property
     def dataset_of_games(self) -> list:
@@ -61,8 +322,8 @@ class GameFileCSVReader:
 
     @property
     def dataset_of_publishers(self) -> list[Any]:
-        return self.__dataset_of_publishers
+        return list(dict.fromkeys(self.__publishers.values()))
 
     @property
     def dataset_of_genres(self) -> list:
-        return sorted([genre.genre_name for genre in self.__dataset_of_genres])
+        return sorted({genre.genre_name for genre in self.__genres.values() if genre.genre_name is not None})
@@ -0,0 +1,127 @@
+import hashlib
+import json
+import mmap
+import os
+import pickle
+import struct
+from itertools import islice
+from typing import Iterable, Iterator, List, Optional, Sequence
+
+# A snapshot is the projected rows of a CSV file, pickled in batches after a small header that says which file
+# (size, mtime, SHA-256) and which columns they came from:
+#
+#   SNAPSHOT_MAGIC | header length (uint32, big-endian) | header JSON | pickled row batches ...
+SNAPSHOT_MAGIC = b'GAMESNAP'
+# Bump when the layout of the rows changes.
+SNAPSHOT_VERSION = 1
+SNAPSHOT_BATCH_SIZE = 1000
+
+_HEADER_LENGTH = struct.Struct('>I')
+
+
+def snapshot_path(filename: str) -> str:
+    return filename + '.snapshot'
+
+
+def file_digest(filename: str) -> str:
+    sha256 = hashlib.sha256()
+    with open(filename, 'rb') as file:
+        for block in iter(lambda: file.read(1024 * 1024), b''):
+            sha256.update(block)
+    return sha256.hexdigest()
+
+
+def _file_key(filename: str, columns: Sequence[str]) -> dict:
+    stat = os.stat(filename)
+    return {
+        'version': SNAPSHOT_VERSION,
+        'columns': list(columns),
+        'size': stat.st_size,
+        'mtime_ns': stat.st_mtime_ns,
+        'sha256': file_digest(filename),
+    }
+
+
+def _read_header(data) -> Optional[dict]:
+    if data[:len(SNAPSHOT_MAGIC)] != SNAPSHOT_MAGIC:
+        return None
+    start = len(SNAPSHOT_MAGIC) + _HEADER_LENGTH.size
+    header_length, = _HEADER_LENGTH.unpack(data[len(SNAPSHOT_MAGIC):start])
+    return json.loads(bytes(data[start:start + header_length]))
+
+
+def _is_current(header: Optional[dict], filename: str, columns: Sequence[str]) -> bool:
+    if header is None or header.get('version') != SNAPSHOT_VERSION or header.get('columns') != list(columns):
+        return False
+    stat = os.stat(filename)
+    if header.get('size') != stat.st_size:
+        return False
+    if header.get('mtime_ns') == stat.st_mtime_ns:
+        return True
+    # Touched but maybe not changed: only the content hash can tell.
+    return header.get('sha256') == file_digest(filename)
+
+
+def load_snapshot(filename: str, columns: Sequence[str]) -> Optional[Iterator[List[str]]]:
+    """ Returns the rows snapshotted from the CSV file, or None if there is no snapshot of the file as it is now,
+    with these columns. The snapshot is memory-mapped and the rows are unpickled a batch at a time as they are
+    iterated. """
+    try:
+        with open(snapshot_path(filename), 'rb') as file:
+            data = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+    except (OSError, ValueError):
+        return None
+    try:
+        current = _is_current(_read_header(data), filename, columns)
+    except (OSError, ValueError, struct.error):
+        current = False
+    if not current:
+        data.close()
+        return None
+    return _snapshot_rows(data)
+
+
+def _snapshot_rows(data: mmap.mmap) -> Iterator[List[str]]:
+    with data:
+        header_length, = _HEADER_LENGTH.unpack(data[len(SNAPSHOT_MAGIC):len(SNAPSHOT_MAGIC) + _HEADER_LENGTH.size])
+        data.seek(len(SNAPSHOT_MAGIC) + _HEADER_LENGTH.size + header_length)
+        # Each batch was pickled on its own, so each needs a fresh unpickler: their memos don't line up.
+        while data.tell() < len(data):
+            yield from pickle.load(data)
+
+
+def write_snapshot(filename: str, columns: Sequence[str], rows: Iterable[List[str]]) -> Iterator[List[str]]:
+    """ Passes the rows read from the CSV file through, writing them to the file's snapshot on the way.
+
+    The snapshot only replaces an existing one once every row has gone through, so a partly read file never leaves
+    a partial snapshot behind. If the snapshot can't be written the rows still come through. """
+    rows = iter(rows)
+    temporary_path = f'{snapshot_path(filename)}.{os.getpid()}.tmp'
+    file = None
+    try:
+        header = json.dumps(_file_key(filename, columns)).encode('utf-8')
+        file = open(temporary_path, 'wb')
+        file.write(SNAPSHOT_MAGIC + _HEADER_LENGTH.pack(len(header)) + header)
+    except OSError as e:
+        print(f"Not writing a snapshot of {filename}: {e}")
+    try:
+        while batch := list(islice(rows, SNAPSHOT_BATCH_SIZE)):
+            if file is not None:
+                try:
+                    pickle.dump(batch, file, protocol=pickle.HIGHEST_PROTOCOL)
+                except OSError as e:
+                    print(f"Not writing a snapshot of {filename}: {e}")
+                    file.close()
+                    file = None
+            yield from batch
+        if file is not None:
+            file.close()
+            try:
+                os.replace(temporary_path, snapshot_path(filename))
+            except OSError as e:
+                print(f"Not writing a snapshot of {filename}: {e}")
+    finally:
+        if file is not None:
+            file.close()
+        if os.path.exists(temporary_path):
+            os.remove(temporary_path)
@@ -0,0 +1,73 @@
+import threading
+from dataclasses import dataclass
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from games.domainmodel.model import Game
+
+
+@dataclass(frozen=True, slots=True)
+class GameCard:
+    """ What listing pages show of a game: plain values copied out of it once, so rendering a listing never walks
+    genres or loads the publisher again. Fields can also be read by key, like the dicts listings used to get. """
+    game_id: int
+    title: str
+    release_date: str
+    price: float
+    publisher_name: Optional[str]
+    genres: Tuple[str, ...]
+    image_url: str
+
+    @classmethod
+    def of(cls, game: Game) -> 'GameCard':
+        return cls(
+            game_id=game.game_id,
+            title=game.title,
+            release_date=game.release_date,
+            price=game.price,
+            publisher_name=game.publisher.publisher_name if game.publisher is not None else None,
+            genres=tuple(genre.genre_name for genre in game.genres),
+            image_url=game.image_url,
+        )
+
+    def __getitem__(self, key: str):
+        return getattr(self, key)
+
+
+class GameCardCache:
+    """ Game cards by game_id, all built from one catalog version. Asking for the cards of another version drops
+    them, so a game written by any process, which bumps the shared catalog version, is never shown from an old
+    card. """
+
+    def __init__(self):
+        self.__cards: Dict[int, GameCard] = dict()
+        self.__version = None
+        # Requests can be served from several threads at once.
+        self.__lock = threading.Lock()
+
+    def cards(self, games: Iterable[Optional[Game]], version: Any) -> List[Optional[GameCard]]:
+        """ Returns the card of each game, read at this catalog version, building the ones not cached yet. None
+        stays None. """
+        games = list(games)
+        with self.__lock:
+            if version != self.__version:
+                self.__cards.clear()
+                self.__version = version
+            cards = [self.__cards.get(game.game_id) if game is not None else None for game in games]
+        # Built outside the lock, since building one can load the game's publisher and genres.
+        built = dict()
+        for position, game in enumerate(games):
+            if game is not None and cards[position] is None:
+                cards[position] = built[game.game_id] = GameCard.of(game)
+        if built:
+            with self.__lock:
+                if version == self.__version:
+                    self.__cards.update(built)
+        return cards
+
+    def clear(self):
+        with self.__lock:
+            self.__cards.clear()
+            self.__version = None
+
+    def __len__(self):
+        return len(self.__cards)
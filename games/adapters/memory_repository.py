@@ -1,29 +1,257 @@
-from typing import List
+from datetime import date, datetime, timezone
+from typing import List, Optional, Iterable, Iterator, Tuple, Dict, Callable
 from games.domainmodel.model import Game, Genre, User, Review, Wishlist
-from games.adapters.repository import AbstractRepository
+from games.adapters.repository import AbstractRepository, RepositoryException, check_search_criteria, \
+    PRICE_CRITERIA, RELEASE_DATE_CRITERIA, GameVersion, CatalogStamp
 from games.adapters.datareader.csvdatareader import GameFileCSVReader
-from bisect import insort_left
+from games.adapters.game_cards import GameCard, GameCardCache
+from games.adapters.search import search_terms
+from bisect import insort, bisect_left, bisect_right
+from collections import Counter
 
 import os
+import uuid
 
 GAMES_PER_PAGE = 15
 
 
+def _title_order(game: Game):
+    # Browse order: by title, with the id breaking ties between games sharing a title.
+    return game.title or '', game.game_id
+
+
+def _price(game: Game):
+    return game.price or 0
+
+
+def _price_order(game: Game):
+    # Price search order: cheapest first, then browse order.
+    return _price(game), game.title or '', game.game_id
+
+
+def _released_on(game: Game):
+    # Games without a release date sort first, ahead of any real date.
+    return game.released_on or date.min
+
+
+def _release_order(game: Game):
+    # Release date order: oldest first, then browse order.
+    return _released_on(game), game.title or '', game.game_id
+
+
+# Range-searchable values: how to read the value from a game, the order games are kept in, the criteria on it and
+# which of them give the lower and the upper bounds. An exact price is both a lower and an upper bound.
+_RANGE_INDEXES = {
+    'price': (_price, _price_order, PRICE_CRITERIA, ('price', 'min_price'), ('price', 'max_price')),
+    'release_date': (_released_on, _release_order, RELEASE_DATE_CRITERIA, ('min_release_date',),
+                     ('max_release_date',)),
+}
+
+
+def _rating_order(average_ratings: dict):
+    # Rating order: best average rating first, games without reviews after any, then browse order.
+    def order(game: Game):
+        average_rating = average_ratings.get(game.game_id)
+        return average_rating is None, -(average_rating or 0), game.title or '', game.game_id
+    return order
+
+
+def _ranges_in(criteria: dict) -> List[str]:
+    # The range indexes the criteria search on. The first one orders the results, so price comes before release date.
+    return [name for name, (_, _, range_criteria, _, _) in _RANGE_INDEXES.items()
+            if any(key in criteria for key in range_criteria)]
+
+
+def _only_range(criteria: dict) -> Optional[str]:
+    # The range index, if the criteria are nothing but a range on it.
+    ranges = _ranges_in(criteria)
+    if len(ranges) == 1 and set(criteria) <= set(_RANGE_INDEXES[ranges[0]][2]):
+        return ranges[0]
+    return None
+
+
+def _prefix_index(games, keys_of):
+    # key -> ids of the games with that key, plus the keys in sorted order for prefix lookups.
+    game_ids_by_key = dict()
+    for game in games:
+        for key in keys_of(game):
+            game_ids_by_key.setdefault(key, set()).add(game.game_id)
+    return sorted(game_ids_by_key), game_ids_by_key
+
+
+def _publisher_names(game: Game):
+    if game.publisher is not None and game.publisher.publisher_name is not None:
+        return [game.publisher.publisher_name]
+    return []
+
+
+def _games_with_prefix(prefix_index, prefix):
+    keys, game_ids_by_key = prefix_index
+    game_ids = set()
+    position = bisect_left(keys, prefix)
+    while position < len(keys) and keys[position].startswith(prefix):
+        game_ids |= game_ids_by_key[keys[position]]
+        position += 1
+    return game_ids
+
+
 class MemoryRepository(AbstractRepository):
 
     def __init__(self):
         self.__games = list()
         self.__dataset_of_genres = list()
         self.__dataset_of_games = list()
+        self.__publishers = list()
         self.__users = list()
         self.__reviews = list()
         self.__wishlist = dict()
+        # game_id -> Game index, so lookups by id don't scan the whole catalog.
+        self.__games_by_id = dict()
+        # genre name -> games of that genre kept in title order.
+        self.__games_by_genre = dict()
+        # Title-sorted permutation of the catalog, built on first use after a change.
+        self.__games_in_title_order = None
+        # Prefix indexes over title words, description words and publisher names for search, built on first
+        # use after a change.
+        self.__prefix_indexes = None
+        # Range index name -> games in that order with a parallel list of their values to bisect, built on first
+        # use after a change.
+        self.__range_indexes = dict()
+        # Ordering -> (games in that order, genre name -> the genre's games in that order) for browsing in an order
+        # other than title order, which the indexes above keep. Built on first use after a change.
+        self.__orderings = dict()
+        # game_id -> GameCard for listings, dropped when the game is added again.
+        self.__game_cards = GameCardCache()
+        # Counts writes to the catalog, see get_catalog_version, and when the last one was.
+        self.__catalog_version = 0
+        self.__catalog_modified_at = None
+        # game_id -> GameVersion of the games written since they were added in bulk, stamped from a counter that only
+        # grows. A new repository starts over, so it has an epoch of its own.
+        self.__game_versions = dict()
+        self.__game_stamp = 0
+        self.__catalog_epoch = uuid.uuid4().hex
+        # game_id -> fingerprint of the row the game was last synced from.
+        self.__fingerprints = dict()
+
+    def __index_game(self, game: Game):
+        previous = self.__games_by_id.get(game.game_id)
+        if previous is not None:
+            for genre in previous.genres:
+                genre_games = self.__games_by_genre.get(genre.genre_name, [])
+                if previous in genre_games:
+                    genre_games.remove(previous)
+        self.__games_by_id[game.game_id] = game
+        self.__games_in_title_order = None
+        self.__prefix_indexes = None
+        self.__range_indexes = dict()
+        self.__orderings = dict()
+        self.__touch_catalog()
+        for genre in game.genres:
+            insort(self.__games_by_genre.setdefault(genre.genre_name, []), game, key=_title_order)
+
+    def __touch_catalog(self):
+        self.__catalog_version += 1
+        self.__catalog_modified_at = datetime.now(timezone.utc).replace(tzinfo=None)
+
+    def __touch_game(self, game_id: int, counter: str):
+        # Sets the game's counter ('version', 'review_version' or 'wishlist_version') to a new stamp, if the game
+        # exists.
+        if game_id not in self.__games_by_id:
+            return
+        self.__game_stamp += 1
+        game_version = self.__game_versions.get(game_id, GameVersion(0, 0, 0, None))
+        self.__game_versions[game_id] = game_version._replace(
+            **{counter: self.__game_stamp, 'modified_at': datetime.now(timezone.utc).replace(tzinfo=None)})
+
+    def __rebuild_indexes(self):
+        self.__games_in_title_order = None
+        self.__prefix_indexes = None
+        self.__range_indexes = dict()
+        self.__orderings = dict()
+        self.__touch_catalog()
+        self.__games_by_genre = dict()
+        for game in self.__games_by_id.values():
+            for genre in game.genres:
+                self.__games_by_genre.setdefault(genre.genre_name, []).append(game)
+        for games in self.__games_by_genre.values():
+            games.sort(key=_title_order)
 
     def add_game(self, game: Game):
         if isinstance(game, Game):
             # When inserting the game, keep the game list sorted alphabetically by the id.
             # Games will be sorted by game due to __lt__ method of the Game class.
-            insort_left(self.__games, game)
+            # A game added again replaces the one with its id.
+            position = bisect_left(self.__games, game)
+            if position < len(self.__games) and self.__games[position] == game:
+                self.__games[position] = game
+            else:
+                self.__games.insert(position, game)
+            self.__index_game(game)
+            self.__touch_game(game.game_id, 'version')
+
+    def add_multiple_games(self, games):
+        # Sort and index once for the whole batch rather than once per game.
+        # Games added again replace the ones with their ids, the last of a repeated id winning.
+        games = {game.game_id: game for game in games if isinstance(game, Game)}
+        self.__games = [game for game in self.__games if game.game_id not in games]
+        self.__games.extend(games.values())
+        self.__games.sort()
+        self.__games_by_id.update(games)
+        self.__rebuild_indexes()
+
+    def sync_games(self, fingerprinted_games: Iterable[Tuple[int, str, Callable[[], Optional[Game]]]]) \
+            -> Dict[str, int]:
+        counts = Counter()
+        listed_ids = set()
+        for game_id, fingerprint, build_game in fingerprinted_games:
+            if game_id in listed_ids:
+                continue
+            if game_id in self.__games_by_id and self.__fingerprints.get(game_id) == fingerprint:
+                listed_ids.add(game_id)
+                counts['unchanged'] += 1
+                continue
+            game = build_game()
+            if game is None:
+                continue
+            listed_ids.add(game_id)
+            counts['updated' if game_id in self.__games_by_id else 'added'] += 1
+            position = bisect_left(self.__games, game)
+            if position < len(self.__games) and self.__games[position] == game:
+                self.__games[position] = game
+            else:
+                self.__games.insert(position, game)
+            self.__games_by_id[game.game_id] = game
+            self.__fingerprints[game.game_id] = fingerprint
+            self.__touch_game(game.game_id, 'version')
+
+        # Games users have reviewed or wishlisted stay, so their reviews and wishlists stay whole.
+        user_game_ids = {review.game.game_id for review in self.__reviews}
+        user_game_ids.update(game_id for game_ids in self.__wishlist.values() for game_id in game_ids)
+        unlisted_ids = self.__games_by_id.keys() - listed_ids
+        removed_ids = unlisted_ids - user_game_ids
+        if removed_ids:
+            self.__games = [game for game in self.__games if game.game_id not in removed_ids]
+            for game_id in removed_ids:
+                del self.__games_by_id[game_id]
+                self.__fingerprints.pop(game_id, None)
+                self.__game_versions.pop(game_id, None)
+        counts['removed'] = len(removed_ids)
+        counts['kept'] = len(unlisted_ids) - len(removed_ids)
+        if counts['added'] or counts['updated'] or counts['removed']:
+            self.__rebuild_indexes()
+        return {key: counts[key] for key in ('added', 'updated', 'removed', 'kept', 'unchanged')}
+
+    def add_multiple_publishers(self, publishers):
+        for publisher in publishers:
+            if publisher not in self.__publishers:
+                self.__publishers.append(publisher)
+                self.__touch_catalog()
+
+    def add_multiple_genres(self, genres):
+        for genre in genres:
+            if genre not in self.__dataset_of_genres:
+                self.__dataset_of_genres.append(genre)
+                self.__touch_catalog()
 
     def get_games(self) -> List[Game]:
         return self.__games
@@ -31,47 +259,237 @@ class MemoryRepository(AbstractRepository):
     def get_number_of_games(self):
         return len(self.__games)
 
+    def __title_ordered_games(self) -> List[Game]:
+        if self.__games_in_title_order is None:
+            self.__games_in_title_order = sorted(self.__games_by_id.values(), key=_title_order)
+        return self.__games_in_title_order
+
+    def __ordering(self, order_by: str):
+        if order_by not in self.__orderings:
+            if order_by in _RANGE_INDEXES:
+                # Price and release date order are the order of their range indexes.
+                games = self.__range_index(order_by)[1]
+            elif order_by == 'rating':
+                games = sorted(self.__games_by_id.values(), key=_rating_order(self.__average_ratings()))
+            else:
+                raise RepositoryException(f'Unsupported game ordering: {order_by}')
+            # Walking the ordered catalog once puts every genre's games in the same order.
+            games_by_genre = dict()
+            for game in games:
+                for genre in game.genres:
+                    games_by_genre.setdefault(genre.genre_name, []).append(game)
+            self.__orderings[order_by] = (games, games_by_genre)
+        return self.__orderings[order_by]
+
+    def __average_ratings(self) -> dict:
+        totals = Counter()
+        counts = Counter()
+        for review in self.__reviews:
+            totals[review.game.game_id] += review.rating
+            counts[review.game.game_id] += 1
+        return {game_id: totals[game_id] / count for game_id, count in counts.items()}
+
+    def get_games_page(self, offset: int, limit: int, order_by: str = 'title') -> List[Game]:
+        if order_by == 'title':
+            return self.__title_ordered_games()[offset:offset + limit]
+        return self.__ordering(order_by)[0][offset:offset + limit]
+
+    def get_games_after(self, title: str, game_id: int, limit: int) -> List[Game]:
+        games = self.__title_ordered_games()
+        start = bisect_right(games, (title or '', game_id), key=_title_order)
+        return games[start:start + limit]
+
+    def iter_games(self, batch_size: int = 500) -> Iterator[Game]:
+        # The games are in memory already. A catalog change mid-iteration builds a new title order, leaving this one.
+        yield from self.__title_ordered_games()
+
     def set_genres(self, genres):
         self.__dataset_of_genres = genres
 
     def set_games(self, games):
         self.__dataset_of_games = games
-
-    def search_games(self, query: str) -> List[Game]:
-        return [game for game in self.__games if query.lower() in game.title.lower()]
+        # Rebuild the id index from the new dataset, keeping games added through add_game.
+        self.__games_by_id = {game.game_id: game for game in self.__games}
+        self.__games_by_id.update((game.game_id, game) for game in games)
+        self.__rebuild_indexes()
+
+    def __search_indexes(self):
+        if self.__prefix_indexes is None:
+            games = self.__games_by_id.values()
+            self.__prefix_indexes = (_prefix_index(games, lambda game: search_terms(game.title)),
+                                     _prefix_index(games, lambda game: search_terms(game.description)),
+                                     _prefix_index(games, _publisher_names))
+        return self.__prefix_indexes
+
+    def __full_text_matches(self, query: str, in_description: bool):
+        # Every term has to prefix a word. Returns the matching ids and how many terms each matched in its title.
+        title_words, description_words, _ = self.__search_indexes()
+        matching_ids = None
+        title_hits = Counter()
+        for term in search_terms(query):
+            title_ids = _games_with_prefix(title_words, term)
+            term_ids = title_ids | _games_with_prefix(description_words, term) if in_description else title_ids
+            matching_ids = term_ids if matching_ids is None else matching_ids & term_ids
+            title_hits.update(title_ids)
+        return matching_ids or set(), title_hits
+
+    def __range_index(self, name: str):
+        if name not in self.__range_indexes:
+            value_of, order, _, _, _ = _RANGE_INDEXES[name]
+            games = sorted(self.__games_by_id.values(), key=order)
+            self.__range_indexes[name] = ([value_of(game) for game in games], games)
+        return self.__range_indexes[name]
+
+    def __range(self, name: str, criteria: dict):
+        # Returns the games in the named index's order and the [start, end) slice of them within the criteria's range.
+        values, games = self.__range_index(name)
+        _, _, _, lower_keys, upper_keys = _RANGE_INDEXES[name]
+        lower_bounds = [criteria[key] for key in lower_keys if key in criteria]
+        upper_bounds = [criteria[key] for key in upper_keys if key in criteria]
+        if name == 'price':
+            lower_bounds = [float(bound) for bound in lower_bounds]
+            upper_bounds = [float(bound) for bound in upper_bounds]
+            start = bisect_left(values, max(lower_bounds)) if lower_bounds else 0
+        else:
+            # Games without a release date are outside every date range.
+            start = bisect_left(values, max(lower_bounds)) if lower_bounds else bisect_right(values, date.min)
+        end = bisect_right(values, min(upper_bounds)) if upper_bounds else len(values)
+        return games, start, max(start, end)
+
+    def __search(self, criteria: dict) -> List[Game]:
+        check_search_criteria(criteria)
+        candidate_sets = []
+        title_hits = Counter()
+        full_text = False
+
+        for key in ('title', 'text'):
+            if key in criteria:
+                matching_ids, hits = self.__full_text_matches(criteria[key], in_description=key == 'text')
+                candidate_sets.append(matching_ids)
+                title_hits.update(hits)
+                full_text = True
+        if 'game_id' in criteria:
+            candidate_sets.append({int(criteria['game_id'])} & self.__games_by_id.keys())
+        if 'genre' in criteria:
+            candidate_sets.append({game.game_id for game in self.__games_by_genre.get(criteria['genre'], [])})
+        if 'publisher' in criteria:
+            candidate_sets.append(_games_with_prefix(self.__search_indexes()[2], criteria['publisher']))
+
+        ranges = _ranges_in(criteria)
+        range_search = ranges[0] if ranges else None
+        for name in ranges[1:]:
+            games, start, end = self.__range(name, criteria)
+            candidate_sets.append({game.game_id for game in games[start:end]})
+        if range_search is not None:
+            games_in_order, start, end = self.__range(range_search, criteria)
+            in_range = games_in_order[start:end]
+            if not full_text:
+                # Already in order, so just drop the games other criteria rule out.
+                if not candidate_sets:
+                    return in_range
+                matching_ids = set.intersection(*candidate_sets)
+                return [game for game in in_range if game.game_id in matching_ids]
+            candidate_sets.append({game.game_id for game in in_range})
+
+        if not candidate_sets:
+            return list(self.__title_ordered_games())
+        # Intersect from the smallest set up.
+        candidate_sets.sort(key=len)
+        matching_ids = candidate_sets[0].intersection(*candidate_sets[1:])
+        games = [self.__games_by_id[game_id] for game_id in matching_ids]
+        if full_text:
+            # Games matching more terms in the title rank first.
+            order = _RANGE_INDEXES[range_search][1] if range_search is not None else _title_order
+            games.sort(key=lambda game: (-title_hits[game.game_id], order(game)))
+        else:
+            games.sort(key=_title_order)
+        return games
+
+    def search(self, criteria: dict, offset: int = 0, limit: Optional[int] = None) -> List[Game]:
+        range_search = _only_range(criteria)
+        if range_search is not None:
+            # A single range alone is a slice of its index; only the requested page is copied.
+            games, start, end = self.__range(range_search, criteria)
+            start += offset
+            return games[start:end] if limit is None else games[start:min(end, start + limit)]
+        games = self.__search(criteria)
+        return games[offset:] if limit is None else games[offset:offset + limit]
+
+    def get_number_of_games_matching(self, criteria: dict) -> int:
+        range_search = _only_range(criteria)
+        if range_search is not None:
+            _, start, end = self.__range(range_search, criteria)
+            return end - start
+        return len(self.__search(criteria))
+
+    def search_games(self, query: str, offset: int = 0, limit: Optional[int] = None,
+                     in_description: bool = False) -> List[Game]:
+        return self.search({'text' if in_description else 'title': query}, offset, limit)
+
+    def get_number_of_search_results(self, query: str, in_description: bool = False) -> int:
+        return self.get_number_of_games_matching({'text' if in_description else 'title': query})
 
     def get_all_genres(self) -> List[Genre]:
         return list(self.__dataset_of_genres)
 
     def get_games_by_genre(self, genre_name: str) -> List[Game]:
-        return [game for game in self.__dataset_of_games if genre_name in game.genres]
+        return list(self.__games_by_genre.get(genre_name, []))
+
+    def get_games_by_genre_page(self, genre_name: str, offset: int, limit: int, order_by: str = 'title') -> List[Game]:
+        if order_by == 'title':
+            return self.__games_by_genre.get(genre_name, [])[offset:offset + limit]
+        return self.__ordering(order_by)[1].get(genre_name, [])[offset:offset + limit]
+
+    def get_number_of_games_by_genre(self, genre_name: str) -> int:
+        return len(self.__games_by_genre.get(genre_name, []))
 
     def get_title_by_id(self, game_id):
-        for game in self.__dataset_of_games:
-            if game_id == game.game_id:
-                return game.title
+        game = self.__games_by_id.get(game_id)
+        if game is not None:
+            return game.title
 
     def get_date_by_id(self, game_id):
-        for game in self.__dataset_of_games:
-            if game_id == game.game_id:
-                return game.release_date
+        game = self.__games_by_id.get(game_id)
+        if game is not None:
+            return game.release_date
 
     def get_description_by_id(self, game_id):
-        for game in self.__dataset_of_games:
-            if game_id == game.game_id:
-                return game.description
+        game = self.__games_by_id.get(game_id)
+        if game is not None:
+            return game.description
 
     def get_url_by_id(self, game_id):
-        for game in self.__dataset_of_games:
-            if game_id == game.game_id:
-                return game.url
+        game = self.__games_by_id.get(game_id)
+        if game is not None:
+            return game.url
+
+    def get_image_url_by_id(self, game_id):
+        game = self.__games_by_id.get(game_id)
+        if game is not None:
+            return game.image_url
 
     def get_price_by_id(self, game_id):
-        for game in self.__dataset_of_games:
-            if game_id == game.game_id:
-                if game.price is None:
-                    return 0
-                return game.price
+        game = self.__games_by_id.get(game_id)
+        if game is not None:
+            if game.price is None:
+                return 0
+            return game.price
+
+    def get_game_detail(self, game_id, username=None):
+        game = self.__games_by_id.get(game_id)
+        if game is None:
+            return None
+        reviews = self.get_reviews_by_game(game)
+        return {
+            'game': game,
+            'publisher': game.publisher,
+            'genres': [genre.genre_name for genre in game.genres],
+            'reviews': reviews,
+            'review_count': len(reviews),
+            'average_rating': sum(review.rating for review in reviews) / len(reviews) if reviews else 0,
+            'user_reviewed': any(review.user.username == username for review in reviews),
+            'in_wishlist': game_id in self.__wishlist.get(username, []),
+        }
 
     def add_user(self, user: User):
         self.__users.append(user)
@@ -80,12 +498,39 @@ class MemoryRepository(AbstractRepository):
         return next((user for user in self.__users if user.username == username), None)
 
     def get_game_by_id(self, game_id):
-        for game in self.__dataset_of_games:
-            if game_id == game.game_id:
-                return game
+        return self.__games_by_id.get(game_id)
+
+    def get_games_by_ids(self, game_ids) -> List[Game]:
+        return [self.__games_by_id.get(int(game_id)) for game_id in game_ids]
+
+    def get_catalog_version(self) -> int:
+        return self.__catalog_version
+
+    def get_catalog_last_modified(self) -> Optional[datetime]:
+        return self.__catalog_modified_at
+
+    def get_catalog_epoch(self) -> Optional[str]:
+        return self.__catalog_epoch
+
+    def get_catalog_stamp(self) -> CatalogStamp:
+        return CatalogStamp(self.__catalog_version, self.__catalog_epoch, self.__catalog_modified_at)
+
+    def get_game_version(self, game_id: int) -> Optional[GameVersion]:
+        if game_id not in self.__games_by_id:
+            return None
+        game_version = self.__game_versions.get(game_id, GameVersion(0, 0, 0, None))
+        return game_version._replace(modified_at=game_version.modified_at or self.__catalog_modified_at,
+                                     epoch=self.__catalog_epoch)
+
+    def get_game_cards(self, games: Iterable[Optional[Game]]) -> List[Optional[GameCard]]:
+        return self.__game_cards.cards(games, self.__catalog_version)
 
     def add_review(self, review):
         self.__reviews.append(review)
+        # Only the rating order depends on reviews.
+        self.__orderings.pop('rating', None)
+        self.__touch_catalog()
+        self.__touch_game(review.game.game_id, 'review_version')
 
     def get_wishlist(self, username):
         if username not in self.__wishlist:
@@ -97,14 +542,30 @@ class MemoryRepository(AbstractRepository):
             self.__wishlist[username] = []
         if int(game_id) not in self.__wishlist[username]:
             self.__wishlist[username].append(int(game_id))
+            self.__touch_game(int(game_id), 'wishlist_version')
 
     def remove_from_wishlist(self, username, game_id):
         if username in self.__wishlist and int(game_id) in self.__wishlist[username]:
             self.__wishlist[username].remove(int(game_id))
+            self.__touch_game(int(game_id), 'wishlist_version')
+
+    def remove_multiple_from_wishlist(self, username, game_ids):
+        if username in self.__wishlist:
+            removed = {int(game_id) for game_id in game_ids}
+            for game_id in removed.intersection(self.__wishlist[username]):
+                self.__touch_game(game_id, 'wishlist_version')
+            self.__wishlist[username] = [game_id for game_id in self.__wishlist[username] if game_id not in removed]
 
     def get_reviews_by_user(self, user):
         return [review for review in self.__reviews if review.user == user]
 
+    def get_rated_games_for_user(self, user: User) -> List[Game]:
+        rated_games = []
+        for review in self.get_reviews_by_user(user):
+            if review.game not in rated_games:
+                rated_games.append(review.game)
+        return rated_games
+
     def get_reviews_by_game(self, game):
         return [review for review in self.__reviews if review.game == game]
 
@@ -120,7 +581,7 @@ class MemoryRepository(AbstractRepository):
 def populate(repo: AbstractRepository):
     dir_name = os.path.dirname(os.path.abspath(__file__))
     games_file_name = os.path.join(dir_name, "data/games.csv")
-    reader = GameFileCSVReader(games_file_name)
+    reader = GameFileCSVReader(games_file_name, snapshot=True)
 
     reader.read_csv_file()
 
@@ -128,8 +589,7 @@ def populate(repo: AbstractRepository):
     genres = reader.dataset_of_genres
 
     # Add games to the repo
-    for game in games:
-        repo.add_game(game)
+    repo.add_multiple_games(games)
 
     repo.__dataset_of_genres = genres
     repo.__dataset_of_games = games
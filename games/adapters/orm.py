@@ -1,8 +1,10 @@
 from sqlalchemy import (
-    Table, MetaData, Column, Integer, String, Text, Float, ForeignKey
+    Table, MetaData, Column, Integer, String, Text, Float, Date, DateTime, ForeignKey, Index, event
 )
 from sqlalchemy.orm import registry, relationship, clear_mappers
 
+from games.adapters.search import create_search_index, drop_search_index
+
 from games.domainmodel.model import Game, Publisher, Genre, User, Review, Wishlist
 
 # global variable giving access to the MetaData (schema) information of the database
@@ -18,13 +20,65 @@ publishers_table = Table(
 games_table = Table(
     'games', mapper_registry.metadata,
     Column('game_id', Integer, primary_key=True),
-    Column('game_title', Text, nullable=False),
+    Column('game_title', Text, nullable=False, index=True),
     Column('game_price', Float, nullable=False),
     Column('release_date', String(50), nullable=False),
+    # The release date parsed from the display string above, so games can be sorted and filtered by it.
+    Column('released_on', Date, nullable=True),
     Column('game_description', String(255), nullable=True),
     Column('game_image_url', String(255), nullable=True),
     Column('game_website_url', String(255), nullable=True),
-    Column('publisher_name', ForeignKey('publishers.name')),
+    Column('publisher_name', ForeignKey('publishers.name'), index=True),
+    # Average rating of the game's reviews, NULL until it has one. Kept up to date as reviews are added, so that
+    # browsing by rating reads an index instead of averaging every game's reviews per page. Not mapped.
+    Column('average_rating', Float, nullable=True),
+    # Price searches filter on a price range and page through it in (price, title) order.
+    Index('ix_games_game_price_game_title', 'game_price', 'game_title'),
+    # Likewise for release date ranges and release date order.
+    Index('ix_games_released_on_game_title', 'released_on', 'game_title'),
+)
+
+# Best rated first; games without reviews (NULL) sort last in descending order.
+Index('ix_games_average_rating_game_title', games_table.c.average_rating.desc(), games_table.c.game_title)
+
+# The full-text index over titles and descriptions is created and dropped along with the games table.
+event.listen(games_table, 'after_create', create_search_index)
+event.listen(games_table, 'before_drop', drop_search_index)
+
+game_fingerprints_table = Table(
+    'game_fingerprints', mapper_registry.metadata,
+    # Fingerprint of the CSV row each game was last imported from, so a re-import only touches games that changed.
+    # Not part of the domain model, so not mapped.
+    Column('game_id', ForeignKey('games.game_id'), primary_key=True),
+    Column('fingerprint', String(32), nullable=False),
+)
+
+catalog_version_table = Table(
+    'catalog_version', mapper_registry.metadata,
+    # A single row counting writes to games, genres, publishers and reviews, so pages cached from the catalog can
+    # tell they are stale whichever process wrote it. Not part of the domain model, so not mapped.
+    Column('catalog_version_id', Integer, primary_key=True),
+    Column('version', Integer, nullable=False),
+    # When the version last changed (UTC), for Last-Modified.
+    Column('modified_at', DateTime),
+    # Chosen at random when the row is created. A repopulated database counts from the start again, so validators
+    # built from these versions include it to never match ones handed out for the old catalog.
+    Column('epoch', String(32)),
+    # The last stamp given to a game_versions counter. Stamps only grow, so a game's versions never repeat, not even
+    # when it is removed and added again.
+    Column('game_stamp', Integer),
+)
+
+game_versions_table = Table(
+    'game_versions', mapper_registry.metadata,
+    # Stamps (see catalog_version.game_stamp) of the last write to each game, its reviews and the wishlists it is on,
+    # so a game's page can be validated without loading it. Games never written since they were imported have no
+    # row, which counts as all zeros.
+    Column('game_id', ForeignKey('games.game_id'), primary_key=True),
+    Column('version', Integer, nullable=False),
+    Column('review_version', Integer, nullable=False),
+    Column('wishlist_version', Integer, nullable=False),
+    Column('modified_at', DateTime, nullable=False),
 )
 
 genres_table = Table(
@@ -37,7 +91,10 @@ game_genres_table = Table(
     'game_genres', mapper_registry.metadata,
     Column('id', Integer, primary_key=True, autoincrement=True),
     Column('game_id', ForeignKey('games.game_id')),
-    Column('genre_name', ForeignKey('genres.genre_name'))
+    Column('genre_name', ForeignKey('genres.genre_name')),
+    # Genre pages filter on genre_name and join on game_id; game pages load genres by game_id.
+    Index('ix_game_genres_genre_name_game_id', 'genre_name', 'game_id'),
+    Index('ix_game_genres_game_id', 'game_id'),
 )
 
 users_table = Table(
@@ -54,13 +111,16 @@ reviews_table = Table(
     Column('rating', Integer, nullable=False),
     Column('game_id', ForeignKey('games.game_id')),
     Column('username', ForeignKey('users.username')),
+    Index('ix_reviews_game_id', 'game_id'),
+    Index('ix_reviews_username', 'username'),
 )
 
 wishlist_table = Table(
     'wishlist', mapper_registry.metadata,
     Column('wishlist_id', Integer, primary_key=True, autoincrement=True),
     Column('username', ForeignKey('users.username')),
-
+    # One wishlist per user.
+    Index('ix_wishlist_username', 'username', unique=True),
 )
 
 game_wishlist_table = Table(
@@ -68,17 +128,21 @@ game_wishlist_table = Table(
     Column('id', Integer, primary_key=True, autoincrement=True, unique=False),
     Column('game_id', ForeignKey('games.game_id')),
     Column('wishlist_id', ForeignKey('wishlist.wishlist_id')),
+    # Unique indexes rather than table constraints, so that they can be added to an existing database.
+    Index('ix_game_wishlist_wishlist_id_game_id', 'wishlist_id', 'game_id', unique=True),
+    Index('ix_game_wishlist_game_id', 'game_id'),
 )
 
 
 def map_model_to_tables():
     clear_mappers()
 
-    mapper_registry.map_imperatively(Game, games_table, properties={
+    mapper_registry.map_imperatively(Game, games_table, exclude_properties=['average_rating'], properties={
         '_Game__game_id': games_table.c.game_id,
         '_Game__game_title': games_table.c.game_title,
         '_Game__price': games_table.c.game_price,
         '_Game__release_date': games_table.c.release_date,
+        '_Game__released_on': games_table.c.released_on,
         '_Game__description': games_table.c.game_description,
         '_Game__image_url': games_table.c.game_image_url,
         '_Game__website_url': games_table.c.game_website_url,
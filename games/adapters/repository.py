@@ -1,16 +1,66 @@
 import abc
-from typing import List
+from datetime import datetime
+from typing import List, Optional, Iterable, Iterator, Tuple, Dict, Callable, NamedTuple
 from games.domainmodel.model import Game, Genre, User
+from games.adapters.game_cards import GameCard
 
 
 repo_instance = None
 
+# Criteria understood by AbstractRepository.search:
+#   'title'     full-text match on the title, best matches first
+#   'text'      full-text match on the title and description, best matches first
+#   'game_id'   exact game id
+#   'price'     exact price
+#   'min_price' price at least the value
+#   'max_price' price at most the value (0 for free games only)
+#   'min_release_date' released on or after the date (a datetime.date)
+#   'max_release_date' released on or before the date
+#   'genre'     exact genre name
+#   'publisher' publisher names starting with the value
+SEARCH_CRITERIA = ('title', 'text', 'game_id', 'price', 'min_price', 'max_price', 'min_release_date',
+                   'max_release_date', 'genre', 'publisher')
+PRICE_CRITERIA = ('price', 'min_price', 'max_price')
+RELEASE_DATE_CRITERIA = ('min_release_date', 'max_release_date')
+
+# Orderings understood by get_games_page and get_games_by_genre_page:
+#   'title'        by title
+#   'price'        cheapest first
+#   'release_date' oldest first, games without a release date before any
+#   'rating'       highest average review rating first, games without reviews after any
+# Ties are broken by title, then by game id.
+GAME_ORDERINGS = ('title', 'price', 'release_date', 'rating')
+
 
 class RepositoryException(Exception):
     def __init__(self, message=None):
         print(f'RepositoryException: {message}')
 
 
+def check_search_criteria(criteria: dict):
+    unknown = set(criteria) - set(SEARCH_CRITERIA)
+    if unknown:
+        raise RepositoryException(f'Unsupported search criteria: {", ".join(sorted(unknown))}')
+
+
+class GameVersion(NamedTuple):
+    """ When a game, its reviews and the wishlists it is on were last written, as stamps that only grow within the
+    catalog epoch (0 for never), and when the last of those writes was (UTC), or when the catalog last changed for a
+    game not written since it was imported. """
+    version: int
+    review_version: int
+    wishlist_version: int
+    modified_at: Optional[datetime]
+    epoch: Optional[str] = None
+
+
+class CatalogStamp(NamedTuple):
+    """ The catalog version, the epoch it counts in and when it last changed (UTC). """
+    version: int
+    epoch: Optional[str]
+    modified_at: Optional[datetime]
+
+
 class AbstractRepository(abc.ABC):
 
     def __init__(self):
@@ -32,8 +82,42 @@ class AbstractRepository(abc.ABC):
         raise NotImplementedError
 
     @abc.abstractmethod
-    def search_games(self, query: str) -> List[Game]:
-        """ Returns a list of games that match the query. """
+    def get_games_page(self, offset: int, limit: int, order_by: str = 'title') -> List[Game]:
+        """ Returns at most limit games in the given order (see GAME_ORDERINGS), starting at offset. """
+        raise NotImplementedError
+
+    @abc.abstractmethod
+    def get_games_after(self, title: str, game_id: int, limit: int) -> List[Game]:
+        """ Returns at most limit games in title order that come after the (title, game_id) position. """
+        raise NotImplementedError
+
+    @abc.abstractmethod
+    def iter_games(self, batch_size: int = 500) -> Iterator[Game]:
+        """ Yields every game in title order, loading about batch_size at a time rather than the whole catalog. """
+        raise NotImplementedError
+
+    @abc.abstractmethod
+    def search(self, criteria: dict, offset: int = 0, limit: Optional[int] = None) -> List[Game]:
+        """ Returns at most limit games matching every criterion (see SEARCH_CRITERIA), starting at offset.
+        Full-text matches come best first, then price searches in price order, release date searches in release
+        date order, anything else in title order. """
+        raise NotImplementedError
+
+    @abc.abstractmethod
+    def get_number_of_games_matching(self, criteria: dict) -> int:
+        """ Returns the number of games search finds for the criteria. """
+        raise NotImplementedError
+
+    @abc.abstractmethod
+    def search_games(self, query: str, offset: int = 0, limit: Optional[int] = None,
+                     in_description: bool = False) -> List[Game]:
+        """ Returns games whose title (and description, if in_description) contains every word of the query as a
+        word prefix, best matches first. Returns at most limit games, starting at offset. """
+        raise NotImplementedError
+
+    @abc.abstractmethod
+    def get_number_of_search_results(self, query: str, in_description: bool = False) -> int:
+        """ Returns the number of games search_games finds for the query. """
         raise NotImplementedError
 
     @abc.abstractmethod
@@ -46,6 +130,16 @@ class AbstractRepository(abc.ABC):
         """ Returns a list of games associated with a genre. """
         raise NotImplementedError
 
+    @abc.abstractmethod
+    def get_games_by_genre_page(self, genre_name: str, offset: int, limit: int, order_by: str = 'title') -> List[Game]:
+        """ Returns at most limit games of a genre in the given order (see GAME_ORDERINGS), starting at offset. """
+        raise NotImplementedError
+
+    @abc.abstractmethod
+    def get_number_of_games_by_genre(self, genre_name: str) -> int:
+        """ Returns the number of games associated with a genre. """
+        raise NotImplementedError
+
     @abc.abstractmethod
     def get_title_by_id(self, game_id):
         """ Returns the game with the given game_id. """
@@ -67,6 +161,12 @@ class AbstractRepository(abc.ABC):
     def get_price_by_id(self, game_id):
         raise NotImplementedError
 
+    @abc.abstractmethod
+    def get_game_detail(self, game_id, username=None):
+        """ Returns a dict with the game, its publisher, genres, reviews and review aggregate, and whether
+        the given user has reviewed or wishlisted it. Returns None if the game doesn't exist. """
+        raise NotImplementedError
+
     @abc.abstractmethod
     def add_user(self, user: User):
         raise NotImplementedError
@@ -79,6 +179,11 @@ class AbstractRepository(abc.ABC):
     def get_game_by_id(self, game_id):
         raise NotImplementedError
 
+    @abc.abstractmethod
+    def get_games_by_ids(self, game_ids) -> List[Game]:
+        """ Returns the games with the given ids in the order of game_ids, with None for unknown ids. """
+        raise NotImplementedError
+
     @abc.abstractmethod
     def get_reviews_by_game(self, game_id):
         raise NotImplementedError
@@ -99,6 +204,11 @@ class AbstractRepository(abc.ABC):
     def remove_from_wishlist(self, username, game_id):
         raise NotImplementedError
 
+    @abc.abstractmethod
+    def remove_multiple_from_wishlist(self, username, game_ids):
+        """ Removes the given games from the user's wishlist only. """
+        raise NotImplementedError
+
     @abc.abstractmethod
     def get_rated_games_for_user(self, user: User) -> List[Game]:
         raise NotImplementedError
@@ -119,6 +229,51 @@ class AbstractRepository(abc.ABC):
     def add_multiple_games(self, games):
         raise NotImplementedError
 
+    @abc.abstractmethod
+    def sync_games(self, fingerprinted_games: Iterable[Tuple[int, str, Callable[[], Optional[Game]]]]) \
+            -> Dict[str, int]:
+        """ Makes the catalog match fingerprinted_games in one go. Each is a game id, the fingerprint of the game's
+        source row and a function building the game, which is only called if the fingerprint is new or changed (see
+        GameFileCSVReader.iter_fingerprinted_games). Those games are added or rewritten with their genres; games no
+        longer listed are removed, unless a user has reviewed or wishlisted them. Users, reviews and wishlists are
+        left as they are. Returns how many games were 'added', 'updated', 'removed', 'kept' and 'unchanged'. """
+        raise NotImplementedError
+
+    @abc.abstractmethod
+    def get_catalog_version(self) -> int:
+        """ Returns a number that changes whenever games, genres, publishers or reviews are written, so anything
+        derived from the catalog can be cached until it does. """
+        raise NotImplementedError
+
+    @abc.abstractmethod
+    def get_catalog_last_modified(self) -> Optional[datetime]:
+        """ Returns when the catalog version last changed (UTC), or None if it never has. """
+        raise NotImplementedError
+
+    @abc.abstractmethod
+    def get_catalog_epoch(self) -> Optional[str]:
+        """ Returns a token that is new whenever the catalog is built from scratch, when its versions start over, so
+        validators built from them can't match ones handed out for an earlier catalog. None before the first write. """
+        raise NotImplementedError
+
+    @abc.abstractmethod
+    def get_catalog_stamp(self) -> CatalogStamp:
+        """ Returns the catalog version, epoch and last modified time together, in one read, for validating pages
+        built from the whole catalog. """
+        raise NotImplementedError
+
+    @abc.abstractmethod
+    def get_game_version(self, game_id: int) -> Optional[GameVersion]:
+        """ Returns the GameVersion of the game, with the catalog epoch, in one read, or None if there is no such
+        game. """
+        raise NotImplementedError
+
+    @abc.abstractmethod
+    def get_game_cards(self, games: Iterable[Optional[Game]]) -> List[Optional[GameCard]]:
+        """ Returns the GameCard of each game, for listing pages. Cards are cached by game_id until the catalog
+        version changes. None stays None. """
+        raise NotImplementedError
+
     def get_image_url_by_id(self, game_id):
         raise NotImplementedError
 
@@ -1,24 +1,36 @@
-import os
+import time
+from collections import Counter
 from pathlib import Path
 
 from games.adapters.repository import AbstractRepository
 from games.adapters.datareader.csvdatareader import GameFileCSVReader
 
 
-def populate(data_path: Path, repo: AbstractRepository):
+def populate(data_path: Path, repo: AbstractRepository, processes: int = 1, snapshot: bool = False):
+    """ Loads the games in data_path/games.csv into repo, parsing the file in that many processes. With snapshot set,
+    the parsed rows are kept in a binary snapshot next to the file and read back from it until the file changes. """
 
     games_file_name = str(Path(data_path) / "games.csv")
 
-    reader = GameFileCSVReader(games_file_name)
+    reader = GameFileCSVReader(games_file_name, snapshot=snapshot)
 
-    reader.read_csv_file()
+    start = time.perf_counter()
+    counts = Counter()
 
+    def counted(fingerprinted_games):
+        for game_id, fingerprint, build_game in fingerprinted_games:
+            game = build_game()
+            counts['games'] += 1
+            counts['genre links'] += len(game.genres)
+            yield game_id, fingerprint, build_game
+
+    # Add games to the repo straight from the file, so the whole dataset is never held in memory at once. They are
+    # added with the fingerprints of their rows, so the first re-import only rewrites the games that changed since.
+    repo.sync_games(counted(reader.iter_fingerprinted_games(processes, built=True)))
+
+    # The reader has now seen every publisher and genre, each once.
     publishers = reader.dataset_of_publishers
-    games = reader.dataset_of_games
     genres = reader.dataset_of_genres
-    print(publishers)
-    print(games)
-    print(genres)
 
     # Add publishers to the repo
     repo.add_multiple_publishers(publishers)
@@ -26,5 +38,27 @@ def populate(data_path: Path, repo: AbstractRepository):
     # Add genres to the repo
     repo.add_multiple_genres(genres)
 
-    # Add games to the repo
-    repo.add_multiple_games(games)
+    elapsed = time.perf_counter() - start
+    rows = len(publishers) + len(genres) + counts['games'] + counts['genre links']
+    print(f"Loaded {counts['games']} games ({rows} rows) in {elapsed:.2f}s, {rows / max(elapsed, 1e-9):.0f} rows/s")
+
+
+def reimport(data_path: Path, repo: AbstractRepository, processes: int = 1, snapshot: bool = False):
+    """ Brings the games in repo up to date with data_path/games.csv, writing only the games whose rows changed
+    since the last import and leaving users, reviews and wishlists alone. """
+
+    games_file_name = str(Path(data_path) / "games.csv")
+
+    reader = GameFileCSVReader(games_file_name, snapshot=snapshot)
+
+    start = time.perf_counter()
+    counts = repo.sync_games(reader.iter_fingerprinted_games(processes))
+
+    # The reader has only met the publishers and genres of the games that were built, the new and changed ones.
+    repo.add_multiple_publishers(reader.dataset_of_publishers)
+    repo.add_multiple_genres(reader.dataset_of_genres)
+
+    elapsed = time.perf_counter() - start
+    print(f"Re-imported {games_file_name} in {elapsed:.2f}s: "
+          + ", ".join(f"{count} {outcome}" for outcome, count in counts.items()))
+    return counts
@@ -0,0 +1,86 @@
+import re
+import unicodedata
+from typing import List, Optional
+
+from sqlalchemy import DDL, text, Integer, Float
+
+# External-content FTS5 index over the games table: it stores only the index, and reads titles and
+# descriptions back from games. The prefix indexes keep short prefix queries ("ze*") cheap.
+CREATE_GAMES_FTS = DDL("""
+CREATE VIRTUAL TABLE IF NOT EXISTS games_fts USING fts5(
+    game_title, game_description,
+    content='games', content_rowid='game_id',
+    tokenize="unicode61 remove_diacritics 2", prefix='2 3'
+)""")
+
+# Triggers keep the index in step with every insert, update and delete on games, whichever code path makes it.
+CREATE_GAMES_FTS_TRIGGERS = [
+    DDL("""
+CREATE TRIGGER IF NOT EXISTS games_fts_insert AFTER INSERT ON games BEGIN
+    INSERT INTO games_fts(rowid, game_title, game_description)
+    VALUES (new.game_id, new.game_title, new.game_description);
+END"""),
+    DDL("""
+CREATE TRIGGER IF NOT EXISTS games_fts_delete AFTER DELETE ON games BEGIN
+    INSERT INTO games_fts(games_fts, rowid, game_title, game_description)
+    VALUES ('delete', old.game_id, old.game_title, old.game_description);
+END"""),
+    DDL("""
+CREATE TRIGGER IF NOT EXISTS games_fts_update AFTER UPDATE OF game_id, game_title, game_description ON games BEGIN
+    INSERT INTO games_fts(games_fts, rowid, game_title, game_description)
+    VALUES ('delete', old.game_id, old.game_title, old.game_description);
+    INSERT INTO games_fts(rowid, game_title, game_description)
+    VALUES (new.game_id, new.game_title, new.game_description);
+END"""),
+]
+
+REBUILD_GAMES_FTS = DDL("INSERT INTO games_fts(games_fts) VALUES ('rebuild')")
+DROP_GAMES_FTS = DDL("DROP TABLE IF EXISTS games_fts")
+
+# Title matches count ten times as much as description matches when ranking.
+TITLE_WEIGHT = 10.0
+DESCRIPTION_WEIGHT = 1.0
+
+
+def create_search_index(target, connection, **kw):
+    """ Creates the full-text index and its triggers for the games table, indexing any games already in it. """
+    connection.execute(CREATE_GAMES_FTS)
+    for trigger in CREATE_GAMES_FTS_TRIGGERS:
+        connection.execute(trigger)
+    connection.execute(REBUILD_GAMES_FTS)
+
+
+def drop_search_index(target, connection, **kw):
+    connection.execute(DROP_GAMES_FTS)
+
+
+def search_terms(query: str) -> List[str]:
+    """ Splits a query into lower-cased terms without accents, the way the FTS5 unicode61 tokenizer does. """
+    if not isinstance(query, str):
+        return []
+    decomposed = unicodedata.normalize('NFKD', query.casefold())
+    stripped = ''.join(char for char in decomposed if not unicodedata.combining(char))
+    return re.findall(r'[^\W_]+', stripped)
+
+
+def fts_match_expression(query: str, in_description: bool = False) -> Optional[str]:
+    """ Builds an FTS5 MATCH expression where every term of the query must appear as a word prefix.
+
+    Terms are quoted, so nothing the user types is read as FTS5 syntax. Returns None for a query without terms.
+    """
+    terms = search_terms(query)
+    if not terms:
+        return None
+    expression = ' '.join(f'"{term}"*' for term in terms)
+    if in_description:
+        return expression
+    return f'game_title : ({expression})'
+
+
+def fts_matches(match_expression: str, name: str = 'matches'):
+    """ Returns a subquery of (game_id, score) for the games matching the expression, best matches scoring lowest. """
+    return text(
+        f'SELECT rowid AS game_id, bm25(games_fts, {TITLE_WEIGHT}, {DESCRIPTION_WEIGHT}) AS score '
+        'FROM games_fts WHERE games_fts MATCH :match_expression'
+    ).bindparams(match_expression=match_expression).columns(game_id=Integer, score=Float).subquery(name)
+
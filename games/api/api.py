@@ -0,0 +1,40 @@
+from flask import Blueprint, Response, request, jsonify, stream_with_context
+
+import games.adapters.repository as repo
+import games.api.services as services
+import games.browse.services as browse_services
+
+# Configure Blueprint.
+api_blueprint = Blueprint('api_bp', __name__, url_prefix='/api')
+
+
+@api_blueprint.route('/games', methods=['GET'])
+def list_games():
+    """ Lists games as JSON: a page at a time in title order, or of the results of a search_type and query search
+    like the search form's. fields= picks the fields of each game, limit= the page size, and cursor= continues from
+    the previous page's next_cursor.
+
+    With format=ndjson the whole catalog is streamed instead, one game per line. """
+    try:
+        fields = services.parse_fields(request.args.get('fields'))
+        response_format = request.args.get('format', 'json')
+        if response_format == 'ndjson':
+            lines = services.iter_ndjson_lines(repo.repo_instance, fields)
+            # Streamed as it is read, so neither the catalog nor the response is ever held in memory whole.
+            return Response(stream_with_context(lines), mimetype='application/x-ndjson')
+        if response_format != 'json':
+            raise ValueError(f'Unknown format: {response_format}')
+
+        limit = services.parse_limit(request.args.get('limit'))
+        cursor = request.args.get('cursor')
+        search_type = request.args.get('search_type')
+        if search_type is None:
+            page = services.get_games_page(repo.repo_instance, fields, limit, cursor)
+        else:
+            criteria = browse_services.search_criteria(search_type, request.args.get('query'))
+            if criteria is None:
+                raise ValueError(f'Unknown search_type or missing query: {search_type}')
+            page = services.get_search_page(repo.repo_instance, criteria, fields, limit, cursor)
+    except ValueError as e:
+        return jsonify(error=str(e)), 400
+    return jsonify(page)
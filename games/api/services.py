@@ -0,0 +1,116 @@
+import base64
+import json
+from typing import Dict, Callable, Iterable, Iterator, Optional, Tuple
+
+from games.adapters.repository import AbstractRepository
+from games.browse.services import encode_cursor, decode_cursor
+from games.domainmodel.model import Game
+
+DEFAULT_LIMIT = 15
+MAX_LIMIT = 100
+
+
+def _publisher_name(game: Game) -> Optional[str]:
+    return game.publisher.publisher_name if game.publisher is not None else None
+
+
+# Field name -> how to read it from a game. Only the requested fields are read, so the publisher and genres are
+# only loaded when asked for.
+GAME_FIELDS: Dict[str, Callable[[Game], object]] = {
+    'game_id': lambda game: game.game_id,
+    'title': lambda game: game.title,
+    'release_date': lambda game: game.release_date,
+    'released_on': lambda game: game.released_on.isoformat() if game.released_on is not None else None,
+    'price': lambda game: game.price,
+    'publisher': _publisher_name,
+    'genres': lambda game: [genre.genre_name for genre in game.genres],
+    'image_url': lambda game: game.image_url,
+    'website_url': lambda game: game.website_url,
+    'description': lambda game: game.description,
+}
+
+# Descriptions are most of the size of a game, so they are only sent when asked for.
+DEFAULT_FIELDS = tuple(field for field in GAME_FIELDS if field != 'description')
+
+
+def parse_fields(fields: Optional[str]) -> Tuple[str, ...]:
+    """ Reads a fields= parameter, a comma-separated list of GAME_FIELDS. Raises ValueError for an unknown field. """
+    if not fields:
+        return DEFAULT_FIELDS
+    names = tuple(dict.fromkeys(name.strip() for name in fields.split(',') if name.strip()))
+    unknown = [name for name in names if name not in GAME_FIELDS]
+    if unknown:
+        raise ValueError(f'Unknown fields: {", ".join(unknown)}')
+    if not names:
+        raise ValueError('No fields given')
+    return names
+
+
+def parse_limit(limit: Optional[str]) -> int:
+    if limit is None:
+        return DEFAULT_LIMIT
+    limit = int(limit)
+    if not 1 <= limit <= MAX_LIMIT:
+        raise ValueError(f'limit must be between 1 and {MAX_LIMIT}')
+    return limit
+
+
+def project_game(game: Game, fields: Iterable[str]) -> dict:
+    return {field: GAME_FIELDS[field](game) for field in fields}
+
+
+def encode_offset_cursor(offset: int) -> str:
+    # Search results are ranked rather than in title order, so their cursor is a position in the results.
+    return base64.urlsafe_b64encode(json.dumps({'offset': offset}).encode('utf-8')).decode('ascii')
+
+
+def decode_offset_cursor(cursor: str) -> int:
+    try:
+        offset = json.loads(base64.urlsafe_b64decode(cursor.encode('ascii')))['offset']
+    except (ValueError, TypeError, KeyError):
+        raise ValueError(f'Invalid search cursor: {cursor}')
+    if type(offset) is not int or offset < 0:
+        raise ValueError(f'Invalid search cursor: {cursor}')
+    return offset
+
+
+def get_games_page(repo: AbstractRepository, fields: Tuple[str, ...], limit: int,
+                   cursor: Optional[str] = None) -> dict:
+    """ Returns a page of games in title order, starting after the cursor, with the cursor of the next page. """
+    if cursor is None:
+        games = repo.get_games_page(0, limit + 1)
+    else:
+        games = repo.get_games_after(*decode_cursor(cursor), limit + 1)
+    # The game past the page only says whether another page follows.
+    next_cursor = None
+    if len(games) > limit:
+        games = games[:limit]
+        next_cursor = encode_cursor(games[-1].title, games[-1].game_id)
+    return {
+        'games': [project_game(game, fields) for game in games],
+        'count': repo.get_number_of_games(),
+        'next_cursor': next_cursor,
+    }
+
+
+def get_search_page(repo: AbstractRepository, criteria: dict, fields: Tuple[str, ...], limit: int,
+                    cursor: Optional[str] = None) -> dict:
+    """ Returns a page of the games matching the search criteria, starting at the cursor, with the cursor of the
+    next page. """
+    offset = 0 if cursor is None else decode_offset_cursor(cursor)
+    games = repo.search(criteria, offset, limit + 1)
+    next_cursor = None
+    if len(games) > limit:
+        games = games[:limit]
+        next_cursor = encode_offset_cursor(offset + limit)
+    return {
+        'games': [project_game(game, fields) for game in games],
+        'count': repo.get_number_of_games_matching(criteria),
+        'next_cursor': next_cursor,
+    }
+
+
+def iter_ndjson_lines(repo: AbstractRepository, fields: Tuple[str, ...]) -> Iterator[str]:
+    """ Yields every game in title order as a line of JSON, reading the catalog a batch at a time. """
+    for game in repo.iter_games():
+        yield json.dumps(project_game(game, fields)) + '\n'
@@ -1,10 +1,18 @@
-from flask import Blueprint, render_template, request, flash, redirect, url_for, session
+import hashlib
+import math
+from datetime import timezone
+
+from flask import Blueprint, render_template, request, flash, redirect, url_for, session, abort, current_app, \
+    make_response
+from markupsafe import Markup
+from werkzeug.http import is_resource_modified
 
 import games.authentication.services as auth_services
 import games.adapters.repository as repo
 import games.browse.services as services
 
 from games.browse.form import ReviewForm
+from games.browse.fragment_cache import FragmentCache
 
 from games.wishlist.wishlist import get_wishlist, wishlist_service
 
@@ -13,105 +21,201 @@ browse_blueprint = Blueprint('games_bp', __name__)
 
 GAMES_PER_PAGE = 15  # Display 15 games per page
 
+# Key of the app's FragmentCache in app.extensions.
+FRAGMENT_CACHE = 'browse_fragments'
+
+
+@browse_blueprint.record_once
+def create_fragment_cache(state):
+    state.app.extensions[FRAGMENT_CACHE] = FragmentCache(state.app.config.get('FRAGMENT_CACHE_SIZE', 256))
+
+
+def conditional_response(render, versions, last_modified=None):
+    """ Answers a GET for a page rendered from versions (of the catalog, a game, ...) and the visitor's login with 304
+    Not Modified if the client's If-None-Match or If-Modified-Since still matches, without calling render.
+
+    Anonymous pages are public, so a shared cache may keep them, and carry Last-Modified. Pages for a logged-in user
+    are private and only carry an ETag, since logging in or out changes the page but not when the data last did.
+    Every response has to be revalidated, which is cheap. """
+    username = session.get('username')
+    if session.get('_flashes'):
+        # A flashed message is shown once, so this page can't be validated or served again.
+        response = make_response(render())
+        response.cache_control.no_store = True
+        return response
+
+    etag = hashlib.sha1(repr((versions, username)).encode('utf-8')).hexdigest()
+    if username is not None or last_modified is None:
+        last_modified = None
+    else:
+        # Stored as naive UTC; HTTP dates have whole seconds.
+        last_modified = last_modified.replace(tzinfo=timezone.utc, microsecond=0)
+
+    if is_resource_modified(request.environ, etag=etag, last_modified=last_modified):
+        response = make_response(render())
+    else:
+        response = current_app.response_class(status=304)
+    response.set_etag(etag)
+    if last_modified is not None:
+        response.last_modified = last_modified
+    response.cache_control.no_cache = True
+    if username is None:
+        response.cache_control.public = True
+    else:
+        response.cache_control.private = True
+    response.vary.add('Cookie')
+    return response
+
+
+def render_browse_page(title, heading, context, current_genre, table_key, load_table):
+    """ Renders browse.html around the games table and genre sidebar, which are cached per catalog version, so only
+    the personalised header is rendered on every request. load_table returns the games table's template variables
+    (games, num_games, current_page, next_cursor and sort); it is only called when the table isn't cached.
+
+    Nothing is loaded or rendered for a client whose copy of the page is still current. """
+    fragments = current_app.extensions[FRAGMENT_CACHE]
+    catalog_stamp = repo.repo_instance.get_catalog_stamp()
+    version = catalog_stamp.version
+
+    def render_games_table():
+        table = load_table()
+        return table['num_games'], Markup(render_template('games_table.html', context=context,
+                                                          current_genre=current_genre, **table))
+
+    def render_genre_sidebar():
+        return Markup(render_template('genre_sidebar.html', genres=repo.repo_instance.get_all_genres()))
+
+    def render_page():
+        num_games, games_table = fragments.get_or_render((context, current_genre) + table_key, version,
+                                                         render_games_table)
+        genre_sidebar = fragments.get_or_render(('genre_sidebar',), version, render_genre_sidebar)
+        return render_template(
+            'browse.html',
+            title=title,
+            heading=heading,
+            num_games=num_games,
+            games_table=games_table,
+            genre_sidebar=genre_sidebar,
+        )
+
+    return conditional_response(render_page, ('catalog', catalog_stamp.epoch, version), catalog_stamp.modified_at)
+
 
 @browse_blueprint.route('/browse', methods=['GET'])
 @browse_blueprint.route('/browse/page/<int:page_num>', methods=['GET'])
 def browse_games(page_num=1):  # default to page 1
-    num_games = services.get_number_of_games(repo.repo_instance)
-    games_on_page = services.get_paginated_games(repo.repo_instance, page_num)
-    all_genres = repo.repo_instance.get_all_genres()
+    # Page numbers are kept for compatibility; in title order the Next link continues with a cursor.
+    sort = services.sort_order(request.args.get('sort'))
+
+    def load_table():
+        num_games = services.get_number_of_games(repo.repo_instance)
+        games_on_page = services.get_paginated_games(repo.repo_instance, page_num, sort)
+        return dict(
+            games=games_on_page,
+            num_games=num_games,
+            current_page=page_num,
+            next_cursor=services.get_next_cursor(games_on_page, page_num, num_games) if sort == 'title' else None,
+            sort=sort,
+        )
+
+    return render_browse_page(f'Browse Games | CS235 Game Library', 'Browse Games', 'all', '',
+                              ('page', page_num, sort), load_table)
+
+
+@browse_blueprint.route('/browse/after/<cursor>', methods=['GET'])
+def browse_games_after(cursor):
+    # The page number is only a display hint carried along by the Next links.
+    page_hint = request.args.get('page', default=0, type=int)
+
+    def load_table():
+        games_on_page, next_cursor = services.get_games_after_cursor(repo.repo_instance, cursor)
+        return dict(
+            games=games_on_page,
+            num_games=services.get_number_of_games(repo.repo_instance),
+            current_page=page_hint,
+            next_cursor=next_cursor,
+            sort='title',
+        )
 
-    return render_template(
-        'browse.html',
-        title=f'Browse Games | CS235 Game Library',
-        heading='Browse Games',
-        games=games_on_page,
-        num_games=num_games,
-        current_page=page_num,
-        genres=all_genres,
-        context='all',
-        current_genre='',
-    )
+    try:
+        return render_browse_page(f'Browse Games | CS235 Game Library', 'Browse Games', 'all', '',
+                                  ('after', cursor, page_hint), load_table)
+    except ValueError:
+        return redirect(url_for('games_bp.browse_games'))
 
 
 @browse_blueprint.route('/browse/genre/<genre_name>', methods=['GET'])
 @browse_blueprint.route('/browse/genre/<genre_name>/page/<int:page_num>', methods=['GET'])
 def browse_games_by_genre(genre_name, page_num=1):
-    games_by_genre = services.get_paginated_games_by_genre(repo.repo_instance, genre_name, page_num)
-    num_games = len(repo.repo_instance.get_games_by_genre(genre_name))
-    all_genres = repo.repo_instance.get_all_genres()
-    return render_template(
-        'browse.html',
-        title=f'Browse Games by {genre_name} | CS235 Game Library',
-        heading=f'Browse Games by {genre_name}',
-        games=games_by_genre,
-        num_games=num_games,
-        current_page=page_num,
-        genres=all_genres,
-        context='genre',
-        current_genre=genre_name
-    )
+    sort = services.sort_order(request.args.get('sort'))
+
+    def load_table():
+        return dict(
+            games=services.get_paginated_games_by_genre(repo.repo_instance, genre_name, page_num, sort),
+            num_games=services.get_number_of_games_by_genre(repo.repo_instance, genre_name),
+            current_page=page_num,
+            sort=sort,
+        )
+
+    return render_browse_page(f'Browse Games by {genre_name} | CS235 Game Library', f'Browse Games by {genre_name}',
+                              'genre', genre_name, ('page', page_num, sort), load_table)
 
 
 @browse_blueprint.route('/search', methods=['GET'])
 def search_games():
     search_type = request.args.get('search_type')
     query = request.args.get('query')
+    page_num = request.args.get('page', 1, type=int)
 
     try:
-        if search_type == "title":
-            games = services.search_games_by_title(repo.repo_instance, query)
-        elif search_type == "id":
-            games = services.search_games_by_id(repo.repo_instance, int(query))
-        elif search_type == "price":
-            games = services.search_games_by_price(repo.repo_instance, float(query))
-        elif search_type == "genres":
-            games = services.search_games_by_genres(repo.repo_instance, query)
-        elif search_type == "publisher":
-            games = services.search_games_by_publisher(repo.repo_instance, query)
-
-        else:
-            games = []
+        criteria = services.search_criteria(search_type, query)
     except ValueError:
+        criteria = None
+
+    if criteria is None:
         games = []
+        num_games = 0
+    else:
+        # The repository returns just the requested page of results.
+        games = services.search_games(repo.repo_instance, criteria, page_num)
+        num_games = services.get_number_of_search_results(repo.repo_instance, criteria)
 
     return render_template(
         'search_result.html',
         title=f'Search Results | CS235 Game Library',
         heading=f'Search Results for "{query}"',
         games=games,
-        num_games=len(games),
-        current_page=1  # or adjust if you want search results to be paginated
+        num_games=num_games,
+        current_page=page_num,
+        num_pages=max(math.ceil(num_games / GAMES_PER_PAGE), 1),
+        search_type=search_type,
+        query=query
     )
 
 
 @browse_blueprint.route('/game/<int:game_id>', methods=['GET', 'POST'])
 def show_game_detail(game_id):
-    title = services.get_title_by_id(repo.repo_instance, game_id)
-    description = services.get_description_by_id(repo.repo_instance, game_id)
-    release_date = services.get_date_by_id(repo.repo_instance, game_id)
-    price = services.get_price_by_id(repo.repo_instance, game_id)
-    image_url = services.get_image_url_by_id(repo.repo_instance, game_id)
-    ###
+    username = session.get('username')
+    if request.method in ('GET', 'HEAD'):
+        # The page shows the game, its reviews and whether the visitor reviewed or wishlisted it, all stamped in the
+        # game's version; validate that, read in one query, before loading anything else.
+        game_version = repo.repo_instance.get_game_version(game_id)
+        if game_version is not None:
+            return conditional_response(lambda: render_game_detail(game_id, username),
+                                        ('game', game_version.epoch, tuple(game_version[:3])),
+                                        game_version.modified_at)
+    return render_game_detail(game_id, username)
+
+
+def render_game_detail(game_id, username):
+    detail = services.get_game_detail(repo.repo_instance, game_id, username)
+    if detail is None:
+        abort(404)
     form = ReviewForm(request.form)
-    game = services.get_game_by_id(repo.repo_instance, game_id)
-    reviews = services.get_reviews_by_game(repo.repo_instance, game)
-    average_rating = services.get_average_rating(reviews)
-
-    user=None
-    if 'username' in session:
-        user = auth_services.get_user_in_user_type(session['username'], repo.repo_instance)
-
-    if 'username' in session:
-        wishlist = wishlist_service.get_game_wishlist(repo.repo_instance, session['username'])
-        if_reviewed = services.user_already_reviewed_game(repo.repo_instance, game_id, session['username'])
-        user_review = services.get_reviews_by_user(repo.repo_instance, user)
-    else:
-        wishlist = wishlist_service.get_game_wishlist(repo.repo_instance, None)
-        if_reviewed = services.user_already_reviewed_game(repo.repo_instance, game_id, None)
-        user_review = services.get_reviews_by_user(repo.repo_instance, user)
+    game = detail['game']
 
-    if request.method == 'POST' and 'username' in session:
+    if request.method == 'POST' and username is not None:
+        user = auth_services.get_user_in_user_type(username, repo.repo_instance)
         rating = form.rating.data
         comment = form.comment.data
         services.add_review(repo.repo_instance, user=user, game=game, rating=rating, comment=comment)
@@ -119,23 +223,19 @@ def show_game_detail(game_id):
 
         return redirect(url_for('games_bp.show_game_detail', game_id=game_id))
 
-    # url is None, Unable to get url
     return render_template(
         'gameDescription.html',
-        title=title,
+        title=detail['title'],
         game_id=game_id,
-        description=description,
-        image_url=game.image_url,
-        release_date=release_date,
-        price=price,
-        ###
+        description=detail['description'],
+        image_url=detail['image_url'],
+        release_date=detail['release_date'],
+        price=detail['price'],
         form=form,
-        reviews=reviews,
+        reviews=detail['reviews'],
         game=game,
-        average_rating=average_rating,
-        wishlist=wishlist,
-        user_review=user_review,
-        if_reviewed=if_reviewed,
-        user=user
-        ###
+        average_rating=detail['average_rating'],
+        in_wishlist=detail['in_wishlist'],
+        if_reviewed=detail['user_reviewed'],
+        user=username,
     )
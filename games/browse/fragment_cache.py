@@ -0,0 +1,45 @@
+import threading
+from collections import OrderedDict
+from typing import Any, Callable, Hashable
+
+
+class FragmentCache:
+    """ Parts of pages rendered from the catalog, such as the browse table and the genre sidebar, by key.
+
+    Everything cached belongs to one catalog version: asking for a newer version drops the lot, since any catalog
+    write can change any page. Beyond maxsize entries the least recently used one is evicted. """
+
+    def __init__(self, maxsize: int = 256):
+        self.__maxsize = maxsize
+        self.__fragments = OrderedDict()
+        self.__version = None
+        # Requests can be served from several threads at once.
+        self.__lock = threading.Lock()
+
+    def get_or_render(self, key: Hashable, version: Any, render: Callable[[], Any]) -> Any:
+        """ Returns the fragment cached under key for this catalog version, rendering and caching it if there is
+        none. Whatever render raises is passed on and nothing is cached. """
+        with self.__lock:
+            if version != self.__version:
+                self.__fragments.clear()
+                self.__version = version
+            elif key in self.__fragments:
+                self.__fragments.move_to_end(key)
+                return self.__fragments[key]
+        # Rendered outside the lock, so one slow page doesn't hold up the others.
+        fragment = render()
+        with self.__lock:
+            if version == self.__version:
+                self.__fragments[key] = fragment
+                self.__fragments.move_to_end(key)
+                while len(self.__fragments) > self.__maxsize:
+                    self.__fragments.popitem(last=False)
+        return fragment
+
+    def clear(self):
+        with self.__lock:
+            self.__fragments.clear()
+            self.__version = None
+
+    def __len__(self):
+        return len(self.__fragments)
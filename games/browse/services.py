@@ -1,6 +1,11 @@
+import base64
+import json
+from datetime import date
+
 from flask import session
 
-from games.adapters.repository import AbstractRepository
+from games.adapters.game_cards import GameCard
+from games.adapters.repository import AbstractRepository, GAME_ORDERINGS
 from games.domainmodel.model import Game, Genre, Review
 from typing import List
 import games.adapters.repository as repo
@@ -13,78 +18,156 @@ def get_number_of_games(repo: AbstractRepository):
     return repo.get_number_of_games()
 
 
-def get_paginated_games(repo: AbstractRepository, page_num: int) -> List[dict]:
-    all_games = repo.get_games()
-    sorted_games = sorted(all_games, key=lambda x: x.title)
-    start_index = (page_num - 1) * GAMES_PER_PAGE
-    end_index = start_index + GAMES_PER_PAGE
-    games = sorted_games[start_index:end_index]
+def encode_cursor(title: str, game_id: int) -> str:
+    # The cursor is the (title, game_id) browse position, kept opaque to clients.
+    return base64.urlsafe_b64encode(json.dumps([title or '', game_id]).encode('utf-8')).decode('ascii')
+
+
+def decode_cursor(cursor: str):
+    try:
+        title, game_id = json.loads(base64.urlsafe_b64decode(cursor.encode('ascii')))
+    except (ValueError, TypeError):
+        raise ValueError(f'Invalid browse cursor: {cursor}')
+    if not isinstance(title, str) or type(game_id) is not int:
+        raise ValueError(f'Invalid browse cursor: {cursor}')
+    return title, game_id
 
-    game_dicts = []
-    for game in games:
-        game_dict = {
-            'game_id': game.game_id,
-            'title': game.title,
-            'release_date': game.release_date,
-            'price': game.price,
-            'publisher': game.publisher,
-            'genres': [genre.genre_name for genre in game.genres],
-            'image': game.image_url,
-        }
-        game_dicts.append(game_dict)
 
-    return game_dicts
+def get_games_after_cursor(repo: AbstractRepository, cursor: str):
+    """ Returns the page of games following the cursor and the cursor of the next page, if any. """
+    title, game_id = decode_cursor(cursor)
+    # Fetch one game past the page to find out whether another page follows.
+    games = repo.get_games_after(title, game_id, GAMES_PER_PAGE + 1)
+    next_cursor = None
+    if len(games) > GAMES_PER_PAGE:
+        games = games[:GAMES_PER_PAGE]
+        next_cursor = encode_cursor(games[-1].title, games[-1].game_id)
+    return repo.get_game_cards(games), next_cursor
 
 
-def get_paginated_games_by_genre(repo: AbstractRepository, genre_name: str, page_num: int) -> List[dict]:
-    all_games = repo.get_games_by_genre(genre_name)
-    sorted_games = sorted(all_games, key=lambda x: x.title)
-    start_index = (page_num - 1) * GAMES_PER_PAGE
-    end_index = start_index + GAMES_PER_PAGE
-    games = sorted_games[start_index:end_index]
+def get_next_cursor(game_cards: List[GameCard], page_num: int, num_games: int):
+    if not game_cards or page_num * GAMES_PER_PAGE >= num_games:
+        return None
+    return encode_cursor(game_cards[-1].title, game_cards[-1].game_id)
+
+
+def sort_order(sort: str) -> str:
+    # Browse order from the sort query parameter, one of the repository's GAME_ORDERINGS, title order otherwise.
+    return sort if sort in GAME_ORDERINGS else 'title'
+
+
+def get_paginated_games(repo: AbstractRepository, page_num: int, order_by: str = 'title') -> List[GameCard]:
+    start_index = max(page_num - 1, 0) * GAMES_PER_PAGE
+    games = repo.get_games_page(start_index, GAMES_PER_PAGE, order_by)
+
+    return repo.get_game_cards(games)
+
+
+def get_number_of_games_by_genre(repo: AbstractRepository, genre_name: str) -> int:
+    return repo.get_number_of_games_by_genre(genre_name)
+
+
+def get_paginated_games_by_genre(repo: AbstractRepository, genre_name: str, page_num: int,
+                                 order_by: str = 'title') -> List[GameCard]:
+    start_index = max(page_num - 1, 0) * GAMES_PER_PAGE
+    games = repo.get_games_by_genre_page(genre_name, start_index, GAMES_PER_PAGE, order_by)
+
+    return repo.get_game_cards(games)
+
+
+def game_id_criteria(query: str) -> dict:
+    """ Reads an id search. Ids beyond the 64-bit range the games table stores can't match any game. """
+    game_id = int(query)
+    if not -2 ** 63 <= game_id < 2 ** 63:
+        raise ValueError(f'No game can have the id "{query}"')
+    return {'game_id': game_id}
+
+
+def price_criteria(query: str) -> dict:
+    """ Reads a price search: "free", "5" (exactly 5), "5-20" (5 to 20), "5-" (at least 5) or "-20" (at most 20). """
+    query = query.strip().lower()
+    if query == 'free':
+        return {'max_price': 0}
+    if '-' not in query:
+        return {'price': float(query)}
+    low, high = (part.strip() for part in query.split('-', 1))
+    criteria = {}
+    if low:
+        criteria['min_price'] = float(low)
+    if high:
+        criteria['max_price'] = float(high)
+    if not criteria:
+        raise ValueError(f'No price given in "{query}"')
+    return criteria
+
+
+def release_year_criteria(query: str) -> dict:
+    """ Reads a release year search: "2015" (released in 2015), "2015-2018" (2015 to 2018), "2015-" (2015 or
+    later) or "-2018" (2018 or earlier). """
+    query = query.strip()
+    low, high = (part.strip() for part in query.split('-', 1)) if '-' in query else (query, query)
+    criteria = {}
+    if low:
+        criteria['min_release_date'] = date(int(low), 1, 1)
+    if high:
+        criteria['max_release_date'] = date(int(high), 12, 31)
+    if not criteria:
+        raise ValueError(f'No year given in "{query}"')
+    return criteria
+
+
+# search_type from the search form -> function reading the query into repository search criteria.
+SEARCH_TYPES = {
+    'title': lambda query: {'title': query},
+    'description': lambda query: {'text': query},
+    'id': game_id_criteria,
+    'price': price_criteria,
+    'release': release_year_criteria,
+    'genres': lambda query: {'genre': query.strip()},
+    'publisher': lambda query: {'publisher': query.strip()},
+}
+
+
+def search_criteria(search_type: str, query: str):
+    """ Returns the repository search criteria for a search form submission, or None for an unknown search type.
+    Raises ValueError if the query isn't valid for the search type. """
+    if search_type not in SEARCH_TYPES or query is None:
+        return None
+    return SEARCH_TYPES[search_type](query)
+
 
-    game_dicts = []
-    for game in games:
-        game_dict = {
-            'game_id': game.game_id,
-            'title': game.title,
-            'release_date': game.release_date,
-            'price': game.price,
-            'publisher': game.publisher,
-            'genres': [genre.genre_name for genre in game.genres],
-            'image': game.image_url,
-        }
-        game_dicts.append(game_dict)
-    return game_dicts
+def search_games(repo: AbstractRepository, criteria: dict, page_num: int = 1) -> List[GameCard]:
+    start_index = max(page_num - 1, 0) * GAMES_PER_PAGE
+    return repo.get_game_cards(repo.search(criteria, start_index, GAMES_PER_PAGE))
 
 
-def search_games_by_title(repo: AbstractRepository, title_query: str):
-    all_games = repo.get_games()
-    return [game for game in all_games if title_query.lower() in game.title.lower()]
+def get_number_of_search_results(repo: AbstractRepository, criteria: dict) -> int:
+    return repo.get_number_of_games_matching(criteria)
 
 
-def search_games_by_id(repo: AbstractRepository, id_query: int):
-    all_games = repo.get_games()
-    return [game for game in all_games if game.game_id == id_query]
+def search_games_by_title(repo: AbstractRepository, title_query: str, page_num: int = 1,
+                          in_description: bool = False):
+    return search_games(repo, {'text' if in_description else 'title': title_query}, page_num)
 
 
-def search_games_by_price(repo: AbstractRepository, id_query: float):
-    all_games = repo.get_games()
-    return [game for game in all_games if game.price == id_query]
+def get_number_of_title_search_results(repo: AbstractRepository, title_query: str, in_description: bool = False):
+    return get_number_of_search_results(repo, {'text' if in_description else 'title': title_query})
 
 
-def search_games_by_genres(repo: AbstractRepository, id_query: str):
-    all_games = repo.get_games()
+def search_games_by_id(repo: AbstractRepository, id_query: int, page_num: int = 1):
+    return search_games(repo, {'game_id': id_query}, page_num)
 
-    def get_genres(genres):
-        return ', '.join([genre.genre_name for genre in genres])
 
-    return [game for game in all_games if id_query in get_genres(game.genres)]
+def search_games_by_price(repo: AbstractRepository, id_query: float, page_num: int = 1):
+    return search_games(repo, {'price': id_query}, page_num)
 
 
-def search_games_by_publisher(repo: AbstractRepository, id_query: str):
-    all_games = repo.get_games()
-    return [game for game in all_games if id_query in game.publisher.publisher_name]
+def search_games_by_genres(repo: AbstractRepository, id_query: str, page_num: int = 1):
+    return search_games(repo, {'genre': id_query}, page_num)
+
+
+def search_games_by_publisher(repo: AbstractRepository, id_query: str, page_num: int = 1):
+    return search_games(repo, {'publisher': id_query}, page_num)
 
 
 def get_all_genres(repo: AbstractRepository) -> List[Genre]:
@@ -151,6 +234,20 @@ def get_image_url_by_id(repo: AbstractRepository, game_id):
         return None
 
 
+def get_game_detail(repo: AbstractRepository, game_id, username=None):
+    detail = repo.get_game_detail(game_id, username)
+    if detail is None:
+        return None
+    game = detail['game']
+    detail['title'] = game.title
+    detail['description'] = game.description or "No description available"
+    detail['release_date'] = game.release_date
+    detail['price'] = game.price or 0
+    detail['image_url'] = game.image_url
+    detail['average_rating'] = round(detail['average_rating'], 2)
+    return detail
+
+
 def get_average_rating(reviews):
     if not reviews:
         return 0
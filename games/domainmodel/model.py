@@ -1,4 +1,25 @@
-from datetime import datetime
+import re
+from datetime import date
+from functools import lru_cache
+
+MONTHS = {name: number for number, name in enumerate(
+    ('jan', 'feb', 'mar', 'apr', 'may', 'jun', 'jul', 'aug', 'sep', 'oct', 'nov', 'dec'), start=1)}
+
+# What strptime accepts for "%b %d, %Y": a month abbreviation in any case, a day of one or two digits, four-digit year.
+RELEASE_DATE_PATTERN = re.compile(r'([A-Za-z]{3})\s+(\d{1,2}),\s+(\d{4})')
+
+
+@lru_cache(maxsize=16384)
+def parse_release_date(release_date: str) -> date:
+    """ Parses a release date in 'Oct 21, 2008' format, raising ValueError for anything else.
+
+    Much cheaper than datetime.strptime, and a catalog only has a few thousand distinct dates, so most calls are
+    cache hits. """
+    match = RELEASE_DATE_PATTERN.fullmatch(release_date)
+    if match is None or match.group(1).lower() not in MONTHS:
+        raise ValueError(f"Invalid release date: {release_date}")
+    month_name, day, year = match.groups()
+    return date(int(year), MONTHS[month_name.lower()], int(day))
 
 
 class Publisher:
@@ -77,6 +98,7 @@ class Game:
 
         self.__price = None
         self.__release_date = None
+        self.__released_on = None
         self.__description = None
         self.__image_url = None
         self.__website_url = None
@@ -130,13 +152,18 @@ class Game:
         if isinstance(release_date, str):
             try:
                 # Check if the release_date string is in the correct date format (e.g., "Oct 21, 2008")
-                datetime.strptime(release_date, "%b %d, %Y")
+                self.__released_on = parse_release_date(release_date)
                 self.__release_date = release_date
             except ValueError:
                 raise ValueError("Release date must be in 'Oct 21, 2008' format!")
         else:
             raise ValueError("Release date must be a string in 'Oct 21, 2008' format!")
 
+    @property
+    def released_on(self) -> date:
+        """ The release date as a date, for sorting and date ranges; release_date is the display string. """
+        return self.__released_on
+
     @property
     def description(self):
         return self.__description
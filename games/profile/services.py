@@ -4,12 +4,9 @@ from games.domainmodel.model import User
 
 def get_user_activities(username: str, repo: AbstractRepository):
     user = repo.get_user(username)
-    wishlist = list()
-    for game_id in repo.get_wishlist(username):
-        wishlist.append(repo.get_game_by_id(game_id))
     activities = {
         'reviews': repo.get_reviews_by_user(user),
-        'wishlist': wishlist
+        'wishlist': repo.get_game_cards(repo.get_games_by_ids(repo.get_wishlist(username)))
     }
     return activities
 
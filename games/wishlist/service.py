@@ -2,10 +2,7 @@ from games.adapters.repository import AbstractRepository
 
 
 def get_game_wishlist(repo: AbstractRepository, username):
-    wishlist = list()
-    for game_id in repo.get_wishlist(username):
-        wishlist.append(repo.get_game_by_id(game_id))
-    return wishlist
+    return repo.get_game_cards(repo.get_games_by_ids(repo.get_wishlist(username)))
 
 
 def add_game_to_wishlist(repo: AbstractRepository, username, game_id):
@@ -16,6 +13,10 @@ def remove_game_from_wishlist(repo: AbstractRepository, username, game_id):
     repo.remove_from_wishlist(username, game_id)
 
 
+def remove_games_from_wishlist(repo: AbstractRepository, username, game_ids):
+    repo.remove_multiple_from_wishlist(username, game_ids)
+
+
 """
 class WishlistService:
     def __init__(self):
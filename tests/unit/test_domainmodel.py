@@ -1,7 +1,12 @@
 import pytest
+import csv
+import io
 import os
+from datetime import date
 from games.domainmodel.model import Publisher, Genre, Game, Review, User, Wishlist
-from games.adapters.datareader.csvdatareader import GameFileCSVReader
+from games.adapters.datareader.csvdatareader import GameFileCSVReader, record_ranges, PROJECTED_COLUMNS
+from games.adapters.datareader import csvdatareader, snapshot
+from games.adapters.datareader.snapshot import load_snapshot, snapshot_path
 
 
 def test_publisher_init():
@@ -165,6 +170,20 @@ def test_game_release_date_setter():
         game.release_date = "21/08/2008"
 
 
+def test_game_released_on():
+    game = Game(1, "Super Soccer Blast")
+    assert game.released_on is None
+    game.release_date = "Oct 21, 2008"
+    assert game.released_on == date(2008, 10, 21)
+    game.release_date = "jan 5, 2010"
+    assert game.released_on == date(2010, 1, 5)
+    for release_date in ("Feb 30, 2020", "Sept 1, 2020", "Oct 21 2008", "Oct 21, 08"):
+        with pytest.raises(ValueError):
+            game.release_date = release_date
+    assert game.release_date == "jan 5, 2010"
+    assert game.released_on == date(2010, 1, 5)
+
+
 def test_game_description_setter():
     game = Game(1, "Domino House")
     game.description = "This is a domino game"
@@ -447,3 +466,145 @@ def test_genres_dataset():
     sorted_genres = sorted(genres_set)
     sorted_genre_sample = str(sorted_genres[:3])
     assert sorted_genre_sample == "['Action', 'Adventure', 'Animation & Modeling']"
+
+
+def test_iter_games_streams_projected_columns(tmp_path):
+    games_file = tmp_path / "games.csv"
+    games_file.write_text(
+        'AppID,Name,Release date,Price,About the game,Screenshots,Head Image,Website,Publishers,Genres\n'
+        '1,Game 1,"Mar 12, 2018",0.99,About 1,"shot1,shot2",img1,site1,Valve,"Action,Indie"\n'
+        'oops,Broken,"Mar 12, 2018",0.99,,,,,Valve,Action\n'
+        '2,Game 2,"Aug 30, 2023",1.99,About 2,,img2,,Valve,Action\n',
+        encoding='utf-8')
+    reader = GameFileCSVReader(str(games_file))
+
+    games = reader.iter_games()
+    first = next(games)
+    assert (first.game_id, first.title, first.price, first.image_url) == (1, "Game 1", 0.99, "img1")
+    assert reader.get_unique_games_count() == 0
+    second = next(games)
+    assert second.game_id == 2
+    assert list(games) == []
+
+    # Publishers and genres are shared between games rather than copied per row.
+    assert second.publisher is first.publisher
+    assert second.genres[0] is first.genres[0]
+    assert reader.dataset_of_publishers == [Publisher("Valve")]
+    assert reader.dataset_of_genres == ["Action", "Indie"]
+
+
+def test_record_ranges_respect_quoted_newlines(tmp_path):
+    games_file = tmp_path / "games.csv"
+    lines = ['AppID,Name,Release date,Price,About the game,Head Image,Website,Publishers,Genres']
+    for game_id in range(1, 41):
+        description = f'Line one\nline "two" of ""{game_id}""\n\nend' if game_id % 3 else 'Short'
+        lines.append(f'{game_id},Game {game_id},"Mar 12, 2018",0.99,"{description}",img,site,Valve,"Action,Indie"')
+    games_file.write_text('\n'.join(lines) + '\n', encoding='utf-8')
+
+    header, ranges = record_ranges(str(games_file), parts=7)
+    assert header.decode().startswith('AppID,')
+    assert len(ranges) > 1
+    contents = games_file.read_bytes()
+    rows = [row for start, end in ranges for row in csv.reader(io.StringIO(contents[start:end].decode()))]
+    assert rows == list(csv.reader(io.StringIO(contents.decode())))[1:]
+
+    sequential = list(GameFileCSVReader(str(games_file)).iter_games())
+    reader = GameFileCSVReader(str(games_file))
+    parallel = list(reader.iter_games(processes=2))
+    assert [(game.game_id, game.description) for game in parallel] == \
+           [(game.game_id, game.description) for game in sequential]
+    assert parallel[0].publisher is parallel[-1].publisher
+    assert reader.dataset_of_publishers == [Publisher("Valve")]
+    assert reader.dataset_of_genres == ["Action", "Indie"]
+
+
+def test_snapshot_is_reused_until_the_csv_changes(tmp_path, monkeypatch):
+    # Several batches, even for a small file.
+    monkeypatch.setattr(snapshot, 'SNAPSHOT_BATCH_SIZE', 1)
+    games_file = tmp_path / "games.csv"
+    games_file.write_text(
+        'AppID,Name,Release date,Price,About the game,Head Image,Website,Publishers,Genres\n'
+        '1,Game 1,"Mar 12, 2018",0.99,About 1,img1,site1,Valve,"Action,Indie"\n'
+        '2,Game 2,"Aug 30, 2023",1.99,,img2,,Valve,Action\n',
+        encoding='utf-8')
+    filename = str(games_file)
+
+    # A read that stops early leaves no snapshot behind.
+    next(GameFileCSVReader(filename, snapshot=True).iter_games())
+    assert not os.path.exists(snapshot_path(filename))
+
+    parsed = list(GameFileCSVReader(filename, snapshot=True).iter_games())
+    assert os.path.exists(snapshot_path(filename))
+    assert load_snapshot(filename, PROJECTED_COLUMNS) is not None
+    reader = GameFileCSVReader(filename, snapshot=True)
+    loaded = list(reader.iter_games())
+    assert [(game.game_id, game.price, game.description, game.website_url, game.genres) for game in loaded] == \
+           [(game.game_id, game.price, game.description, game.website_url, game.genres) for game in parsed]
+    assert loaded[0].publisher is loaded[1].publisher
+    assert reader.dataset_of_genres == ["Action", "Indie"]
+
+    # Touching the file keeps the snapshot; changing it, even to the same size and modification time, doesn't.
+    stat = os.stat(filename)
+    os.utime(filename, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10 ** 9))
+    assert load_snapshot(filename, PROJECTED_COLUMNS) is not None
+    games_file.write_text(games_file.read_text(encoding='utf-8').replace('1.99', '2.99'), encoding='utf-8')
+    os.utime(filename, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10 ** 9))
+    assert load_snapshot(filename, PROJECTED_COLUMNS) is None
+    assert [game.price for game in GameFileCSVReader(filename, snapshot=True).iter_games()] == [0.99, 2.99]
+    assert [game.price for game in GameFileCSVReader(filename, snapshot=True).iter_games()] == [0.99, 2.99]
+
+
+def test_parallel_reads_build_the_same_games_with_and_without_a_snapshot(tmp_path, monkeypatch):
+    # Several batches of rows for the workers and of snapshot rows, even for a small file.
+    monkeypatch.setattr(csvdatareader, 'GAME_BATCH_SIZE', 2)
+    monkeypatch.setattr(snapshot, 'SNAPSHOT_BATCH_SIZE', 3)
+    games_file = tmp_path / "games.csv"
+    lines = ['AppID,Name,Release date,Price,About the game,Head Image,Website,Publishers,Genres']
+    for game_id in range(1, 8):
+        price = 'free' if game_id == 4 else '0.99'
+        lines.append(f'{game_id},Game {game_id},"Mar 12, 2018",{price},About {game_id},img,site,Valve,"Action,Indie"')
+    games_file.write_text('\n'.join(lines) + '\n', encoding='utf-8')
+    filename = str(games_file)
+
+    def contents(games):
+        return [(game.game_id, game.released_on, game.price, game.description, game.genres) for game in games]
+
+    sequential = contents(GameFileCSVReader(filename).iter_games())
+    assert [game_id for game_id, *_ in sequential] == [1, 2, 3, 5, 6, 7]
+
+    # The first read parses the file and writes the snapshot, the second builds the games from the snapshot.
+    for snapshot_written in (False, True):
+        assert (load_snapshot(filename, PROJECTED_COLUMNS) is not None) == snapshot_written
+        reader = GameFileCSVReader(filename, snapshot=True)
+        parallel = list(reader.iter_games(processes=2))
+        assert contents(parallel) == sequential
+        assert parallel[0].publisher is parallel[-1].publisher
+        assert parallel[0].genres[0] is parallel[-1].genres[0]
+        assert reader.dataset_of_publishers == [Publisher("Valve")]
+
+
+def test_iter_fingerprinted_games(tmp_path):
+    games_file = tmp_path / "games.csv"
+    header = 'AppID,Name,Release date,Price,About the game,Reviews,Head Image,Website,Publishers,Genres\n'
+    games_file.write_text(header + '1,Game 1,"Mar 12, 2018",0.99,About 1,Good,img1,site1,Valve,Action\n'
+                                   '2,Game 2,"Aug 30, 2023",1.99,About 2,Bad,img2,,Valve,Action\n', encoding='utf-8')
+    before = {game_id: (fingerprint, build_game)
+              for game_id, fingerprint, build_game in GameFileCSVReader(str(games_file)).iter_fingerprinted_games()}
+    assert before[2][1]().price == 1.99
+
+    # Only columns a game is built from count: the reviews column changing leaves game 1's fingerprint alone.
+    games_file.write_text(header + '1,Game 1,"Mar 12, 2018",0.99,About 1,Great,img1,site1,Valve,Action\n'
+                                   '2,Game 2,"Aug 30, 2023",2.99,About 2,Bad,img2,,Valve,Action\n', encoding='utf-8')
+    after = {game_id: (fingerprint, build_game)
+             for game_id, fingerprint, build_game in GameFileCSVReader(str(games_file)).iter_fingerprinted_games()}
+    assert before[1][0] == after[1][0]
+    assert before[2][0] != after[2][0]
+    assert after[2][1]().price == 2.99
+
+    # Built up front, as a first load reads them, the games come with the same fingerprints.
+    built = {game_id: (fingerprint, build_game())
+             for game_id, fingerprint, build_game in GameFileCSVReader(str(games_file)).iter_fingerprinted_games(
+                 processes=2, built=True)}
+    assert {game_id: fingerprint for game_id, (fingerprint, _) in built.items()} == \
+           {game_id: fingerprint for game_id, (fingerprint, _) in after.items()}
+    assert built[2][1].price == 2.99
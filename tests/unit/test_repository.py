@@ -1,6 +1,8 @@
 import pytest
-from games.domainmodel.model import Game, Review, User
+from datetime import date
+from games.domainmodel.model import Game, Genre, Publisher, Review, User
 from games.adapters.memory_repository import MemoryRepository
+from games.adapters.repository import RepositoryException
 
 
 
@@ -46,22 +48,64 @@ def test_add_and_retrieve_game(sample_repo):
     retrieved_game = sample_repo.get_games()[2]
     assert retrieved_game == game
 
+def test_get_games_page(sample_repo):
+    sample_repo.add_game(Game(3, "A Game"))
+    page = sample_repo.get_games_page(0, 2)
+    assert [game.title for game in page] == ["A Game", "Game 1"]
+    page = sample_repo.get_games_page(2, 2)
+    assert [game.title for game in page] == ["Game 2"]
+    # The cached ordering is refreshed when the catalog changes.
+    sample_repo.add_game(Game(4, "0 Game"))
+    assert sample_repo.get_games_page(0, 1)[0].title == "0 Game"
+
+def test_get_games_after(sample_repo):
+    sample_repo.add_game(Game(3, "Game 1"))
+    games = sample_repo.get_games_after("Game 1", 1, 10)
+    assert [game.game_id for game in games] == [3, 2]
+    games = sample_repo.get_games_after("Game 1", 3, 1)
+    assert [game.game_id for game in games] == [2]
+    assert sample_repo.get_games_after("Game 2", 2, 10) == []
+
+def test_iter_games(sample_repo):
+    sample_repo.add_game(Game(3, "Game 1"))
+    assert [game.game_id for game in sample_repo.iter_games()] == [1, 3, 2]
+
 def test_get_number_of_games(sample_repo):
     assert sample_repo.get_number_of_games() == 2
 
+def test_adding_a_game_again_replaces_it(sample_repo):
+    sample_repo.add_game(Game(1, "A"))
+    assert sample_repo.get_number_of_games() == 2
+    assert [game.title for game in sample_repo.get_games()] == ["A", "Game 2"]
+    assert [game.title for game in sample_repo.get_games_page(0, 10)] == ["A", "Game 2"]
+
+    sample_repo.add_multiple_games([Game(2, "B"), Game(3, "C"), Game(3, "D")])
+    assert sample_repo.get_number_of_games() == 3
+    assert [game.title for game in sample_repo.get_games()] == ["A", "B", "D"]
+    assert [game.title for game in sample_repo.get_games_page(0, 10)] == ["A", "B", "D"]
+
 def test_get_unique_genres(sample_repo):
     genres = sample_repo.get_all_genres()
     assert len(genres) == 0
 
-def test_get_nonexistent_game_title_by_id(sample_repo):
+def test_get_game_title_by_id(sample_repo):
     game_id = 1
     game_title = sample_repo.get_title_by_id(game_id)
-    assert game_title is None
+    assert game_title == "Game 1"
 
-def test_get_nonexistent_date_by_id(sample_repo):
+def test_get_date_by_id(sample_repo):
     game_id = 1
     game_date = sample_repo.get_date_by_id(game_id)
-    assert game_date is None
+    assert game_date == "Mar 12, 2018"
+
+def test_set_games_rebuilds_id_index(sample_repo):
+    game = Game(3, "Game 3")
+    game.price = 2.99
+    sample_repo.set_games([game])
+    assert sample_repo.get_game_by_id(3) is game
+    assert sample_repo.get_price_by_id(3) == 2.99
+    # Games added earlier through add_game remain reachable by id.
+    assert sample_repo.get_title_by_id(2) == "Game 2"
 
 def test_search_games_by_title(sample_repo):
     games_found = sample_repo.search_games("Game 1")
@@ -102,6 +146,20 @@ def test_search_nonexistent_game_by_title(sample_repo):
     games_found = sample_repo.search_games("Nonexistent Game")
     assert len(games_found) == 0
 
+def test_get_games_by_genre_page(sample_repo):
+    action = Genre("Action")
+    for game_id, title in [(5, "Zeta"), (4, "Alpha"), (6, "Mid")]:
+        game = Game(game_id, title)
+        game.add_genre(action)
+        sample_repo.add_game(game)
+
+    page = sample_repo.get_games_by_genre_page("Action", 0, 2)
+    assert [game.title for game in page] == ["Alpha", "Mid"]
+    page = sample_repo.get_games_by_genre_page("Action", 2, 2)
+    assert [game.title for game in page] == ["Zeta"]
+    assert sample_repo.get_number_of_games_by_genre("Action") == 3
+    assert sample_repo.get_number_of_games_by_genre("Nonexistent Genre") == 0
+
 def test_search_games_by_nonexistent_genre_name(sample_repo):
     genre_name = "Nonexistent Genre"
     games_found = sample_repo.get_games_by_genre(genre_name)
@@ -120,6 +178,11 @@ def test_get_game_by_id_nonexistent(sample_repo):
     game = sample_repo.get_game_by_id(999)
     assert game is None
 
+def test_get_games_by_ids(sample_repo):
+    games = sample_repo.get_games_by_ids([2, 999, "1"])
+    assert [game.title if game else None for game in games] == ["Game 2", None, "Game 1"]
+    assert sample_repo.get_games_by_ids([]) == []
+
 def test_add_review(sample_repo):
     # Test adding a review for a nonexistent game
     user = User("new_user", "password123")
@@ -200,3 +263,225 @@ def test_get_wishlist(sample_repo):
 
 
 
+
+
+def test_search_games_ranks_prefixes_and_pages(sample_repo):
+    zelda = Game(3, "The Legend of Zelda")
+    zelda.description = "A classic adventure"
+    legends = Game(4, "Legends Arena")
+    legends.description = "Zelda-like dungeons"
+    sample_repo.add_game(zelda)
+    sample_repo.add_game(legends)
+
+    assert sample_repo.search_games("legend zel") == [zelda]
+    assert sample_repo.search_games("legend zel", in_description=True) == [zelda, legends]
+    assert sample_repo.search_games("legend", 1, 1) == [zelda]
+    assert sample_repo.get_number_of_search_results("legend") == 2
+    assert sample_repo.get_number_of_search_results("dungeon", in_description=True) == 1
+    assert sample_repo.search_games("  ") == []
+
+
+def test_search_by_criteria(sample_repo):
+    action = Genre("Action")
+    for game_id, title, price, publisher in [(3, "Zeta Strike", 0.99, "Valve"), (4, "Alpha Strike", 4.99, "Valve"),
+                                             (5, "Beta Strike", 0.99, "Valhalla")]:
+        game = Game(game_id, title)
+        game.price = price
+        game.publisher = Publisher(publisher)
+        game.add_genre(action)
+        sample_repo.add_game(game)
+
+    assert [game.game_id for game in sample_repo.search({'genre': "Action"})] == [4, 5, 3]
+    assert [game.game_id for game in sample_repo.search({'genre': "Action", 'price': 0.99})] == [5, 3]
+    assert [game.game_id for game in sample_repo.search({'publisher': "Val"}, 1, 1)] == [5]
+    assert [game.game_id for game in sample_repo.search({'publisher': "Valv", 'title': "strike"})] == [4, 3]
+    assert [game.game_id for game in sample_repo.search({'game_id': 1})] == [1]
+    assert sample_repo.get_number_of_games_matching({'publisher': "Val"}) == 3
+    assert sample_repo.get_number_of_games_matching({'game_id': 999}) == 0
+    with pytest.raises(RepositoryException):
+        sample_repo.search({'colour': "red"})
+
+
+def test_search_by_price_range(sample_repo):
+    action = Genre("Action")
+    for game_id, title, price in [(3, "Free Game", 0), (4, "Cheap Game", 0.99), (5, "Big Game", 59.99)]:
+        game = Game(game_id, title)
+        game.price = price
+        game.add_genre(action)
+        sample_repo.add_game(game)
+
+    assert [game.game_id for game in sample_repo.search({'max_price': 0})] == [3]
+    assert [game.game_id for game in sample_repo.search({'min_price': 0.5, 'max_price': 2})] == [4, 1, 2]
+    assert [game.game_id for game in sample_repo.search({'min_price': 0.5}, 1, 2)] == [1, 2]
+    assert [game.game_id for game in sample_repo.search({'min_price': 0.5, 'genre': "Action"})] == [4, 5]
+    assert [game.game_id for game in sample_repo.search({'price': 0.99})] == [4, 1]
+    assert sample_repo.get_number_of_games_matching({'min_price': 1}) == 2
+    assert sample_repo.get_number_of_games_matching({'min_price': 5, 'max_price': 1}) == 0
+
+
+def test_search_by_release_date_range(sample_repo):
+    for game_id, title, release_date in [(3, "Old Game", "Jan 5, 1999"), (4, "New Game", "Mar 12, 2018")]:
+        game = Game(game_id, title)
+        game.release_date = release_date
+        game.price = 4.99
+        sample_repo.add_game(game)
+    sample_repo.add_game(Game(5, "Undated Game"))
+
+    assert [game.game_id for game in sample_repo.get_games_page(0, 10, order_by='release_date')] == [5, 3, 1, 4, 2]
+    assert [game.game_id for game in sample_repo.search({'min_release_date': date(2018, 1, 1)})] == [1, 4, 2]
+    assert [game.game_id for game in sample_repo.search({'max_release_date': date(2018, 12, 31)})] == [3, 1, 4]
+    assert [game.game_id for game in sample_repo.search({'min_release_date': date(2000, 1, 1),
+                                                         'max_release_date': date(2018, 12, 31)}, 1, 1)] == [4]
+    # A price range still orders by price, the release dates only narrow it down.
+    assert [game.game_id for game in sample_repo.search({'min_price': 1, 'min_release_date': date(2018, 1, 1)})] \
+        == [2, 4]
+    assert [game.game_id for game in sample_repo.search({'title': "game", 'max_release_date': date(2018, 3, 12)})] \
+        == [3, 1, 4]
+    assert sample_repo.get_number_of_games_matching({'min_release_date': date(2019, 1, 1)}) == 1
+    assert sample_repo.get_number_of_games_matching({'min_release_date': date(2030, 1, 1)}) == 0
+
+
+def test_browse_orderings(sample_repo):
+    action = Genre("Action")
+    for game_id, title, price in [(3, "Action Game", 0.99), (4, "Cheap Game", 0)]:
+        game = Game(game_id, title)
+        game.price = price
+        game.add_genre(action)
+        sample_repo.add_game(game)
+
+    def page(order_by, genre_name=None, offset=0, limit=10):
+        if genre_name is None:
+            return [game.game_id for game in sample_repo.get_games_page(offset, limit, order_by)]
+        return [game.game_id for game in sample_repo.get_games_by_genre_page(genre_name, offset, limit, order_by)]
+
+    assert page('title') == [3, 4, 1, 2]
+    assert page('price') == [4, 3, 1, 2]
+    assert page('price', offset=1, limit=2) == [3, 1]
+    assert page('release_date') == [3, 4, 1, 2]
+    # Game 1 averages 4.5 and game 2 3, the games without reviews come last in title order.
+    assert page('rating') == [1, 2, 3, 4]
+    assert page('price', "Action") == [4, 3]
+    assert page('rating', "Action") == [3, 4]
+    assert page('rating', "Nonexistent Genre") == []
+
+    # A review reorders by rating straight away.
+    sample_repo.add_review(Review(User("user3", "password3"), sample_repo.get_game_by_id(4), 5, "Great"))
+    assert page('rating') == [4, 1, 2, 3]
+    assert page('rating', "Action") == [4, 3]
+
+    # As does a price change once the game is added again.
+    game = Game(2, "Game 2")
+    game.price = 0
+    sample_repo.add_game(game)
+    assert page('price') == [4, 2, 3, 1]
+
+    with pytest.raises(RepositoryException):
+        sample_repo.get_games_page(0, 10, order_by='popularity')
+    with pytest.raises(RepositoryException):
+        sample_repo.get_games_by_genre_page("Action", 0, 10, order_by='popularity')
+
+
+def test_game_cards_are_cached_until_the_game_changes(sample_repo):
+    game = sample_repo.get_game_by_id(1)
+    game.publisher = Publisher("Valve")
+    game.add_genre(Genre("Action"))
+
+    card, missing = sample_repo.get_game_cards([game, None])
+    assert (card.game_id, card.title, card.price, card.publisher_name, card.genres) == \
+        (1, "Game 1", 0.99, "Valve", ("Action",))
+    assert card['title'] == "Game 1"
+    assert missing is None
+    with pytest.raises(AttributeError):
+        card.title = "Renamed"
+    assert sample_repo.get_game_cards([game])[0] is card
+
+    renamed = Game(1, "Game 1 Remastered")
+    sample_repo.add_game(renamed)
+    assert sample_repo.get_game_cards([renamed])[0].title == "Game 1 Remastered"
+    assert sample_repo.get_game_cards([sample_repo.get_game_by_id(2)])[0].title == "Game 2"
+
+
+def test_catalog_version_counts_catalog_writes(sample_repo):
+    version = sample_repo.get_catalog_version()
+    sample_repo.add_game(Game(3, "Game 3"))
+    assert sample_repo.get_catalog_version() > version
+
+    version = sample_repo.get_catalog_version()
+    sample_repo.add_to_wishlist("user1", 3)
+    sample_repo.add_user(User("user3", "password3"))
+    assert sample_repo.get_catalog_version() == version
+    sample_repo.add_review(Review(User("user3", "password3"), sample_repo.get_game_by_id(3), 4, "Fine"))
+    assert sample_repo.get_catalog_version() > version
+
+    version = sample_repo.get_catalog_version()
+    sample_repo.add_multiple_genres([Genre("Puzzle")])
+    assert sample_repo.get_catalog_version() > version
+    assert sample_repo.get_catalog_stamp() == (sample_repo.get_catalog_version(), sample_repo.get_catalog_epoch(),
+                                               sample_repo.get_catalog_last_modified())
+
+
+def test_game_versions_stamp_writes_to_each_game(sample_repo):
+    assert sample_repo.get_game_version(999) is None
+    other = sample_repo.get_game_version(1)
+    added = sample_repo.get_game_version(2)
+
+    sample_repo.add_to_wishlist("user1", 2)
+    wishlisted = sample_repo.get_game_version(2)
+    assert wishlisted.wishlist_version > added.wishlist_version
+    assert wishlisted[:2] == added[:2]
+    sample_repo.add_review(Review(User("user3", "password3"), sample_repo.get_game_by_id(2), 4, "Fine"))
+    reviewed = sample_repo.get_game_version(2)
+    assert reviewed.review_version > wishlisted.wishlist_version
+    sample_repo.remove_multiple_from_wishlist("user1", [2, 999])
+    assert sample_repo.get_game_version(2).wishlist_version > reviewed.review_version
+
+    sample_repo.add_game(Game(2, "Game 2 Remastered"))
+    assert sample_repo.get_game_version(2).version > sample_repo.get_game_version(2).wishlist_version
+    assert sample_repo.get_game_version(2).modified_at is not None
+    # Other games are untouched.
+    assert sample_repo.get_game_version(1)[:3] == other[:3]
+    assert sample_repo.get_game_version(1).epoch == sample_repo.get_catalog_epoch()
+
+
+def test_game_versions_never_repeat_for_a_game_added_again():
+    repo = MemoryRepository()
+    game = Game(1, "Game 1")
+    repo.sync_games([(1, "first", lambda: game)])
+    first = repo.get_game_version(1)
+
+    repo.sync_games([])
+    assert repo.get_game_version(1) is None
+    repo.sync_games([(1, "second", lambda: Game(1, "Game 1 Remastered"))])
+    assert repo.get_game_version(1)[:3] != first[:3]
+    # A new repository starts counting again, under a different epoch.
+    assert MemoryRepository().get_catalog_epoch() != repo.get_catalog_epoch()
+
+
+def test_sync_games_writes_only_changes():
+    repo = MemoryRepository()
+
+    def catalog(*titles):
+        games = []
+        for game_id, title in titles:
+            game = Game(game_id, title)
+            game.add_genre(Genre("Action"))
+            games.append((game_id, f"{game_id}:{title}", lambda game=game: game))
+        return games
+
+    assert repo.sync_games(catalog((1, "Game 1"), (2, "Game 2"), (3, "Game 3"))) == \
+        {'added': 3, 'updated': 0, 'removed': 0, 'kept': 0, 'unchanged': 0}
+    first_game_3 = repo.get_game_by_id(3)
+    repo.add_to_wishlist("user1", 2)
+
+    counts = repo.sync_games(catalog((1, "Game 1 Remastered"), (3, "Game 3"), (4, "Game 4")))
+    assert counts == {'added': 1, 'updated': 1, 'removed': 0, 'kept': 1, 'unchanged': 1}
+    # Unchanged games are left as they were; the wishlisted game stays although it is no longer listed.
+    assert repo.get_game_by_id(3) is first_game_3
+    assert [game.title for game in repo.get_games()] == ["Game 1 Remastered", "Game 2", "Game 3", "Game 4"]
+    assert [game.game_id for game in repo.search_games("remastered")] == [1]
+    assert repo.get_wishlist("user1") == [2]
+
+    repo.remove_from_wishlist("user1", 2)
+    assert repo.sync_games(catalog((1, "Game 1 Remastered"), (3, "Game 3"), (4, "Game 4")))['removed'] == 1
+    assert repo.get_game_by_id(2) is None
+    assert repo.get_number_of_games_by_genre("Action") == 3
@@ -1,4 +1,5 @@
 import pytest
+from datetime import date
 from werkzeug.security import check_password_hash
 
 from games.adapters.memory_repository import MemoryRepository
@@ -6,6 +7,8 @@ import games.browse.services as services
 from games.domainmodel.model import Genre, Publisher, Game, Review, User
 import games.authentication.services as auth_services
 import games.wishlist.service as wishlist_services
+from games.browse.fragment_cache import FragmentCache
+import games.api.services as api_services
 
 
 @pytest.fixture
@@ -64,6 +67,25 @@ def test_get_paginated_games_for_pagination2(sample_repo):
     assert games == []
 
 
+def test_browse_cursor_round_trip(sample_repo):
+    cursor = services.encode_cursor("Game 1", 1)
+    assert services.decode_cursor(cursor) == ("Game 1", 1)
+    games, next_cursor = services.get_games_after_cursor(sample_repo, cursor)
+    assert [game['game_id'] for game in games] == [2]
+    assert next_cursor is None
+
+
+def test_decode_invalid_cursor():
+    with pytest.raises(ValueError):
+        services.decode_cursor("not a cursor")
+
+
+def test_get_next_cursor(sample_repo):
+    games = services.get_paginated_games(sample_repo, page_num=1)
+    assert services.get_next_cursor(games, page_num=1, num_games=2) is None
+    assert services.get_next_cursor(games, page_num=1, num_games=20) == services.encode_cursor("Game 2", 2)
+
+
 def test_get_games_by_nonexistent_genre(sample_repo):
     games = services.get_paginated_games_by_genre(sample_repo, genre_name="Nonexistent Genre", page_num=1)
     assert games == []
@@ -124,11 +146,31 @@ def test_search_games_by_title_nonexistent_game(sample_repo):
 sample_user = User("e", "eeeeeeeee")
 
 
-def test_get_game_by_invalid_id(sample_repo):
+def test_get_game_by_id(sample_repo):
     game = services.get_game_by_id(sample_repo, 1)
+    assert game.title == "Game 1"
+
+
+def test_get_game_by_invalid_id(sample_repo):
+    game = services.get_game_by_id(sample_repo, 999)
     assert game is None
 
 
+def test_get_game_detail(sample_repo):
+    wishlist_services.add_game_to_wishlist(sample_repo, "user1", 1)
+    detail = services.get_game_detail(sample_repo, 1, "user1")
+    assert detail['title'] == "Game 1"
+    assert detail['review_count'] == 2
+    assert detail['average_rating'] == 4.5
+    assert detail['user_reviewed'] is True
+    assert detail['in_wishlist'] is True
+
+    detail = services.get_game_detail(sample_repo, 2, None)
+    assert detail['user_reviewed'] is False
+    assert detail['in_wishlist'] is False
+    assert services.get_game_detail(sample_repo, 999) is None
+
+
 def test_get_average_rating():
     reviews = [
         Review(sample_user, Game(1, "Game 1"), 4, "Good game"),
@@ -266,6 +308,16 @@ def test_remove_from_wishlist(sample_repo):
     user_wishlist = wishlist_services.get_game_wishlist(sample_repo,"user1")
     assert len(user_wishlist) == 2
 
+def test_remove_games_from_wishlist(sample_repo):
+    for game_id in (1, 2, 3):
+        wishlist_services.add_game_to_wishlist(sample_repo, "user1", game_id)
+    wishlist_services.add_game_to_wishlist(sample_repo, "user2", 1)
+
+    wishlist_services.remove_games_from_wishlist(sample_repo, "user1", [1, 3])
+    assert sample_repo.get_wishlist("user1") == [2]
+    assert sample_repo.get_wishlist("user2") == [1]
+
+
 def test_get_user_wishlist(sample_repo):
 
     wishlist_services.add_game_to_wishlist(sample_repo,"user1", 1)
@@ -308,3 +360,132 @@ def test_get_user_activities_with_data(sample_repo):
 
     assert activities['rated_games'][0].game.game_id == 1
     assert activities['reviews'][0].game.game_id == 1
+
+
+def test_search_games_by_title_in_description(sample_repo):
+    games = services.search_games_by_title(sample_repo, "description", in_description=True)
+    assert [game.title for game in games] == ["Game 1", "Game 2"]
+    assert services.get_number_of_title_search_results(sample_repo, "description") == 0
+
+
+def test_search_criteria():
+    assert services.search_criteria("id", "7940") == {'game_id': 7940}
+    assert services.search_criteria("genres", " Action ") == {'genre': "Action"}
+    assert services.search_criteria("unknown", "query") is None
+    with pytest.raises(ValueError):
+        services.search_criteria("price", "cheap")
+
+
+def test_game_id_criteria():
+    assert services.game_id_criteria(" 7940 ") == {'game_id': 7940}
+    assert services.search_criteria("id", str(2 ** 63 - 1)) == {'game_id': 2 ** 63 - 1}
+    for query in ["99999999999999999999", str(2 ** 63), str(-2 ** 63 - 1), "seven"]:
+        with pytest.raises(ValueError):
+            services.search_criteria("id", query)
+
+
+def test_search_games_pages_results(sample_repo):
+    games = services.search_games(sample_repo, {'price': 1.99})
+    assert [game.title for game in games] == ["Game 2"]
+    assert services.search_games(sample_repo, {'price': 1.99}, page_num=2) == []
+    assert services.get_number_of_search_results(sample_repo, {'title': "game"}) == 2
+
+
+def test_price_criteria():
+    assert services.price_criteria("free") == {'max_price': 0}
+    assert services.price_criteria(" 5 - 20 ") == {'min_price': 5.0, 'max_price': 20.0}
+    assert services.price_criteria("5-") == {'min_price': 5.0}
+    assert services.price_criteria("-20") == {'max_price': 20.0}
+    assert services.price_criteria("1.99") == {'price': 1.99}
+    with pytest.raises(ValueError):
+        services.price_criteria("-")
+
+
+def test_release_year_criteria():
+    assert services.release_year_criteria("2015") == {'min_release_date': date(2015, 1, 1),
+                                                      'max_release_date': date(2015, 12, 31)}
+    assert services.release_year_criteria(" 2015 - 2018 ") == {'min_release_date': date(2015, 1, 1),
+                                                               'max_release_date': date(2018, 12, 31)}
+    assert services.release_year_criteria("2015-") == {'min_release_date': date(2015, 1, 1)}
+    assert services.release_year_criteria("-2018") == {'max_release_date': date(2018, 12, 31)}
+    assert services.search_criteria('release', "2018") == services.release_year_criteria("2018")
+    for query in ("-", "recent", "0"):
+        with pytest.raises(ValueError):
+            services.release_year_criteria(query)
+
+
+def test_fragment_cache_evicts_least_recently_used_and_drops_old_versions():
+    cache = FragmentCache(maxsize=2)
+    renders = []
+
+    def render(fragment):
+        def render_fragment():
+            renders.append(fragment)
+            return fragment
+        return render_fragment
+
+    assert cache.get_or_render('page 1', 1, render('one')) == 'one'
+    assert cache.get_or_render('page 2', 1, render('two')) == 'two'
+    assert cache.get_or_render('page 1', 1, render('one again')) == 'one'
+    # Page 2 was used least recently, so page 3 evicts it.
+    cache.get_or_render('page 3', 1, render('three'))
+    assert cache.get_or_render('page 2', 1, render('two again')) == 'two again'
+    assert renders == ['one', 'two', 'three', 'two again']
+
+    # A new catalog version drops everything rendered from the old one.
+    assert cache.get_or_render('page 1', 2, render('one, version 2')) == 'one, version 2'
+    assert len(cache) == 1
+
+    with pytest.raises(ValueError):
+        cache.get_or_render('page 4', 2, lambda: int('not a page'))
+    assert len(cache) == 1
+
+
+def test_api_fields_leave_out_descriptions_unless_asked_for(sample_repo):
+    assert 'description' not in api_services.parse_fields(None)
+    assert api_services.parse_fields("title, description,title") == ('title', 'description')
+    for fields in ("title,cheats", " , "):
+        with pytest.raises(ValueError):
+            api_services.parse_fields(fields)
+
+    game = sample_repo.get_game_by_id(1)
+    assert api_services.project_game(game, ('game_id', 'description')) == {
+        'game_id': 1, 'description': "Description for Game 1"}
+    assert api_services.project_game(game, ('released_on', 'publisher')) == {
+        'released_on': "2018-03-12", 'publisher': None}
+
+
+def test_api_limit():
+    assert api_services.parse_limit(None) == api_services.DEFAULT_LIMIT
+    assert api_services.parse_limit("5") == 5
+    for limit in ("0", "1000", "five"):
+        with pytest.raises(ValueError):
+            api_services.parse_limit(limit)
+
+
+def test_api_games_pages_follow_the_cursor(sample_repo):
+    page = api_services.get_games_page(sample_repo, ('title',), 1)
+    assert page['games'] == [{'title': "Game 1"}]
+    assert page['count'] == 2
+    page = api_services.get_games_page(sample_repo, ('title',), 1, page['next_cursor'])
+    assert page['games'] == [{'title': "Game 2"}]
+    assert page['next_cursor'] is None
+    with pytest.raises(ValueError):
+        api_services.get_games_page(sample_repo, ('title',), 1, "not a cursor")
+
+
+def test_api_search_pages_follow_the_cursor(sample_repo):
+    page = api_services.get_search_page(sample_repo, {'title': "game"}, ('game_id',), 1)
+    assert page['games'] == [{'game_id': 1}]
+    assert page['count'] == 2
+    page = api_services.get_search_page(sample_repo, {'title': "game"}, ('game_id',), 1, page['next_cursor'])
+    assert page['games'] == [{'game_id': 2}]
+    assert page['next_cursor'] is None
+    with pytest.raises(ValueError):
+        api_services.get_search_page(sample_repo, {'title': "game"}, ('game_id',), 1,
+                                     api_services.encode_offset_cursor(-1))
+
+
+def test_api_ndjson_lines(sample_repo):
+    lines = list(api_services.iter_ndjson_lines(sample_repo, ('game_id', 'price')))
+    assert lines == ['{"game_id": 1, "price": 0.99}\n', '{"game_id": 2, "price": 1.99}\n']
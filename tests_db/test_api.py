@@ -0,0 +1,76 @@
+import json
+
+import pytest
+from sqlalchemy import create_engine
+
+import games.adapters.repository as repo
+from games import create_app, mapper_registry
+from games.domainmodel.model import Game
+
+
+@pytest.fixture
+def client():
+    # With the schema already in place, create_app leaves the database empty rather than loading games.csv.
+    database_engine = create_engine('sqlite:///games.db')
+    mapper_registry.metadata.drop_all(database_engine)
+    mapper_registry.metadata.create_all(database_engine)
+    app = create_app(testing=True)
+    for game_id, title in [(1, "Beta"), (2, "Alpha"), (3, "Gamma")]:
+        game = Game(game_id, title)
+        game.release_date = "Mar 12, 2018"
+        game.price = 0.99
+        game.description = f"All about {title}"
+        repo.repo_instance.add_game(game)
+    yield app.test_client()
+    repo.repo_instance.close_session()
+    mapper_registry.metadata.drop_all(create_engine(app.config['SQLALCHEMY_DATABASE_URI']))
+
+
+def test_games_are_paged_by_cursor(client):
+    response = client.get('/api/games?limit=2')
+    assert response.status_code == 200
+    page = response.get_json()
+    assert [game['title'] for game in page['games']] == ["Alpha", "Beta"]
+    assert 'description' not in page['games'][0]
+    assert page['count'] == 3
+
+    page = client.get(f"/api/games?limit=2&fields=game_id,description&cursor={page['next_cursor']}").get_json()
+    assert page['games'] == [{'game_id': 3, 'description': "All about Gamma"}]
+    assert page['next_cursor'] is None
+
+
+def test_search_results_are_paged_by_cursor(client):
+    page = client.get('/api/games?search_type=price&query=0.99&fields=game_id&limit=2').get_json()
+    assert page['count'] == 3
+    game_ids = [game['game_id'] for game in page['games']]
+    page = client.get(f"/api/games?search_type=price&query=0.99&fields=game_id&limit=2"
+                      f"&cursor={page['next_cursor']}").get_json()
+    game_ids += [game['game_id'] for game in page['games']]
+    assert sorted(game_ids) == [1, 2, 3]
+    assert page['next_cursor'] is None
+
+    page = client.get('/api/games?search_type=title&query=alpha&fields=title').get_json()
+    assert page['games'] == [{'title': "Alpha"}]
+
+
+@pytest.mark.parametrize('query', ['fields=cheats', 'limit=0', 'cursor=nope', 'format=xml',
+                                   'search_type=nothing&query=a', 'search_type=price&query=cheap',
+                                   'search_type=id&query=99999999999999999999'])
+def test_bad_requests(client, query):
+    response = client.get(f'/api/games?{query}')
+    assert response.status_code == 400
+    assert 'error' in response.get_json()
+
+
+
+def test_search_page_finds_nothing_for_an_id_out_of_range(client):
+    response = client.get('/search?search_type=id&query=99999999999999999999')
+    assert response.status_code == 200
+
+def test_ndjson_streams_every_game(client):
+    response = client.get('/api/games?format=ndjson&fields=game_id,title')
+    assert response.status_code == 200
+    assert response.mimetype == 'application/x-ndjson'
+    assert response.is_streamed
+    games = [json.loads(line) for line in response.get_data(as_text=True).splitlines()]
+    assert games == [{'game_id': 2, 'title': "Alpha"}, {'game_id': 1, 'title': "Beta"}, {'game_id': 3, 'title': "Gamma"}]
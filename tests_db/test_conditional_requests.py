@@ -0,0 +1,88 @@
+import pytest
+from sqlalchemy import create_engine, event
+
+import games.adapters.repository as repo
+from games import create_app, mapper_registry
+from games.domainmodel.model import Game, Review, User
+
+
+@pytest.fixture
+def client():
+    # With the schema already in place, create_app leaves the database empty rather than loading games.csv.
+    database_engine = create_engine('sqlite:///games.db')
+    mapper_registry.metadata.drop_all(database_engine)
+    mapper_registry.metadata.create_all(database_engine)
+    app = create_app(testing=True)
+    for game_id in (1, 2):
+        game = Game(game_id, f"Game {game_id}")
+        game.release_date = "Mar 12, 2018"
+        game.price = 0.99
+        repo.repo_instance.add_game(game)
+    yield app.test_client()
+    repo.repo_instance.close_session()
+    mapper_registry.metadata.drop_all(create_engine(app.config['SQLALCHEMY_DATABASE_URI']))
+
+
+@pytest.mark.parametrize('path', ['/browse', '/browse/page/1?sort=price', '/game/1'])
+def test_unchanged_pages_are_not_sent_again(client, path):
+    response = client.get(path)
+    assert response.status_code == 200
+    assert response.cache_control.public and response.cache_control.no_cache
+    assert 'Cookie' in response.vary
+
+    etag = response.headers['ETag']
+    assert client.get(path, headers={'If-None-Match': etag}).status_code == 304
+    not_modified = client.get(path, headers={'If-Modified-Since': response.headers['Last-Modified']})
+    assert not_modified.status_code == 304
+    assert not_modified.data == b''
+    assert not_modified.headers['ETag'] == etag
+
+
+@pytest.mark.parametrize('path', ['/browse', '/game/1'])
+def test_not_modified_costs_one_query(client, path):
+    etag = client.get(path).headers['ETag']
+    engine = repo.repo_instance._session_cm.session.get_bind()
+    statements = []
+
+    def record_statement(connection, cursor, statement, *args):
+        statements.append(statement)
+
+    event.listen(engine, 'before_cursor_execute', record_statement)
+    try:
+        assert client.get(path, headers={'If-None-Match': etag}).status_code == 304
+    finally:
+        event.remove(engine, 'before_cursor_execute', record_statement)
+    assert len(statements) == 1
+
+def test_writes_change_the_validators(client):
+    browse_etag = client.get('/browse').headers['ETag']
+    game_etags = {game_id: client.get(f'/game/{game_id}').headers['ETag'] for game_id in (1, 2)}
+
+    user = User("user1", "password1")
+    repo.repo_instance.add_user(user)
+    repo.repo_instance.add_review(Review(user, repo.repo_instance.get_game(1), 5, "Great"))
+
+    assert client.get('/browse', headers={'If-None-Match': browse_etag}).status_code == 200
+    assert client.get('/game/1', headers={'If-None-Match': game_etags[1]}).status_code == 200
+    # A review of game 1 doesn't change game 2's page.
+    assert client.get('/game/2', headers={'If-None-Match': game_etags[2]}).status_code == 304
+
+
+def test_a_game_added_again_is_not_served_from_its_old_etag(client):
+    def catalog(*titles):
+        games = []
+        for game_id, title in titles:
+            game = Game(game_id, title)
+            game.release_date = "Mar 12, 2018"
+            game.price = 0.99
+            games.append((game_id, title, lambda game=game: game))
+        return games
+
+    # Game 2 has been written once, by the fixture.
+    etag = client.get('/game/2').headers['ETag']
+
+    repo.repo_instance.sync_games(catalog((1, "Game 1")))
+    repo.repo_instance.sync_games(catalog((1, "Game 1"), (2, "Game 2 Remastered")))
+    response = client.get('/game/2', headers={'If-None-Match': etag})
+    assert response.status_code == 200
+    assert b"Game 2 Remastered" in response.data
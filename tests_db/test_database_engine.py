@@ -0,0 +1,35 @@
+import pytest
+from sqlalchemy import text, NullPool, QueuePool
+
+from games.adapters.database_engine import create_database_engine, engine_config, DEFAULT_ENGINE_CONFIG
+
+
+def test_engine_config_overrides_defaults():
+    settings = engine_config({'SQLITE_POOL': 'null', 'SQLITE_CACHE_SIZE': None, 'SECRET_KEY': 'ignored'})
+
+    assert settings['SQLITE_POOL'] == 'null'
+    assert settings['SQLITE_CACHE_SIZE'] is None
+    assert settings['SQLITE_JOURNAL_MODE'] == DEFAULT_ENGINE_CONFIG['SQLITE_JOURNAL_MODE']
+    assert 'SECRET_KEY' not in settings
+
+
+def test_engine_applies_pragmas_on_connect(tmp_path):
+    engine = create_database_engine(f"sqlite:///{tmp_path / 'games.db'}",
+                                    {'SQLITE_BUSY_TIMEOUT': 1234, 'SQLITE_CACHE_SIZE': -2000})
+
+    with engine.connect() as connection:
+        assert connection.execute(text('PRAGMA journal_mode')).scalar() == 'wal'
+        assert connection.execute(text('PRAGMA synchronous')).scalar() == 1
+        assert connection.execute(text('PRAGMA busy_timeout')).scalar() == 1234
+        assert connection.execute(text('PRAGMA cache_size')).scalar() == -2000
+
+    assert isinstance(engine.pool, QueuePool)
+    engine.dispose()
+
+
+def test_engine_pool_selection(tmp_path):
+    engine = create_database_engine(f"sqlite:///{tmp_path / 'games.db'}", {'SQLITE_POOL': 'null'})
+    assert isinstance(engine.pool, NullPool)
+
+    with pytest.raises(ValueError):
+        create_database_engine(f"sqlite:///{tmp_path / 'games.db'}", {'SQLITE_POOL': 'unknown'})
@@ -1,5 +1,7 @@
 import pytest
-from sqlalchemy import create_engine
+from datetime import date
+from pathlib import Path
+from sqlalchemy import create_engine, event, select, func
 from sqlalchemy.orm import Session, sessionmaker, clear_mappers
 
 from games import map_model_to_tables, mapper_registry
@@ -7,6 +9,8 @@ from games.adapters import database_repository, repository_populate
 from games.adapters.database_repository import SessionContextManager, SqlAlchemyRepository
 from games.domainmodel.model import Game, Publisher, Genre, User, Review, Wishlist
 import games.adapters.repository as repo
+from games.adapters.repository import RepositoryException
+from games.adapters.orm import wishlist_table, game_wishlist_table
 
 @pytest.fixture
 def session_factory():
@@ -22,6 +26,33 @@ def session_factory():
     mapper_registry.metadata.drop_all(engine)
 
 
+def make_game(game_id, title, price=0.99, release_date="Mar 12, 2018", publisher=None, genres=(), description=None):
+    # The games table needs a price and release date, so every test game gets them.
+    game = Game(game_id, title)
+    game.release_date = release_date
+    game.price = price
+    if publisher is not None:
+        game.publisher = Publisher(publisher)
+    for genre_name in genres:
+        game.add_genre(Genre(genre_name))
+    if description is not None:
+        game.description = description
+    return game
+
+
+def add_games(session_factory, games):
+    # Each game is a Game or the arguments of make_game(), and all of them go in with one add_multiple_games().
+    repo = SqlAlchemyRepository(session_factory)
+    repo.add_multiple_games([game if isinstance(game, Game) else make_game(*game) for game in games])
+    return repo
+
+
+def fingerprinted(*games):
+    # The games as sync_games() takes them, fingerprinted on everything these tests change.
+    return [(game.game_id, repr((game.title, game.price, [genre.genre_name for genre in game.genres])),
+             lambda game=game: game) for game in games]
+
+
 def test_get_games(session_factory):
     map_model_to_tables()
     repo = SqlAlchemyRepository(session_factory)
@@ -58,6 +89,32 @@ def test_game_functionality(session_factory):
     assert retrieved_game is not None
     assert retrieved_game.title == "Game 1"
 
+def test_get_games_page(session_factory):
+    repo = add_games(session_factory, [(1, "Zeta"), (2, "Alpha"), (3, "Mid")])
+
+    page = repo.get_games_page(0, 2)
+    assert [game.title for game in page] == ["Alpha", "Mid"]
+    page = repo.get_games_page(2, 2)
+    assert [game.title for game in page] == ["Zeta"]
+
+def test_get_games_after(session_factory):
+    repo = add_games(session_factory, [(1, "Alpha"), (2, "Mid"), (3, "Alpha"), (4, "Zeta")])
+
+    games = repo.get_games_after("Alpha", 1, 2)
+    assert [game.game_id for game in games] == [3, 2]
+    games = repo.get_games_after("Mid", 2, 2)
+    assert [game.game_id for game in games] == [4]
+
+def test_iter_games(session_factory):
+    repo = add_games(session_factory, [make_game(game_id, title, publisher="Publisher 1", genres=["Action"])
+                                       for game_id, title in [(1, "Mid"), (2, "Alpha"), (3, "Zeta")]])
+
+    # Batches smaller than the catalog still yield every game once, in title order, with its publisher and genres.
+    games = list(repo.iter_games(batch_size=2))
+    assert [game.game_id for game in games] == [2, 1, 3]
+    assert all(game.publisher.publisher_name == "Publisher 1" for game in games)
+    assert all([genre.genre_name for genre in game.genres] == ["Action"] for game in games)
+
 def test_publisher_functionality(session_factory):
     publisher1 = Publisher("Publisher 1")
     publisher2 = Publisher("Publisher 2")
@@ -165,4 +222,419 @@ def test_review_functionality(session_factory):
 
     assert review in user_reviews
     assert review in game_reviews
-    assert review in game_user_reviews
\ No newline at end of file
+    assert review in game_user_reviews
+
+def test_games_by_genre_page(session_factory):
+    repo = add_games(session_factory, [make_game(1, "Zeta", genres=["Action"]), make_game(2, "Alpha", genres=["Action"]),
+                                       make_game(3, "Mid", genres=["Action"]), make_game(4, "Beta", genres=["Puzzle"])])
+
+    page = repo.get_games_by_genre_page("Action", 0, 2)
+    assert [game.title for game in page] == ["Alpha", "Mid"]
+    page = repo.get_games_by_genre_page("Action", 2, 2)
+    assert [game.title for game in page] == ["Zeta"]
+    assert repo.get_number_of_games_by_genre("Action") == 3
+    assert repo.get_number_of_games_by_genre("Puzzle") == 1
+    assert repo.get_number_of_games_by_genre("Nonexistent Genre") == 0
+
+
+def test_get_game_detail(session_factory):
+    user = User(username="user1", password="password1")
+    game = make_game(1, "Game 1", publisher="Publisher 1", genres=["Action"])
+
+    repo = SqlAlchemyRepository(session_factory)
+    repo.add_multiple_genres(["Action"])
+    repo.add_user(user)
+    repo.add_game(game)
+    repo.add_review(Review(user, game, 4, "Good"))
+    repo.add_review(Review(user, game, 5, "Great"))
+    repo.add_to_wishlist("user1", 1)
+    repo.reset_session()
+
+    statements = []
+    engine = session_factory.kw['bind']
+    listener = lambda *args: statements.append(args[2])
+    event.listen(engine, "before_cursor_execute", listener)
+    try:
+        detail = repo.get_game_detail(1, "user1")
+        assert detail['publisher'].publisher_name == "Publisher 1"
+        assert detail['genres'] == ["Action"]
+        assert len(detail['reviews']) == 2
+    finally:
+        event.remove(engine, "before_cursor_execute", listener)
+
+    # The game row and the reviews collection, nothing per attribute.
+    assert len(statements) == 2
+    assert detail['game'].title == "Game 1"
+    assert detail['review_count'] == 2
+    assert detail['average_rating'] == 4.5
+    assert detail['user_reviewed'] is True
+    assert detail['in_wishlist'] is True
+
+    detail = repo.get_game_detail(1, "someone_else")
+    assert detail['user_reviewed'] is False
+    assert detail['in_wishlist'] is False
+    assert repo.get_game_detail(999) is None
+
+
+def test_get_reviews_by_user_single_query(session_factory):
+    user = User(username="user1", password="password1")
+    games_to_add = [make_game(game_id, f"Game {game_id}") for game_id in range(1, 6)]
+
+    repo = add_games(session_factory, games_to_add)
+    repo.add_user(user)
+    for game in games_to_add:
+        repo.add_review(Review(user, game, 3, f"Review of {game.title}"))
+    repo.reset_session()
+
+    statements = []
+    engine = session_factory.kw['bind']
+    listener = lambda *args: statements.append(args[2])
+    event.listen(engine, "before_cursor_execute", listener)
+    try:
+        reviews = repo.get_reviews_by_user(user)
+        titles = [review.game.title for review in reviews]
+    finally:
+        event.remove(engine, "before_cursor_execute", listener)
+
+    assert len(statements) == 1
+    assert titles == [f"Game {game_id}" for game_id in range(1, 6)]
+
+
+def test_get_games_by_ids(session_factory, monkeypatch):
+    repo = add_games(session_factory, [(game_id, f"Game {game_id}") for game_id in range(1, 8)])
+    # Force several IN batches.
+    monkeypatch.setattr(database_repository, "IN_CLAUSE_BATCH_SIZE", 3)
+
+    games = repo.get_games_by_ids([7, 1, 999, 4, 2, 6, 5])
+    assert [game.game_id if game else None for game in games] == [7, 1, None, 4, 2, 6, 5]
+    assert repo.get_games_by_ids([]) == []
+
+
+def test_wishlist_is_one_row_per_user(session_factory):
+    repo = add_games(session_factory, [(game_id, f"Game {game_id}") for game_id in range(1, 4)])
+    repo.add_to_wishlist("user1", 2)
+    repo.add_to_wishlist("user1", "1")
+    repo.add_to_wishlist("user1", 2)
+    repo.add_to_wishlist("user2", 3)
+
+    assert repo.get_wishlist("user1") == [2, 1]
+    assert repo.get_wishlist("user2") == [3]
+    assert repo.get_wishlist("user3") == []
+
+    session = session_factory()
+    assert session.execute(select(func.count()).select_from(wishlist_table)).scalar() == 2
+    assert session.execute(select(func.count()).select_from(game_wishlist_table)).scalar() == 3
+    session.close()
+
+
+def test_remove_from_wishlist_is_scoped_to_user(session_factory):
+    repo = SqlAlchemyRepository(session_factory)
+    for game_id in (1, 2, 3):
+        repo.add_to_wishlist("user1", game_id)
+        repo.add_to_wishlist("user2", game_id)
+
+    repo.remove_from_wishlist("user1", 1)
+    assert repo.get_wishlist("user1") == [2, 3]
+    assert repo.get_wishlist("user2") == [1, 2, 3]
+
+    repo.remove_multiple_from_wishlist("user2", [3, "1", 999])
+    assert repo.get_wishlist("user2") == [2]
+    assert repo.get_wishlist("user1") == [2, 3]
+
+    # Users without a wishlist remove nothing.
+    repo.remove_multiple_from_wishlist("user3", [2])
+    assert repo.get_wishlist("user1") == [2, 3]
+
+
+def test_search_games_full_text(session_factory):
+    repo = add_games(session_factory, [make_game(1, "The Legend of Zelda", description="A classic adventure"),
+                                       make_game(2, "Legends Arena", description="Zelda-like dungeons"),
+                                       make_game(3, "Pokémon Snap", description="Photograph wild pokemon")])
+
+    assert [game.game_id for game in repo.search_games("legend zel")] == [1]
+    # Title matches outrank description matches.
+    assert [game.game_id for game in repo.search_games("zelda", in_description=True)] == [1, 2]
+    first_page, second_page = repo.search_games("legend", 0, 1), repo.search_games("legend", 1, 1)
+    assert sorted(game.game_id for game in first_page + second_page) == [1, 2]
+    assert repo.get_number_of_search_results("legend") == 2
+    assert repo.get_number_of_search_results("pokemon") == 1
+    # Quotes and FTS5 operators in the query are searched for as plain words.
+    assert repo.search_games('"legend" OR NEAR(') == []
+    assert repo.search_games("  ") == []
+
+    # The index follows updates and deletes made through the session.
+    with repo._session_cm as scm:
+        scm.session.get(Game, 3)._Game__game_title = "Photo Safari"
+        scm.session.delete(scm.session.get(Game, 2))
+        scm.commit()
+    assert repo.search_games("pokemon") == []
+    assert [game.game_id for game in repo.search_games("safari")] == [3]
+    assert repo.get_number_of_search_results("legend") == 1
+
+
+def test_search_by_criteria(session_factory):
+    repo = add_games(session_factory, [make_game(1, "Zeta Strike", publisher="Valve", genres=["Action"]),
+                                       make_game(2, "Alpha Strike", 4.99, publisher="Valve", genres=["Action"]),
+                                       make_game(3, "Beta Strike", publisher="Valhalla", genres=["Action"]),
+                                       make_game(4, "Gamma", publisher="Sega")])
+
+    assert [game.game_id for game in repo.search({'genre': "Action"})] == [2, 3, 1]
+    assert [game.game_id for game in repo.search({'genre': "Action", 'price': 0.99})] == [3, 1]
+    assert [game.game_id for game in repo.search({'publisher': "Val"}, 1, 1)] == [3]
+    assert [game.game_id for game in repo.search({'publisher': "Valv", 'title': "strike"}, 0, 15)] == [2, 1]
+    assert [game.game_id for game in repo.search({'game_id': 4})] == [4]
+    assert repo.get_number_of_games_matching({'publisher': "Val"}) == 3
+    assert repo.get_number_of_games_matching({'title': "strike", 'price': 0.99}) == 2
+    assert repo.get_number_of_games_matching({'game_id': 999}) == 0
+    with pytest.raises(RepositoryException):
+        repo.search({'colour': "red"})
+
+
+def test_search_by_price_range(session_factory):
+    repo = add_games(session_factory, [(1, "Free Game", 0), (2, "Cheap Game", 0.99), (3, "Other Cheap Game", 0.99),
+                                       (4, "Big Game", 59.99)])
+
+    assert [game.game_id for game in repo.search({'max_price': 0})] == [1]
+    assert [game.game_id for game in repo.search({'min_price': 0.5})] == [2, 3, 4]
+    assert [game.game_id for game in repo.search({'min_price': 0.5}, 1, 1)] == [3]
+    assert repo.get_number_of_games_matching({'min_price': 0.5, 'max_price': 1}) == 2
+
+    # The range and its ordering come from the (game_price, game_title) index.
+    with session_factory.kw['bind'].connect() as connection:
+        plan = connection.exec_driver_sql(
+            'EXPLAIN QUERY PLAN SELECT game_id FROM games WHERE game_price >= 0.5 '
+            'ORDER BY game_price, game_title, game_id LIMIT 15').all()
+    assert any('ix_games_game_price_game_title' in row[-1] for row in plan)
+
+
+def test_search_by_release_date_range(session_factory):
+    repo = add_games(session_factory, [(1, "Old Game", 4.99, "Jan 5, 1999"), (2, "Game 2", 4.99, "Mar 12, 2018"),
+                                       (3, "Game 3", 4.99, "Mar 12, 2018"), (4, "New Game", 4.99, "Aug 30, 2023")])
+
+    assert repo.get_game(2).released_on == date(2018, 3, 12)
+    assert [game.game_id for game in repo.get_games_page(0, 10, order_by='release_date')] == [1, 2, 3, 4]
+    assert [game.game_id for game in repo.search({'min_release_date': date(2018, 1, 1)})] == [2, 3, 4]
+    assert [game.game_id for game in repo.search({'max_release_date': date(2018, 12, 31)}, 1, 1)] == [2]
+    assert repo.get_number_of_games_matching({'min_release_date': date(2000, 1, 1),
+                                              'max_release_date': date(2018, 12, 31)}) == 2
+
+    # The range and its ordering come from the (released_on, game_title) index.
+    with session_factory.kw['bind'].connect() as connection:
+        plan = connection.exec_driver_sql(
+            "EXPLAIN QUERY PLAN SELECT game_id FROM games WHERE released_on >= '2018-01-01' "
+            'ORDER BY released_on, game_title, game_id LIMIT 15').all()
+    assert any('ix_games_released_on_game_title' in row[-1] for row in plan)
+
+
+def test_browse_orderings(session_factory):
+    repo = add_games(session_factory, [(1, "Game 1", 0.99, "Mar 12, 2018"), (2, "Game 2", 1.99, "Aug 30, 2023"),
+                                       (3, "Action Game", 0.99, "Jan 5, 1999", None, ["Action"]),
+                                       (4, "Cheap Game", 0, "Jan 5, 1999", None, ["Action"])])
+    user = User("user1", "password1")
+    repo.add_user(user)
+    for game_id, rating in [(1, 4), (1, 5), (2, 3)]:
+        repo.add_review(Review(user, repo.get_game(game_id), rating, "Review"))
+
+    def page(order_by, genre_name=None, offset=0, limit=10):
+        if genre_name is None:
+            return [game.game_id for game in repo.get_games_page(offset, limit, order_by)]
+        return [game.game_id for game in repo.get_games_by_genre_page(genre_name, offset, limit, order_by)]
+
+    assert page('title') == [3, 4, 1, 2]
+    assert page('price') == [4, 3, 1, 2]
+    assert page('price', offset=1, limit=2) == [3, 1]
+    assert page('release_date') == [3, 4, 1, 2]
+    # Game 1 averages 4.5 and game 2 3, the games without reviews come last in title order.
+    assert page('rating') == [1, 2, 3, 4]
+    assert page('price', "Action") == [4, 3]
+    assert page('rating', "Action") == [3, 4]
+
+    repo.add_review(Review(user, repo.get_game(4), 5, "Great"))
+    assert page('rating') == [4, 1, 2, 3]
+    assert page('rating', "Action") == [4, 3]
+
+    with pytest.raises(RepositoryException):
+        repo.get_games_page(0, 10, order_by='popularity')
+
+    # The rating order is read from the (average_rating DESC, game_title) index rather than sorted per request.
+    with session_factory.kw['bind'].connect() as connection:
+        plan = connection.exec_driver_sql(
+            'EXPLAIN QUERY PLAN SELECT game_id FROM games '
+            'ORDER BY average_rating DESC, game_title, game_id LIMIT 15').all()
+    assert any('ix_games_average_rating_game_title' in row[-1] for row in plan)
+
+
+def test_game_cards_are_cached_until_the_game_changes(session_factory):
+    def catalog(*titles):
+        return fingerprinted(*(make_game(game_id, title, publisher="Valve", genres=["Action"])
+                               for game_id, title in titles))
+
+    repo = SqlAlchemyRepository(session_factory)
+    repo.sync_games(catalog((1, "Game 1"), (2, "Game 2")))
+
+    cards = repo.get_game_cards(repo.get_games_page(0, 10))
+    assert [(card.title, card.publisher_name, card.genres) for card in cards] == \
+        [("Game 1", "Valve", ("Action",)), ("Game 2", "Valve", ("Action",))]
+    assert repo.get_game_cards(repo.get_games_page(0, 10)) == cards
+    assert repo.get_game_cards(repo.get_games_page(0, 10))[0] is cards[0]
+
+    repo.sync_games(catalog((1, "Game 1 Remastered"), (2, "Game 2")))
+    assert [card.title for card in repo.get_game_cards(repo.get_games_page(0, 10))] == ["Game 1 Remastered", "Game 2"]
+
+    # A write by another process, such as flask import-catalog, retires this process's cards too.
+    other_process_repo = SqlAlchemyRepository(session_factory)
+    other_process_repo.sync_games(catalog((1, "Game 1 Remastered"), (2, "Game 2 Deluxe")))
+    repo.reset_session()
+    assert [card.title for card in repo.get_game_cards(repo.get_games_page(0, 10))] == \
+        ["Game 1 Remastered", "Game 2 Deluxe"]
+
+
+def test_catalog_version_counts_catalog_writes(session_factory):
+    repo = SqlAlchemyRepository(session_factory)
+    assert repo.get_catalog_version() == 0
+    assert repo.get_catalog_stamp() == (0, None, None)
+
+    game = make_game(1, "Game 1")
+    repo.add_multiple_games([game])
+    repo.add_multiple_genres(["Action"])
+    assert repo.get_catalog_version() == 2
+    assert repo.get_catalog_stamp() == (2, repo.get_catalog_epoch(), repo.get_catalog_last_modified())
+
+    user = User("user1", "password1")
+    repo.add_user(user)
+    repo.add_to_wishlist("user1", 1)
+    assert repo.get_catalog_version() == 2
+    repo.add_review(Review(user, repo.get_game(1), 5, "Great"))
+    assert repo.get_catalog_version() == 3
+
+    # A re-import that changes nothing leaves the version alone, so cached pages stay valid.
+    catalog = fingerprinted(game)
+    repo.sync_games(catalog)
+    assert repo.get_catalog_version() == 4
+    repo.sync_games(catalog)
+    assert repo.get_catalog_version() == 4
+
+
+def test_game_versions_stamp_writes_to_each_game(session_factory):
+    games_to_add = [make_game(1, "Game 1"), make_game(2, "Game 2")]
+    repo = add_games(session_factory, games_to_add)
+    assert repo.get_game_version(999) is None
+    # Games written in bulk have no stamps yet, so they carry the catalog's last change.
+    assert repo.get_game_version(2) == (0, 0, 0, repo.get_catalog_last_modified(), repo.get_catalog_epoch())
+    assert repo.get_catalog_last_modified() is not None
+
+    user = User("user1", "password1")
+    repo.add_user(user)
+    repo.add_to_wishlist("user1", 2)
+    repo.add_review(Review(user, repo.get_game(2), 4, "Fine"))
+    repo.remove_from_wishlist("user1", 2)
+    version, review_version, wishlist_version, modified_at, _ = repo.get_game_version(2)
+    assert version == 0 and 0 < review_version < wishlist_version
+    assert modified_at is not None
+
+    repo.sync_games(fingerprinted(games_to_add[1]))
+    assert repo.get_game_version(2)[:3] == (wishlist_version + 1, review_version, wishlist_version)
+    # Game 1 wasn't listed, so it went, versions and all.
+    assert repo.get_game_version(1) is None
+
+
+def test_game_versions_never_repeat_for_a_game_added_again(session_factory):
+    repo = SqlAlchemyRepository(session_factory)
+    game = make_game(1, "Game 1")
+    repo.sync_games(fingerprinted(game))
+    first = repo.get_game_version(1)
+    epoch = repo.get_catalog_epoch()
+    assert epoch is not None
+
+    repo.sync_games([])
+    assert repo.get_game_version(1) is None
+    repo.sync_games(fingerprinted(make_game(1, "Game 1 Remastered")))
+    assert repo.get_game_version(1)[:3] != first[:3]
+    assert repo.get_catalog_epoch() == epoch
+
+    # A catalog built from scratch counts from the start again, under a new epoch.
+    engine = session_factory.kw['bind']
+    mapper_registry.metadata.drop_all(engine)
+    mapper_registry.metadata.create_all(engine)
+    repo.reset_session()
+    repo.sync_games(fingerprinted(game))
+    assert repo.get_game_version(1)[:3] == first[:3]
+    assert repo.get_catalog_epoch() != epoch
+
+
+def test_add_multiple_games_bulk_inserts_new_games(session_factory):
+    repo = SqlAlchemyRepository(session_factory)
+    repo.add_multiple_publishers([Publisher("Valve"), Publisher("Valve")])
+    repo.add_multiple_games([make_game(1, "Game 1", publisher="Valve", genres=["Action"]),
+                             make_game(2, "Game 2", publisher="Valve", genres=["Action", "Puzzle"]),
+                             make_game(1, "Game 1 again", publisher="Valve", genres=["Action"])])
+    # Games already stored are left as they are.
+    repo.add_multiple_games([make_game(2, "Renamed", 5.0)])
+
+    assert [(game.game_id, game.title, game.price) for game in repo.get_games_page(0, 10)] == \
+           [(1, "Game 1", 0.99), (2, "Game 2", 0.99)]
+    assert [publisher.publisher_name for publisher in repo.get_publishers()] == ["Valve"]
+    assert sorted(genre.genre_name for genre in repo.get_all_genres()) == ["Action", "Puzzle"]
+    assert sorted(genre.genre_name for genre in repo.get_game(2).genres) == ["Action", "Puzzle"]
+    assert repo.get_number_of_games_by_genre("Action") == 2
+    assert [game.game_id for game in repo.search_games("game")] == [1, 2]
+
+
+def test_sync_games_writes_only_changes(session_factory):
+    def catalog(*titles):
+        return fingerprinted(*(make_game(game_id, title, publisher="Valve", genres=[genre_name])
+                               for game_id, title, genre_name in titles))
+
+    repo = SqlAlchemyRepository(session_factory)
+    # Games loaded without fingerprints, as add_multiple_games() loads them, are rewritten by the first sync.
+    repo.add_multiple_games([build_game()
+                             for _, _, build_game in catalog((1, "Game 1", "Action"), (2, "Game 2", "Action"))])
+    user = User("user1", "password1")
+    repo.add_user(user)
+    repo.add_review(Review(user, repo.get_game(2), 5, "Great"))
+
+    assert repo.sync_games(catalog((1, "Game 1", "Action"), (2, "Game 2", "Action"), (3, "Game 3", "Action"))) == \
+        {'added': 1, 'updated': 2, 'removed': 0, 'kept': 0, 'unchanged': 0}
+
+    engine = session_factory.kw['bind']
+    statements = []
+
+    def record_statement(connection, cursor, statement, *args):
+        statements.append(statement)
+
+    event.listen(engine, 'before_cursor_execute', record_statement)
+    counts = repo.sync_games(catalog((1, "Game 1", "Action"), (3, "Game 3 Remastered", "Indie"),
+                                     (4, "Game 4", "Indie")))
+    event.remove(engine, 'before_cursor_execute', record_statement)
+    assert counts == {'added': 1, 'updated': 1, 'removed': 0, 'kept': 1, 'unchanged': 1}
+    # Only games 3 and 4 were written, in batches rather than one statement per game.
+    assert sum(statement.startswith('UPDATE games') for statement in statements) == 1
+
+    assert [game.title for game in repo.get_games_page(0, 10)] == ["Game 1", "Game 2", "Game 3 Remastered", "Game 4"]
+    assert [genre.genre_name for genre in repo.get_game(3).genres] == ["Indie"]
+    assert repo.get_number_of_games_by_genre("Action") == 2
+    assert [game.game_id for game in repo.search_games("remastered")] == [3]
+    # Game 2 is no longer listed but has a review, so it and the review stay.
+    assert [review.comment for review in repo.get_reviews_by_game(repo.get_game(2))] == ["Great"]
+    assert repo.get_user("user1") is not None
+
+    repo.add_to_wishlist("user1", 4)
+    counts = repo.sync_games(catalog((2, "Game 2", "Action"), (4, "Game 4", "Indie")))
+    assert counts == {'added': 0, 'updated': 0, 'removed': 2, 'kept': 0, 'unchanged': 2}
+    assert [game.game_id for game in repo.get_games_page(0, 10)] == [2, 4]
+    assert repo.get_wishlist("user1") == [4]
+
+
+def test_reimport_after_populate_rewrites_nothing(session_factory):
+    repo = SqlAlchemyRepository(session_factory)
+    data_path = Path('games') / 'adapters' / 'data'
+    repository_populate.populate(data_path, repo)
+    game = repo.get_games_page(0, 1)[0]
+    version = repo.get_game_version(game.game_id)
+    catalog_version = repo.get_catalog_version()
+
+    counts = repository_populate.reimport(data_path, repo)
+    assert counts == {'added': 0, 'updated': 0, 'removed': 0, 'kept': 0, 'unchanged': repo.get_number_of_games()}
+    assert repo.get_game_version(game.game_id) == version
+    # The publishers and genres are all stored already, so the catalog version stays as it was.
+    assert repo.get_catalog_version() == catalog_version
@@ -0,0 +1,220 @@
+import pytest
+from datetime import date
+from sqlalchemy import create_engine, inspect, MetaData, Table, Column, Integer, Float, String, select, text
+
+from games.adapters.database_upgrade import upgrade_database
+from games.adapters.orm import mapper_registry
+
+
+@pytest.fixture
+def legacy_engine():
+    # The wishlist tables as they were before wishlists became one row per user, without any indexes.
+    engine = create_engine('sqlite://')
+    metadata = MetaData()
+    Table('wishlist', metadata,
+          Column('wishlist_id', Integer, primary_key=True, autoincrement=True),
+          Column('username', String(255)))
+    Table('game_wishlist', metadata,
+          Column('id', Integer, primary_key=True, autoincrement=True),
+          Column('game_id', Integer),
+          Column('wishlist_id', Integer))
+    metadata.create_all(engine)
+    yield engine, metadata
+    metadata.drop_all(engine)
+
+
+def test_upgrade_collapses_duplicate_wishlists(legacy_engine):
+    engine, metadata = legacy_engine
+    wishlist = metadata.tables['wishlist']
+    game_wishlist = metadata.tables['game_wishlist']
+
+    with engine.begin() as connection:
+        connection.execute(wishlist.insert(), [
+            {'wishlist_id': 1, 'username': 'user1'},
+            {'wishlist_id': 2, 'username': 'user2'},
+            {'wishlist_id': 3, 'username': 'user1'},
+            {'wishlist_id': 4, 'username': 'user1'},
+        ])
+        connection.execute(game_wishlist.insert(), [
+            {'game_id': 10, 'wishlist_id': 1},
+            {'game_id': 20, 'wishlist_id': 2},
+            {'game_id': 30, 'wishlist_id': 3},
+            {'game_id': 10, 'wishlist_id': 4},
+        ])
+
+    upgrade_database(engine)
+    # Running it again on an upgraded database changes nothing.
+    upgrade_database(engine)
+
+    with engine.connect() as connection:
+        wishlists = connection.execute(select(wishlist).order_by(wishlist.c.wishlist_id)).all()
+        links = connection.execute(select(game_wishlist.c.wishlist_id, game_wishlist.c.game_id)
+                                   .order_by(game_wishlist.c.id)).all()
+
+    assert wishlists == [(1, 'user1'), (2, 'user2')]
+    assert links == [(1, 10), (2, 20), (1, 30)]
+
+    index_names = {index['name'] for index in inspect(engine).get_indexes('game_wishlist')}
+    assert {'ix_game_wishlist_wishlist_id_game_id', 'ix_game_wishlist_game_id'} <= index_names
+    index_names = {index['name'] for index in inspect(engine).get_indexes('wishlist')}
+    assert 'ix_wishlist_username' in index_names
+
+
+def test_upgrade_adds_missing_indexes_without_touching_data():
+    engine = create_engine('sqlite://')
+    mapper_registry.metadata.create_all(engine)
+    # Simulate a database created before the secondary indexes were declared.
+    with engine.begin() as connection:
+        for table in mapper_registry.metadata.sorted_tables:
+            for index in table.indexes:
+                index.drop(connection)
+        connection.execute(mapper_registry.metadata.tables['games'].insert().values(
+            game_id=1, game_title='Game 1', game_price=0.99, release_date='Mar 12, 2018'))
+
+    upgrade_database(engine)
+    upgrade_database(engine)
+
+    inspector = inspect(engine)
+    for table in mapper_registry.metadata.sorted_tables:
+        existing = {index['name'] for index in inspector.get_indexes(table.name)}
+        assert {index.name for index in table.indexes} <= existing
+    with engine.connect() as connection:
+        titles = connection.execute(select(mapper_registry.metadata.tables['games'].c.game_title)).scalars().all()
+    assert titles == ['Game 1']
+    mapper_registry.metadata.drop_all(engine)
+
+
+def test_upgrade_adds_search_index_for_existing_games():
+    engine = create_engine('sqlite://')
+    mapper_registry.metadata.create_all(engine)
+    # Simulate a database created before the full-text index existed.
+    with engine.begin() as connection:
+        for trigger in ('games_fts_insert', 'games_fts_delete', 'games_fts_update'):
+            connection.execute(text(f'DROP TRIGGER {trigger}'))
+        connection.execute(text('DROP TABLE games_fts'))
+        connection.execute(mapper_registry.metadata.tables['games'].insert().values(
+            game_id=1, game_title='The Legend of Zelda', game_price=0.99, release_date='Mar 12, 2018'))
+
+    upgrade_database(engine)
+    upgrade_database(engine)
+
+    with engine.connect() as connection:
+        matches = connection.execute(text("SELECT rowid FROM games_fts WHERE games_fts MATCH 'zel*'")).scalars().all()
+    assert matches == [1]
+    mapper_registry.metadata.drop_all(engine)
+
+
+def test_upgrade_adds_release_dates_to_existing_games():
+    engine = create_engine('sqlite://')
+    # The games table as it was before release dates were stored as dates.
+    metadata = MetaData()
+    legacy_games = Table('games', metadata,
+                         Column('game_id', Integer, primary_key=True),
+                         Column('game_title', String(255), nullable=False),
+                         Column('game_price', Float, nullable=False),
+                         Column('release_date', String(50), nullable=False),
+                         Column('game_description', String(255)),
+                         Column('game_image_url', String(255)),
+                         Column('game_website_url', String(255)),
+                         Column('publisher_name', String(255)))
+    metadata.create_all(engine)
+    with engine.begin() as connection:
+        connection.execute(legacy_games.insert(), [
+            {'game_id': 1, 'game_title': 'Game 1', 'game_price': 0.99, 'release_date': 'Mar 12, 2018'},
+            {'game_id': 2, 'game_title': 'Game 2', 'game_price': 0.99, 'release_date': 'sometime'},
+        ])
+
+    upgrade_database(engine)
+    upgrade_database(engine)
+
+    games = mapper_registry.metadata.tables['games']
+    with engine.connect() as connection:
+        released_on = connection.execute(select(games.c.game_id, games.c.released_on)
+                                         .order_by(games.c.game_id)).all()
+    assert released_on == [(1, date(2018, 3, 12)), (2, None)]
+    assert 'ix_games_released_on_game_title' in {index['name'] for index in inspect(engine).get_indexes('games')}
+    assert {'game_fingerprints', 'catalog_version', 'game_versions'} <= set(inspect(engine).get_table_names())
+
+
+def test_upgrade_adds_average_ratings_to_existing_games():
+    engine = create_engine('sqlite://')
+    # The games table as it was before average ratings were kept on it, with reviews already written.
+    metadata = MetaData()
+    legacy_games = Table('games', metadata,
+                         Column('game_id', Integer, primary_key=True),
+                         Column('game_title', String(255), nullable=False),
+                         Column('game_price', Float, nullable=False),
+                         Column('release_date', String(50), nullable=False),
+                         Column('game_description', String(255)),
+                         Column('game_image_url', String(255)),
+                         Column('game_website_url', String(255)),
+                         Column('publisher_name', String(255)))
+    legacy_reviews = Table('reviews', metadata,
+                           Column('review_id', Integer, primary_key=True, autoincrement=True),
+                           Column('comment', String(255), nullable=False),
+                           Column('rating', Integer, nullable=False),
+                           Column('game_id', Integer),
+                           Column('username', String(255)))
+    metadata.create_all(engine)
+    with engine.begin() as connection:
+        connection.execute(legacy_games.insert(), [
+            {'game_id': 1, 'game_title': 'Game 1', 'game_price': 0.99, 'release_date': 'Mar 12, 2018'},
+            {'game_id': 2, 'game_title': 'Game 2', 'game_price': 0.99, 'release_date': 'Mar 12, 2018'},
+        ])
+        connection.execute(legacy_reviews.insert(), [
+            {'comment': 'Good', 'rating': 4, 'game_id': 1, 'username': 'user1'},
+            {'comment': 'Great', 'rating': 5, 'game_id': 1, 'username': 'user2'},
+        ])
+
+    upgrade_database(engine)
+    upgrade_database(engine)
+
+    games = mapper_registry.metadata.tables['games']
+    with engine.connect() as connection:
+        average_ratings = connection.execute(select(games.c.game_id, games.c.average_rating)
+                                             .order_by(games.c.game_id)).all()
+    assert average_ratings == [(1, 4.5), (2, None)]
+    assert 'ix_games_average_rating_game_title' in {index['name'] for index in inspect(engine).get_indexes('games')}
+
+
+def test_upgrade_adds_modified_at_to_catalog_version():
+    engine = create_engine('sqlite://')
+    mapper_registry.metadata.create_all(engine)
+    # The catalog version as it was before it recorded when it changed.
+    with engine.begin() as connection:
+        connection.execute(text('DROP TABLE catalog_version'))
+        connection.execute(text('CREATE TABLE catalog_version '
+                                '(catalog_version_id INTEGER PRIMARY KEY, version INTEGER NOT NULL)'))
+        connection.execute(text('INSERT INTO catalog_version VALUES (1, 7)'))
+
+    upgrade_database(engine)
+    upgrade_database(engine)
+
+    catalog_version = mapper_registry.metadata.tables['catalog_version']
+    with engine.connect() as connection:
+        assert connection.execute(select(catalog_version.c.version, catalog_version.c.modified_at)).all() == [(7, None)]
+
+
+def test_upgrade_stamps_game_versions_on_from_the_highest_count():
+    engine = create_engine('sqlite://')
+    mapper_registry.metadata.create_all(engine)
+    # Game versions as they were while each game counted its own writes.
+    with engine.begin() as connection:
+        connection.execute(text('DROP TABLE catalog_version'))
+        connection.execute(text('CREATE TABLE catalog_version (catalog_version_id INTEGER PRIMARY KEY, '
+                                'version INTEGER NOT NULL, modified_at DATETIME)'))
+        connection.execute(text('INSERT INTO catalog_version VALUES (1, 7, NULL)'))
+        connection.execute(text("INSERT INTO games (game_id, game_title, game_price, release_date) "
+                                "VALUES (1, 'Game 1', 0.99, 'Mar 12, 2018')"))
+        connection.execute(text("INSERT INTO game_versions VALUES (1, 2, 5, 3, '2023-01-01 00:00:00')"))
+
+    upgrade_database(engine)
+    with engine.connect() as connection:
+        epoch = connection.execute(text('SELECT epoch FROM catalog_version')).scalar()
+    upgrade_database(engine)
+
+    catalog_version = mapper_registry.metadata.tables['catalog_version']
+    with engine.connect() as connection:
+        assert connection.execute(select(catalog_version.c.version, catalog_version.c.epoch,
+                                         catalog_version.c.game_stamp)).all() == [(7, epoch, 5)]
+    assert epoch is not None
@@ -16,7 +16,11 @@ def database_engine(app):
 
 def test_database_populate_inspect_table_names(database_engine):
     inspector = Inspector.from_engine(database_engine)
-    assert inspector.get_table_names() == ['game_genres', 'game_wishlist', 'games', 'genres', 'publishers', 'reviews', 'users', 'wishlist']
+    # games_fts is the full-text index over games; the other games_fts_* tables are its FTS5 shadow tables.
+    assert inspector.get_table_names() == ['catalog_version', 'game_fingerprints', 'game_genres', 'game_versions',
+                                           'game_wishlist', 'games', 'games_fts', 'games_fts_config', 'games_fts_data',
+                                           'games_fts_docsize', 'games_fts_idx', 'genres', 'publishers', 'reviews',
+                                           'users', 'wishlist']
 
 
 def test_database_populate_select_all_users(database_engine):
@@ -47,7 +51,7 @@ def test_database_populate_select_publisher(database_engine):
         publishers_table = mapper_registry.metadata.tables['publishers']
         insert_statement = publishers_table.insert().values(new_publisher_info)
         connection.execute(insert_statement)
-        select_statement = select(publishers_table.c.name)
+        select_statement = select(publishers_table.c.name).where(publishers_table.c.name == 'New Publisher')
         result = connection.execute(select_statement)
 
         all_publisher_names = [row[0] for row in result]
@@ -102,7 +106,7 @@ def test_database_populate_select_genres(database_engine):
         genres_table = mapper_registry.metadata.tables['genres']
         insert_statement = genres_table.insert().values(new_genre_info)
         connection.execute(insert_statement)
-        select_statement = select(genres_table.c.genre_name)
+        select_statement = select(genres_table.c.genre_name).where(genres_table.c.genre_name == 'New Genre')
         result = connection.execute(select_statement)
 
         all_genre_names = [row[0] for row in result]
@@ -124,7 +128,7 @@ def test_database_populate_select_games(database_engine):
         games_table = mapper_registry.metadata.tables['games']
         insert_statement = games_table.insert().values(new_game_info)
         connection.execute(insert_statement)
-        select_statement = select(games_table.c.game_title)
+        select_statement = select(games_table.c.game_title).where(games_table.c.game_title == 'New Game')
         result = connection.execute(select_statement)
 
         all_game_titles = [row[0] for row in result]
@@ -142,7 +146,8 @@ def test_database_populate_select_game_genres(database_engine):
         game_genres_table = mapper_registry.metadata.tables['game_genres']
         insert_statement = game_genres_table.insert().values(new_game_genre_info)
         connection.execute(insert_statement)
-        select_statement = select(game_genres_table.c.game_id, game_genres_table.c.genre_name)
+        select_statement = select(game_genres_table.c.game_id, game_genres_table.c.genre_name) \
+            .where(game_genres_table.c.genre_name == 'New Genre')
         result = connection.execute(select_statement)
 
         all_game_genre_associations = [row for row in result]